@@ -1,13 +1,142 @@
-from fastapi import FastAPI, Request, Form, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Form, Depends, HTTPException, Query
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse, Response
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from typing import List, Optional
-import uvicorn
-from surf_store import *
+import asyncio
+import hashlib
+import itertools
+import os
+import time
+from urllib.parse import urlencode
+from jinja2 import Template
+from markupsafe import Markup
+# Admin-only subsystems (imports, exports) are reached as surf_store.<name> and load on first use
+import surf_store
+from surf_store import (OrderStatus, DeliveryStatus, Customer, Product, ShoppingCart, Order, OrderContact,
+                        StandardDelivery, PickupDelivery, Catalog, BestSellerTracker, InMemoryBasketStore,
+                        SQLiteBasketStore, StockReservationEngine, Reservation, InsufficientStockError,
+                        InMemoryRepository, SQLiteRepository, StoreAggregates, SearchIndex, SimulatedGateway,
+                        PaymentPipeline, PaymentDeclinedError, create_payment, ShippingQuoteEngine, create_delivery,
+                        LRUFragmentCache, CatalogVersions, StoreMetrics, MetricsMiddleware, STORE_HOT_PATHS,
+                        METRICS_CONTENT_TYPE, EventJournal, TrackingIndex, DispatchScheduler, FacetIndex, FACET_NAMES)
 from datetime import datetime
 
-app = FastAPI(title="TC Surf Store", description="Total Chaos Surf Store - Premium Surf Gear")
+# Store state. Importing this module stays cheap: the lifespan handler calls
+# load_store() when a server starts the app. Anything driving the app without
+# lifespan events (benchmarks, scripts) calls load_store() itself.
+repository = None
+catalog: Optional[Catalog] = None
+products = customers = families = orders_db = None
+aggregates = search_index = facet_index = catalog_versions = best_sellers = shipping_quotes = None
+journal: Optional[EventJournal] = None
+tracking_index: Optional[TrackingIndex] = None
+dispatch_scheduler: Optional[DispatchScheduler] = None
+shared_catalog = None
+
+# Deliveries move on in waves at each dispatch cutoff. SURF_STORE_DISPATCH_SECONDS=0 turns the
+# cutoffs off and leaves waves to POST /admin/dispatch.
+DISPATCH_INTERVAL_SECONDS = float(os.environ.get("SURF_STORE_DISPATCH_SECONDS", "300"))
+
+def load_store():
+    """Open the repository and build the catalog, indexes and trackers. Safe to call more than once."""
+    global repository, catalog, products, customers, families, orders_db
+    global aggregates, search_index, facet_index, catalog_versions, best_sellers, shipping_quotes, journal
+    global tracking_index, dispatch_scheduler, shared_catalog, reservations
+    if catalog is not None:
+        return
+
+    # Set SURF_STORE_JOURNAL to a directory to journal every order, payment, delivery and stock
+    # change there. Without a database, the store is rebuilt from it at startup.
+    recovered = None
+    if os.environ.get("SURF_STORE_JOURNAL"):
+        journal = EventJournal(os.environ["SURF_STORE_JOURNAL"])
+        recovered = journal.recover()
+
+    # Set SURF_STORE_DB to a SQLite file path to persist the store across restarts and workers
+    if os.environ.get("SURF_STORE_DB"):
+        repository = SQLiteRepository(os.environ["SURF_STORE_DB"])
+    else:
+        repository = InMemoryRepository()
+        if recovered:
+            repository.save_catalog(recovered.catalog)
+            repository.add_orders(recovered.orders)
+
+    loaded = repository.load_catalog()
+    if not len(loaded) and os.environ.get("SURF_STORE_CATALOG"):
+        # A snapshot file from `python -m surf_store snapshot` seeds an empty store without the demo data.
+        # Every product is built, not read lazily: the indexes below walk the whole catalog anyway
+        with surf_store.CatalogSnapshot(os.environ["SURF_STORE_CATALOG"]) as snapshot:
+            loaded = snapshot.load_catalog()
+        repository.save_catalog(loaded)
+    elif not len(loaded):
+        # Only an empty store pays for importing the demo data
+        from surf_store.demo import create_sample_data
+        store_data = create_sample_data()
+        loaded = Catalog(store_data['families'], store_data['products'], store_data['customers'])
+        repository.save_catalog(loaded)
+    products = loaded.products
+    customers = loaded.customers
+    families = loaded.families
+    orders_db = repository.load_orders(loaded)
+
+    # python -m surf_store serve publishes the catalog in shared memory and names the segment in
+    # SURF_STORE_SHARED, so every worker takes stock from, and sees the stock of, one table
+    if os.environ.get("SURF_STORE_SHARED"):
+        shared_catalog = surf_store.SharedCatalog.attach(os.environ["SURF_STORE_SHARED"])
+        shared_catalog.bind(loaded)
+        reservations = surf_store.SharedStockReservationEngine(get_product_by_id, shared_catalog)
+
+    aggregates = StoreAggregates(loaded, orders_db)
+    search_index = SearchIndex(loaded.products, catalog=loaded)
+    facet_index = FacetIndex(loaded.products, catalog=loaded)
+    # Rendered pages and product cards are keyed on the catalog versions they were rendered at
+    catalog_versions = CatalogVersions(loaded)
+    shipping_quotes = ShippingQuoteEngine(loaded)
+    tracking_index = TrackingIndex(orders_db)
+    # Workers sharing a database elect one of them, through a lock file beside it, to run the cutoffs
+    dispatch_scheduler = DispatchScheduler(
+        tracking_index, DISPATCH_INTERVAL_SECONDS, on_wave=repository.save_order_status,
+        lock_path=os.environ["SURF_STORE_DB"] + ".dispatch.lock" if os.environ.get("SURF_STORE_DB") else None,
+        before_wave=refresh_orders)
+
+    best_sellers = BestSellerTracker(windows={'day': 24 * 3600})
+    for past_order in orders_db:
+        for detail in past_order.order_details:
+            best_sellers.increment(detail.product, detail.quantity, at=past_order.order_date.timestamp())
+    if journal:
+        journal.attach(loaded, orders_db)
+    catalog = loaded
+
+def refresh_orders():
+    """Take in the orders, and order status changes, other workers have saved since the last refresh."""
+    # Other workers counted these orders in their own metrics when they took them
+    with metrics.muted():
+        added = repository.refresh_orders(catalog)
+    if added:
+        aggregates.count_orders(added)
+        for order in added:
+            for detail in order.order_details:
+                best_sellers.increment(detail.product, detail.quantity, at=order.order_date.timestamp())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_store()
+    # Only after loading, so orders already in the store aren't counted as placed now
+    if os.environ.get("SURF_STORE_METRICS") == "1":
+        metrics.enable()
+    if DISPATCH_INTERVAL_SECONDS > 0:
+        dispatch_scheduler.start()
+    yield
+    await dispatch_scheduler.close()
+    await payment_pipeline.close()
+    if journal:
+        journal.close()
+    if shared_catalog is not None:
+        shared_catalog.close()
+
+app = FastAPI(title="TC Surf Store", description="Total Chaos Surf Store - Premium Surf Gear", lifespan=lifespan)
 
 templates = Jinja2Templates(directory="templates")
 templates.env.globals["min"] = min
@@ -17,129 +146,263 @@ try:
 except RuntimeError:
     pass
 
-store_data = create_sample_data()
-products = store_data['products']
-customers = store_data['customers']
-families = store_data['families']
-
-basket_items = {}
-orders_db = []
-next_order_id = 1
-next_customer_id = len(customers) + 1
+page_cache = LRUFragmentCache(max_entries=256, max_bytes=64 * 1024 * 1024)
+card_cache = LRUFragmentCache(max_entries=4096, max_bytes=16 * 1024 * 1024)
+
+BASKET_COOKIE = "basket_id"
+ADMIN_PRODUCTS_PAGE_SIZE = 50
+ADMIN_ORDERS_PAGE_SIZE = 5
+STREAM_CHUNK_SIZE = 16 * 1024
+SEARCH_RESULTS_LIMIT = 12
+FACET_VALUES_LIMIT = 20
+# Orders other workers have saved are taken in at most once per SURF_STORE_ORDER_REFRESH_MS
+# (0: on every request), and never for static files or metrics scrapes
+ORDER_REFRESH_SECONDS = float(os.environ.get("SURF_STORE_ORDER_REFRESH_MS", "250")) / 1000
+UNSYNCED_PATHS = ("/static/", "/metrics")
+orders_refreshed_at = float("-inf")
 
 def get_product_by_id(product_id: int):
-    for product in products:
-        if product.product_id == product_id:
-            return product
-    return None
+    return catalog.get_product(product_id)
 
 def get_customer_by_id(customer_id: int):
-    for customer in customers:
-        if customer.customer_id == customer_id:
-            return customer
-    return None
+    return catalog.get_customer(customer_id)
+
+reservations = StockReservationEngine(get_product_by_id)
+STORE_PICKUP_LOCATION = "TC Surf Store, 1 Beach Road, Brighton"
+# Progress shown on the tracking page; store pickups have no transit leg
+TRACKING_STEPS = (DeliveryStatus.PREPARING, DeliveryStatus.DISPATCHED, DeliveryStatus.IN_TRANSIT,
+                  DeliveryStatus.DELIVERED)
+
+# Payments go through a simulated gateway; tune it to load-test checkout
+payment_gateway = SimulatedGateway(
+    latency_ms=float(os.environ.get("SURF_STORE_PAYMENT_LATENCY_MS", "50")),
+    failure_rate=float(os.environ.get("SURF_STORE_PAYMENT_FAILURE_RATE", "0")))
+payment_pipeline = PaymentPipeline(payment_gateway)
+
+# Set SURF_STORE_BASKETS to a SQLite file path to share baskets between workers
+if os.environ.get("SURF_STORE_BASKETS"):
+    basket_store = SQLiteBasketStore(os.environ["SURF_STORE_BASKETS"], get_product_by_id)
+else:
+    basket_store = InMemoryBasketStore()
+
+@app.middleware("http")
+async def basket_session(request: Request, call_next):
+    global orders_refreshed_at
+    session_id = request.cookies.get(BASKET_COOKIE)
+    is_new = not session_id or len(session_id) > 64
+    if is_new:
+        session_id = basket_store.new_session_id()
+    request.state.basket_id = session_id
+    if not request.url.path.startswith(UNSYNCED_PATHS):
+        if shared_catalog is not None:
+            # Pick up the stock other workers have taken since this worker's last request
+            shared_catalog.sync()
+        now = time.monotonic()
+        if catalog is not None and now - orders_refreshed_at >= ORDER_REFRESH_SECONDS:
+            # And the orders they have saved, so order pages, totals and tracking agree across workers
+            orders_refreshed_at = now
+            refresh_orders()
+
+    response = await call_next(request)
+    if is_new:
+        response.set_cookie(BASKET_COOKIE, session_id, max_age=int(basket_store.ttl_seconds),
+                            httponly=True, samesite="lax")
+    return response
+
+# Metrics cost nothing until switched on: SURF_STORE_METRICS=1 at startup, or POST /admin/metrics
+metrics = StoreMetrics(basket_count=lambda: len(basket_store))
+metrics.instrument_all(STORE_HOT_PATHS)
+metrics.instrument(Template, "render")
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+def get_basket(request: Request) -> ShoppingCart:
+    basket = basket_store.load(request.state.basket_id)
+    # Lines keep the price they were added at; an admin may have changed it since
+    basket.reprice()
+    return basket
+
+def render_product_card(product: Product) -> Markup:
+    key = (product.product_id, catalog_versions.product_version(product.product_id))
+    html = card_cache.get(key)
+    if html is None:
+        html = templates.get_template("partials/product_card.html").render(product=product)
+        card_cache.set(key, html)
+    return Markup(html)
+
+templates.env.globals["product_card"] = render_product_card
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates or "*" in candidates
+
+def cached_page(request: Request, name: str, key: tuple, build_context) -> Response:
+    # The ETag is derived from the key alone, so a matching If-None-Match skips rendering entirely
+    key = (name, str(request.base_url)) + key
+    etag = '"%s"' % hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    html = page_cache.get(key)
+    if html is None:
+        context = build_context()
+        context["request"] = request
+        html = templates.get_template(name).render(context)
+        page_cache.set(key, html)
+    return HTMLResponse(html, headers=headers)
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    return templates.TemplateResponse("index.html", {
-        "request": request,
+    top_sellers = best_sellers.top(3)
+    key = (catalog_versions.version, tuple((p.product_id, sold) for p, sold in top_sellers))
+    return cached_page(request, "index.html", key, lambda: {
         "families": families,
-        "featured_products": products[:6]
+        "featured_products": products[:6],
+        "best_sellers": top_sellers
     })
 
+def facet_selections(request: Request) -> dict:
+    # Checked facet values arrive as repeated query parameters, e.g. ?board_type=longboard&board_type=SUP
+    selections = {}
+    for facet in FACET_NAMES:
+        values = request.query_params.getlist(facet)[:FACET_VALUES_LIMIT]
+        if values:
+            selections[facet] = tuple(sorted(set(values)))
+    return selections
+
+def product_listing(request: Request, name: str, family_id: Optional[int], category_id: Optional[int]) -> Response:
+    selections = facet_selections(request)
+
+    def build_context():
+        result = facet_index.search(selections, family_id or None, category_id or None)
+        filtered_products = result.products
+        if not selections:
+            # Unfiltered listings keep each category's own product order
+            filtered_products = products
+            family = catalog.get_family(family_id) if family_id else None
+            if category_id:
+                category = catalog.get_category(category_id)
+                if category and (family is None or category.family is family):
+                    filtered_products = category.products_view
+                else:
+                    filtered_products = ()
+            elif family:
+                filtered_products = family.products_view
+
+        scope = {key: value for key, value in (("family_id", family_id), ("category_id", category_id)) if value}
+        return {
+            "products": filtered_products,
+            "facets": result.facets,
+            "has_selections": bool(selections),
+            "clear_url": "/products" + ("?" + urlencode(scope) if scope else ""),
+            "families": families,
+            "selected_family_id": family_id,
+            "selected_category_id": category_id
+        }
+
+    # Facet counts only cover products in scope, so the scope's version covers them too
+    key = (family_id, category_id, tuple(selections.items()), catalog_versions.scope_version(family_id, category_id))
+    return cached_page(request, name, key, build_context)
+
 @app.get("/products", response_class=HTMLResponse)
 async def products_page(request: Request, family_id: Optional[int] = None, category_id: Optional[int] = None):
-    filtered_products = products
-
-    if family_id:
-        family = next((f for f in families if f.family_id == family_id), None)
-        if family:
-            filtered_products = family.get_all_products()
-
-    if category_id:
-        filtered_products = [p for p in filtered_products if p.category.category_id == category_id]
-
-    return templates.TemplateResponse("products.html", {
+    return product_listing(request, "products.html", family_id, category_id)
+
+@app.get("/products/facets", response_class=HTMLResponse)
+async def product_facets(request: Request, family_id: Optional[int] = None, category_id: Optional[int] = None):
+    response = product_listing(request, "partials/product_results.html", family_id, category_id)
+    # The address bar shows the full page, so a filtered listing can be bookmarked or reloaded
+    response.headers["HX-Push-Url"] = "/products" + ("?" + request.url.query if request.url.query else "")
+    return response
+
+@app.get("/search", response_class=HTMLResponse)
+async def search_products(request: Request, q: str = "", limit: int = SEARCH_RESULTS_LIMIT):
+    query = q.strip()[:100]
+    return templates.TemplateResponse("partials/search_results.html", {
         "request": request,
-        "products": filtered_products,
-        "families": families,
-        "selected_family_id": family_id,
-        "selected_category_id": category_id
+        "query": query,
+        "results": search_index.search(query, max(1, min(limit, 50))) if query else []
     })
 
 @app.post("/cart/add")
-async def add_to_basket(product_id: int = Form(...), quantity: int = Form(1)):
+async def add_to_basket(request: Request, product_id: int = Form(...), quantity: int = Form(1)):
     product = get_product_by_id(product_id)
     if not product or not product.is_available(quantity):
         raise HTTPException(status_code=400, detail="Product not available")
 
-    if product_id in basket_items:
-        basket_items[product_id] += quantity
-    else:
-        basket_items[product_id] = quantity
+    basket = get_basket(request)
+    basket.add_item(product, quantity)
+    basket_store.save(request.state.basket_id, basket)
 
-    total_items = sum(basket_items.values())
-    return {"success": True, "cart_count": total_items}
+    return {"success": True, "cart_count": basket.get_item_count()}
+
+def basket_context(basket: ShoppingCart) -> dict:
+    # The price total is kept by the basket itself; weights come from the quote engine's slots
+    return {
+        "cart_items": basket.items,
+        "line_count": len(basket),
+        "total": basket.get_total(),
+        "shipping_quotes": shipping_quotes.quote_basket(basket.get_quantities())
+    }
 
 @app.get("/cart", response_class=HTMLResponse)
 async def cart_page(request: Request):
-    basket_products = []
-    total = 0
-
-    for product_id, quantity in basket_items.items():
-        product = get_product_by_id(product_id)
-        if product:
-            subtotal = product.price * quantity
-            basket_products.append({
-                "product": product,
-                "quantity": quantity,
-                "subtotal": subtotal
-            })
-            total += subtotal
-
-    return templates.TemplateResponse("cart.html", {
-        "request": request,
-        "cart_items": basket_products,
-        "total": total
-    })
+    return templates.TemplateResponse("cart.html", {"request": request, **basket_context(get_basket(request))})
 
 @app.post("/cart/update")
-async def update_basket(product_id: int = Form(...), quantity: int = Form(...)):
+async def update_basket(request: Request, product_id: int = Form(...), quantity: int = Form(...)):
+    basket = get_basket(request)
+    product = get_product_by_id(product_id)
     if quantity <= 0:
-        basket_items.pop(product_id, None)
+        if product:
+            basket.remove_item(product)
+    elif product and product.is_available(quantity):
+        basket.set_quantity(product, quantity)
     else:
-        product = get_product_by_id(product_id)
-        if product and product.is_available(quantity):
-            basket_items[product_id] = quantity
-        else:
-            raise HTTPException(status_code=400, detail="Insufficient stock")
+        raise HTTPException(status_code=400, detail="Insufficient stock")
+    basket_store.save(request.state.basket_id, basket)
 
-    return RedirectResponse(url="/cart", status_code=303)
+    if not request.headers.get("HX-Request"):
+        return RedirectResponse(url="/cart", status_code=303)
+    if not len(basket):
+        return Response(headers={"HX-Refresh": "true"})
+    # Swap just the changed line, with the totals and basket count updated out of band
+    return templates.TemplateResponse("partials/cart_update.html", {
+        "request": request,
+        "item": basket.get_line(product_id),
+        "item_count": basket.get_item_count(),
+        "oob": True,
+        **basket_context(basket)
+    })
 
 @app.get("/checkout", response_class=HTMLResponse)
 async def checkout_page(request: Request):
-    if not basket_items:
+    basket = get_basket(request)
+    if not len(basket):
         return RedirectResponse(url="/cart", status_code=303)
-
-    basket_products = []
-    total = 0
-
-    for product_id, quantity in basket_items.items():
-        product = get_product_by_id(product_id)
-        if product:
-            subtotal = product.price * quantity
-            basket_products.append({
-                "product": product,
-                "quantity": quantity,
-                "subtotal": subtotal
-            })
-            total += subtotal
-
-    return templates.TemplateResponse("checkout.html", {
-        "request": request,
-        "cart_items": basket_products,
-        "total": total
-    })
+    return templates.TemplateResponse("checkout.html", {"request": request, "form": {}, **basket_context(basket)})
+
+def find_or_create_customer(first_name: str, last_name: str, email: str, phone: str, address: str) -> Customer:
+    # Repeat buyers are matched on email for their running totals. Anyone can type an email into the
+    # checkout form, so a matched customer's stored details are never changed or shown from here.
+    customer = catalog.get_customer_by_email(email)
+    if customer is None:
+        customer = Customer(repository.next_id('customer'), first_name, last_name, email, phone, address)
+        catalog.add_customer(customer)
+        repository.add_customer(customer)
+    return customer
+
+def abandon_checkout(reservation: Reservation, order: Optional[Order]):
+    reservations.release(reservation)
+    if order:
+        if order.payment:
+            order.payment.refund()
+        order.update_status(OrderStatus.CANCELLED)
+        # The order was never saved, so it shouldn't linger in the customer's history
+        order.customer.remove_order(order)
 
 @app.post("/checkout/process")
 async def process_checkout(
@@ -149,33 +412,60 @@ async def process_checkout(
     email: str = Form(...),
     phone: str = Form(...),
     address: str = Form(...),
-    payment_method: str = Form(...)
+    payment_method: str = Form(...),
+    delivery_method: str = Form(StandardDelivery.METHOD_NAME),
+    expected_total: Optional[str] = Form(None)
 ):
-    global next_order_id, next_customer_id
-
-    if not basket_items:
+    basket = get_basket(request)
+    if not len(basket):
         raise HTTPException(status_code=400, detail="Basket is empty")
-
-    customer = Customer(next_customer_id, first_name, last_name, email, phone, address)
-    customers.append(customer)
-    next_customer_id += 1
-
-    order = Order(next_order_id, customer)
-
-    for product_id, quantity in basket_items.items():
-        product = get_product_by_id(product_id)
-        if product and product.is_available(quantity):
-            order.add_order_detail(product, quantity)
-
-    payment = Payment(next_order_id, order, payment_method)
-    payment.process_payment()
-
-    delivery = Delivery(next_order_id, order, address)
-
-    orders_db.append(order)
-    next_order_id += 1
-
-    basket_items.clear()
+    if expected_total is not None and expected_total != f"{basket.get_total():.2f}":
+        # A price changed after the checkout page was shown: show the new total before taking payment
+        form = {"first_name": first_name, "last_name": last_name, "email": email, "phone": phone,
+                "address": address, "payment_method": payment_method, "delivery_method": delivery_method}
+        return templates.TemplateResponse("checkout.html", {
+            "request": request, "form": form, "price_changed": True, **basket_context(basket)}, status_code=409)
+
+    try:
+        reservation = reservations.reserve(basket.get_quantities())
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    order = None
+    try:
+        customer = find_or_create_customer(first_name, last_name, email, phone, address)
+
+        order_id = repository.next_id('order')
+        order = Order(order_id, customer, contact=OrderContact(first_name, last_name, email, phone))
+
+        for item in basket.items:
+            order.add_order_detail(item['product'], item['quantity'], reserved=True)
+
+        payment = create_payment(payment_method, order_id, order, email=email)
+        if not await payment_pipeline.submit(payment, f"order-{order_id}"):
+            raise PaymentDeclinedError(f"Payment was not approved ({payment.status.value})")
+
+        delivery = create_delivery(delivery_method, order_id, order, address, STORE_PICKUP_LOCATION)
+        reservations.commit(reservation)
+    except PaymentDeclinedError as e:
+        abandon_checkout(reservation, order)
+        raise HTTPException(status_code=402, detail=str(e))
+    except ValueError as e:
+        abandon_checkout(reservation, order)
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        abandon_checkout(reservation, order)
+        raise
+
+    repository.add_order(order)
+    repository.save_stock(reservation.products.values())
+    for detail in order.order_details:
+        best_sellers.increment(detail.product, detail.quantity)
+    if journal:
+        # Confirm only once the order is on disk; concurrent checkouts share one fsync
+        await journal.flushed()
+
+    basket_store.delete(request.state.basket_id)
 
     return templates.TemplateResponse("order_confirmation.html", {
         "request": request,
@@ -184,22 +474,147 @@ async def process_checkout(
         "delivery": delivery
     })
 
+@app.get("/track/{tracking_number}", response_class=HTMLResponse)
+async def track_delivery(request: Request, tracking_number: str):
+    delivery = tracking_index.get(tracking_number)
+    if delivery is None:
+        raise HTTPException(status_code=404, detail="No delivery with that tracking number")
+    return templates.TemplateResponse("track.html", {
+        "request": request,
+        "delivery": delivery,
+        "order": delivery.order,
+        "steps": [step for step in TRACKING_STEPS
+                  if not (step == DeliveryStatus.IN_TRANSIT and isinstance(delivery, PickupDelivery))]
+    })
+
+def stream_template(name: str, context: dict):
+    # Jinja yields tiny pieces; group them so each network write carries a useful chunk
+    buffer, size = [], 0
+    for piece in templates.get_template(name).generate(context):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= STREAM_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
 @app.get("/admin", response_class=HTMLResponse)
-async def admin_page(request: Request):
-    return templates.TemplateResponse("admin.html", {
+async def admin_page(request: Request, stream: bool = False):
+    context = {"request": request, "families": families, "stats": aggregates}
+
+    if stream:
+        # Every row, rendered and sent as it is produced
+        context.update(product_rows=products, next_product_cursor=None,
+                       order_items=reversed(orders_db), next_order_cursor=None)
+        return StreamingResponse(stream_template("admin.html", context), media_type="text/html")
+
+    product_rows, next_product_cursor = catalog.page_products(limit=ADMIN_PRODUCTS_PAGE_SIZE)
+    order_items, next_order_cursor = repository.page_orders(limit=ADMIN_ORDERS_PAGE_SIZE)
+    context.update(product_rows=product_rows, next_product_cursor=next_product_cursor,
+                   order_items=order_items, next_order_cursor=next_order_cursor)
+    return templates.TemplateResponse("admin.html", context)
+
+@app.get("/admin/products/rows", response_class=HTMLResponse)
+async def admin_product_rows(request: Request, after: int = 0, limit: int = ADMIN_PRODUCTS_PAGE_SIZE):
+    product_rows, next_product_cursor = catalog.page_products(after, max(1, min(limit, 500)))
+    return templates.TemplateResponse("partials/admin_product_rows.html", {
+        "request": request,
+        "product_rows": product_rows,
+        "next_product_cursor": next_product_cursor
+    })
+
+@app.get("/admin/orders/items", response_class=HTMLResponse)
+async def admin_order_items(request: Request, before: Optional[int] = None, limit: int = ADMIN_ORDERS_PAGE_SIZE):
+    order_items, next_order_cursor = repository.page_orders(before, max(1, min(limit, 100)))
+    return templates.TemplateResponse("partials/admin_order_items.html", {
         "request": request,
-        "products": products,
-        "orders": orders_db,
-        "families": families
+        "order_items": order_items,
+        "next_order_cursor": next_order_cursor
     })
 
+@app.get("/admin/stats")
+async def admin_stats():
+    return aggregates.to_dict()
+
+@app.get("/admin/export/orders.{format}")
+async def export_orders_endpoint(format: str, since: Optional[str] = None, until: Optional[str] = None,
+                                 status: Optional[List[str]] = Query(None)):
+    if format not in surf_store.EXPORT_FORMATS:
+        raise HTTPException(status_code=404, detail=f"Unsupported format: {format}")
+    try:
+        chunks = surf_store.export_orders(orders_db, format, surf_store.parse_date(since),
+                                          surf_store.parse_date(until), surf_store.parse_statuses(status))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return export_response(chunks, f"orders.{format}")
+
+@app.get("/admin/export/products.{format}")
+async def export_products_endpoint(format: str):
+    if format not in surf_store.EXPORT_FORMATS:
+        raise HTTPException(status_code=404, detail=f"Unsupported format: {format}")
+    return export_response(surf_store.export_products(catalog, format), f"products.{format}")
+
+def export_response(chunks, filename: str) -> StreamingResponse:
+    # The first chunk is produced before the headers are sent, so an export that fails on its first
+    # rows answers with an error rather than a 200 and an empty file
+    chunks = iter(chunks)
+    first = next(chunks, "")
+    media_type = "text/csv" if filename.endswith(".csv") else "application/x-ndjson"
+    return StreamingResponse(itertools.chain((first,), chunks), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.post("/admin/orders/import")
+async def import_orders_endpoint(request: Request, format: str = "jsonl", batch_size: int = 500):
+    # Body is JSON lines (one order per line) or CSV (one order line per row)
+    readers = {"jsonl": surf_store.read_jsonl, "csv": surf_store.read_csv}
+    if format not in readers:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    text = (await request.body()).decode("utf-8-sig")
+
+    def record_sales(imported: List[Order]):
+        for order in imported:
+            for detail in order.order_details:
+                best_sellers.increment(detail.product, detail.quantity, at=order.order_date.timestamp())
+
+    importer = surf_store.OrderImporter(catalog, repository, reservations, max(1, min(batch_size, 5000)),
+                             on_commit=record_sales)
+    report = surf_store.ImportReport()
+    for _ in importer.process(readers[format](text.splitlines()), report):
+        # Let checkouts run between batches
+        await asyncio.sleep(0)
+    if journal:
+        await journal.flushed()
+    return report.to_dict()
+
+@app.get("/metrics")
+async def metrics_page():
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.post("/admin/metrics")
+async def toggle_metrics(enabled: bool = Form(...)):
+    if enabled:
+        metrics.enable()
+    else:
+        metrics.disable()
+    return {"enabled": metrics.enabled}
+
+@app.post("/admin/dispatch")
+async def run_dispatch_wave():
+    moved = await dispatch_scheduler.run_wave()
+    return {"wave": moved, **dispatch_scheduler.stats()}
+
 @app.post("/admin/product/update")
 async def update_product_stock(product_id: int = Form(...), stock: int = Form(...)):
-    product = get_product_by_id(product_id)
-    if product:
-        product.stock_quantity = stock
+    if get_product_by_id(product_id):
+        with reservations.locked([product_id]):
+            product = catalog.update_product(product_id, stock_quantity=stock)
+        repository.save_stock([product])
+        if journal:
+            await journal.flushed()
         return {"success": True}
     raise HTTPException(status_code=404, detail="Product not found")
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
@@ -0,0 +1 @@
+# Benchmarks for the surf store. Run each module with `python -m benchmarks.<name>`.
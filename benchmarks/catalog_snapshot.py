@@ -0,0 +1,122 @@
+"""Catalog cold start: Python literals, SQLite and a binary snapshot.
+
+Each way of getting a catalog runs in a fresh interpreter, timed from before
+the first surf_store import:
+
+  literals          a generated module of product tuples, built into model objects
+                    the way create_sample_data does (its bytecode cached by a warm-up run)
+  sqlite            SQLiteRepository.load_catalog()
+  snapshot lazy     CatalogSnapshot opened, first page of products and one lookup
+  snapshot full     CatalogSnapshot.load_catalog(), every product built and indexed
+
+    python -m benchmarks.catalog_snapshot --products 100000 --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from .synthetic import build_catalog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_SIZE = 24
+
+CHILDREN = {
+    "literals": """
+from surf_store import Catalog, ProductFamily, ProductCategory, SurfBoard, Wetsuit, Accessory
+import catalog_literals
+classes = {"SurfBoard": SurfBoard, "Wetsuit": Wetsuit, "Accessory": Accessory}
+families = {family_id: ProductFamily(family_id, name, description)
+            for family_id, name, description in catalog_literals.FAMILIES}
+categories = {category_id: ProductCategory(category_id, name, description, families[family_id])
+              for category_id, family_id, name, description in catalog_literals.CATEGORIES}
+products = [classes[kind](product_id, name, description, price, stock, categories[category_id], *fields)
+            for kind, product_id, name, description, price, stock, category_id, *fields in catalog_literals.PRODUCTS]
+catalog = Catalog(families.values(), products)
+count = len(catalog.products)
+""",
+    "sqlite": """
+from surf_store import SQLiteRepository
+repository = SQLiteRepository(DB_PATH)
+count = len(repository.load_catalog().products)
+""",
+    "snapshot lazy": f"""
+from surf_store import CatalogSnapshot
+snapshot = CatalogSnapshot(SNAPSHOT_PATH)
+page, cursor = snapshot.page_products(0, {PAGE_SIZE})
+snapshot.get_product(page[-1].product_id)
+count = len(snapshot)
+""",
+    "snapshot full": """
+from surf_store import CatalogSnapshot
+count = len(CatalogSnapshot(SNAPSHOT_PATH).load_catalog().products)
+""",
+}
+
+
+def run_child(body: str, directory: str, db_path: str, snapshot_path: str) -> dict:
+    code = (f"import json, sys, time\nstarted = time.perf_counter()\nsys.path.insert(0, {directory!r})\n"
+            f"DB_PATH, SNAPSHOT_PATH = {db_path!r}, {snapshot_path!r}\n{body}\n"
+            "print(json.dumps({'count': count, 'seconds': time.perf_counter() - started}))")
+    # The literals module is timed from cached bytecode, as a deployed create_sample_data would be
+    env = {key: value for key, value in os.environ.items()
+           if not key.startswith("SURF_STORE_") and key != "PYTHONDONTWRITEBYTECODE"}
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def write_literals(catalog, path: str):
+    from surf_store.repository import PRODUCT_TYPES
+    with open(path, "w", encoding="utf-8") as module:
+        module.write("FAMILIES = [\n")
+        for family in catalog.families:
+            module.write(f"    {(family.family_id, family.name, family.description)!r},\n")
+        module.write("]\nCATEGORIES = [\n")
+        for family in catalog.families:
+            for category in family.categories:
+                module.write(f"    {(category.category_id, family.family_id, category.name, category.description)!r},\n")
+        module.write("]\nPRODUCTS = [\n")
+        for product in catalog.products:
+            kind = type(product).__name__
+            row = (kind, product.product_id, product.name, product.description, product.price,
+                   product.stock_quantity, product.category.category_id,
+                   *(getattr(product, field) for field in PRODUCT_TYPES[kind][1]))
+            module.write(f"    {row!r},\n")
+        module.write("]\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from surf_store import SQLiteRepository, write_catalog_snapshot
+    directory = tempfile.mkdtemp(prefix="catalog-snapshot-")
+    catalog = build_catalog(args.products, family_sets=max(1, args.products // 20000))
+    write_literals(catalog, os.path.join(directory, "catalog_literals.py"))
+    db_path = os.path.join(directory, "store.db")
+    repository = SQLiteRepository(db_path)
+    repository.save_catalog(catalog)
+    repository.close()
+    snapshot_path = os.path.join(directory, "catalog.snap")
+    snapshot_bytes = write_catalog_snapshot(catalog, snapshot_path)
+    print(f"{args.products:,} products, snapshot {snapshot_bytes / 1e6:.1f} MB, "
+          f"median of {args.repeat} fresh interpreters")
+
+    results = {}
+    for name, body in CHILDREN.items():
+        run_child(body, directory, db_path, snapshot_path)
+        runs = [run_child(body, directory, db_path, snapshot_path) for _ in range(args.repeat)]
+        results[name] = statistics.median(run["seconds"] for run in runs)
+        assert runs[0]["count"] == args.products, (name, runs[0]["count"])
+    baseline = results["literals"]
+    for name, seconds in results.items():
+        print(f"{name:>16} {seconds * 1000:>10.1f} ms {baseline / seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Tracking lookups against a scan of the order history, and dispatch wave throughput.
+
+    python -m benchmarks.dispatch --orders 100000
+"""
+import argparse
+import asyncio
+import random
+import time
+from surf_store import InMemoryRepository, TrackingIndex, DispatchScheduler
+from .synthetic import build_catalog, build_orders
+
+
+def scan_lookup(orders, tracking_number: str):
+    for order in orders:
+        if order.delivery and order.delivery.tracking_number == tracking_number:
+            return order.delivery
+    return None
+
+
+def time_lookups(lookup, numbers, loops: int) -> float:
+    started = time.perf_counter()
+    for number in numbers[:loops]:
+        lookup(number)
+    return (time.perf_counter() - started) / min(loops, len(numbers)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.products, args.customers, seed=args.seed)
+    repository = InMemoryRepository()
+    repository.save_catalog(catalog)
+    repository.add_orders(build_orders(catalog, args.orders, seed=args.seed))
+    orders = repository.orders
+
+    started = time.perf_counter()
+    index = TrackingIndex(orders)
+    print(f"index of {len(index):,} deliveries built in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    numbers = [order.delivery.tracking_number for order in orders]
+    random.Random(args.seed).shuffle(numbers)
+    indexed = time_lookups(index.get, numbers, args.lookups)
+    scanned = time_lookups(lambda number: scan_lookup(orders, number), numbers, max(1, args.lookups // 1000))
+    print(f"lookup: index {indexed:.2f} us, scan {scanned:,.0f} us ({scanned / indexed:,.0f}x)")
+
+    saved = []
+    scheduler = DispatchScheduler(index, on_wave=lambda changed: saved.append(len(changed)))
+    for _ in range(3):
+        started = time.perf_counter()
+        moved = asyncio.run(scheduler.run_wave())
+        elapsed = time.perf_counter() - started
+        count = sum(moved.values())
+        print(f"wave: {count:,} deliveries in {elapsed * 1000:.1f} ms ({count / elapsed:,.0f}/s), "
+              f"one save of {saved[-1]:,} orders: {moved}")
+    print(f"deliveries by status: {index.counts()}")
+
+
+if __name__ == "__main__":
+    main()
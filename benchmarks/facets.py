@@ -0,0 +1,93 @@
+"""Faceted filtering with FacetIndex bitmaps against scanning the products.
+
+Random shopper selections (one to three facets, one or two values each) are
+answered both ways, results and every facet's counts included, and checked
+to agree. Stock changes that cross zero are then timed, as each one flips
+the product's availability bit.
+
+    python -m benchmarks.facets --products 100000 --queries 500
+"""
+import argparse
+import random
+import time
+from surf_store.facets import FacetIndex, FACET_NAMES, PRICE_BANDS, IN_STOCK
+from .synthetic import build_catalog
+
+
+def facet_values(product) -> dict:
+    values = {facet: getattr(product, facet, None) for facet in FACET_NAMES}
+    values['price'] = next(value for value, _, low, high in PRICE_BANDS if low <= product.price < high)
+    values['availability'] = IN_STOCK if product.stock_quantity > 0 else None
+    return values
+
+
+def scan(products, selections: dict):
+    """The same answer by walking every product: matches, and per-facet counts."""
+    matches, counts = [], {facet: {} for facet in FACET_NAMES}
+    for product in products:
+        values = facet_values(product)
+        failed = [facet for facet, chosen in selections.items() if values[facet] not in chosen]
+        if not failed:
+            matches.append(product)
+        for facet in FACET_NAMES:
+            # A product counts towards a facet when only that facet's own selection could exclude it
+            if values[facet] is not None and (not failed or failed == [facet]):
+                counts[facet][values[facet]] = counts[facet].get(values[facet], 0) + 1
+    return matches, counts
+
+
+def make_selections(index: FacetIndex, count: int, rng: random.Random):
+    options = {facet: list(index._bitmaps[facet]) for facet in FACET_NAMES if index._bitmaps[facet]}
+    selections = []
+    for _ in range(count):
+        chosen = {}
+        for facet in rng.sample(sorted(options), rng.randint(1, 3)):
+            chosen[facet] = rng.sample(options[facet], min(len(options[facet]), rng.randint(1, 2)))
+        selections.append(chosen)
+    return selections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--stock-changes", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.products, seed=args.seed, family_sets=max(1, args.products // 20000))
+    started = time.perf_counter()
+    index = FacetIndex(catalog.products, catalog=catalog)
+    print(f"indexed {len(index):,} products in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(args.seed)
+    selections = make_selections(index, args.queries, rng)
+    started = time.perf_counter()
+    results = [index.search(chosen) for chosen in selections]
+    bitmap_ms = (time.perf_counter() - started) / len(selections) * 1000
+
+    checked = selections[:max(1, args.queries // 10)]
+    started = time.perf_counter()
+    scanned = [scan(catalog.products, chosen) for chosen in checked]
+    scan_ms = (time.perf_counter() - started) / len(checked) * 1000
+    agree = all(result.products == matches and
+                all(option["count"] == counts[facet["name"]].get(option["value"], 0)
+                    for facet in result.facets for option in facet["options"])
+                for result, (matches, counts) in zip(results, scanned))
+    print(f"filter + counts: bitmaps {bitmap_ms:.3f} ms/query, scan {scan_ms:.3f} ms/query "
+          f"({scan_ms / bitmap_ms:.0f}x), {sum(len(r) for r in results) / len(results):,.0f} matches on average, "
+          f"agree: {agree}")
+
+    products = catalog.products
+    started = time.perf_counter()
+    for _ in range(args.stock_changes):
+        product = rng.choice(products)
+        product.stock_quantity = 0 if product.stock_quantity else rng.randint(1, 20)
+    elapsed = time.perf_counter() - started
+    print(f"stock changes crossing zero: {elapsed / args.stock_changes * 1e6:.1f} us each, bitmaps included")
+    in_stock = index.search({'availability': [IN_STOCK]}).total
+    print(f"in-stock count matches a scan: {in_stock == sum(1 for p in products if p.stock_quantity > 0)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Bulk order import throughput: OrderImporter batches versus one order at a time.
+
+The one-at-a-time path mirrors web checkout: a reservation, a customer lookup
+by email and an order per record, each written to the repository on its own.
+
+    python -m benchmarks.ingest --orders 20000 --batch-size 500 --sqlite
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from surf_store import (Customer, Order, InMemoryRepository, SQLiteRepository, StockReservationEngine,
+                        OrderImporter, read_jsonl)
+from .synthetic import build_catalog
+
+
+def make_feed(catalog, count: int, seed: int = 7):
+    rng = random.Random(seed)
+    product_ids = [p.product_id for p in catalog.products]
+    for n in range(count):
+        lines = [{"product_id": product_id, "quantity": rng.randint(1, 3)}
+                 for product_id in rng.sample(product_ids, rng.randint(1, 8))]
+        customer = rng.randint(1, max(1, count // 4))
+        yield json.dumps({
+            "reference": f"MKT-{n}",
+            "customer": {"first_name": "Buyer", "last_name": str(customer), "email": f"buyer{customer}@example.com",
+                         "phone": "0", "address": "1 Beach Road"},
+            "lines": lines,
+        })
+
+
+def make_repository(catalog, sqlite_path: str = None):
+    if sqlite_path:
+        repository = SQLiteRepository(sqlite_path)
+        repository.save_catalog(catalog)
+        return repository
+    return InMemoryRepository(catalog)
+
+
+def run_single(catalog, repository, feed):
+    engine = StockReservationEngine(catalog.get_product)
+    started = time.perf_counter()
+    for record in read_jsonl(feed):
+        reservation = engine.reserve({int(l["product_id"]): int(l["quantity"]) for l in record["lines"]})
+        fields = record["customer"]
+        customer = catalog.get_customer_by_email(fields["email"])
+        if customer is None:
+            customer = Customer(repository.next_id('customer'), fields["first_name"], fields["last_name"],
+                                fields["email"], fields["phone"], fields["address"])
+            catalog.add_customer(customer)
+            repository.add_customer(customer)
+        order = Order(repository.next_id('order'), customer)
+        for product_id, quantity in reservation.lines.items():
+            order.add_order_detail(reservation.products[product_id], quantity, reserved=True)
+        engine.commit(reservation)
+        repository.add_order(order)
+        repository.save_stock(reservation.products.values())
+    return time.perf_counter() - started
+
+
+def run_batched(catalog, repository, feed, batch_size: int):
+    report = OrderImporter(catalog, repository, batch_size=batch_size).run(read_jsonl(feed))
+    return report.elapsed_seconds, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--sqlite", action="store_true", help="also measure against a SQLite repository")
+    args = parser.parse_args()
+
+    feed = list(make_feed(build_catalog(args.products), args.orders))
+    backends = [("memory", None)]
+    workdir = tempfile.mkdtemp()
+    if args.sqlite:
+        backends.append(("sqlite", os.path.join(workdir, "{}.db")))
+
+    print(f"{'backend':>8} {'mode':>8} {'orders/s':>10}")
+    for backend, path in backends:
+        for mode in ("single", "batched"):
+            catalog = build_catalog(args.products)
+            for product in catalog.products:
+                product.stock_quantity = 10 ** 9
+            repository = make_repository(catalog, path.format(mode) if path else None)
+            if mode == "single":
+                elapsed = run_single(catalog, repository, feed)
+            else:
+                elapsed, report = run_batched(catalog, repository, feed, args.batch_size)
+            print(f"{backend:>8} {mode:>8} {args.orders / elapsed:>10,.0f}")
+            repository.close()
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
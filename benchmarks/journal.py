@@ -0,0 +1,135 @@
+"""Event journal throughput: recording changes, group commit under concurrent writers, and replay.
+
+A synthetic store is attached to a journal in a temporary directory and a
+stream of stock changes, delivery updates (which cascade to their orders) and
+new paid orders is recorded. The store is then rebuilt by replay(), from the
+journal and then from a fresh snapshot, and checked against the live one.
+
+    python -m benchmarks.journal --events 1000000 --writers 64
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from surf_store import (EventJournal, InMemoryRepository, Order, DeliveryStatus, DELIVERY_METHODS, PAYMENT_METHODS,
+                        create_delivery, create_payment, replay)
+from .synthetic import build_catalog, build_orders
+
+DELIVERY_STEPS = (DeliveryStatus.DISPATCHED, DeliveryStatus.IN_TRANSIT, DeliveryStatus.DELIVERED)
+
+
+def record_events(catalog, repository, count: int, seed: int):
+    """Make count model changes: mostly stock, then delivery updates and new orders."""
+    rng = random.Random(seed)
+    products, customers, orders = catalog.products, catalog.customers, repository.orders
+    next_order_id = orders[-1].order_id + 1 if orders else 1
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.7:
+            rng.choice(products).stock_quantity = rng.randint(0, 50)
+        elif roll < 0.9 and orders:
+            order = rng.choice(orders)
+            order.delivery.update_status(rng.choice(DELIVERY_STEPS))
+        else:
+            order = Order(next_order_id, rng.choice(customers))
+            for product in rng.sample(products, rng.randint(1, 3)):
+                order.add_order_detail(product, rng.randint(1, 2), reserved=True)
+            create_payment(rng.choice(PAYMENT_METHODS), next_order_id, order, card_number="4242").process_payment()
+            create_delivery(rng.choice(DELIVERY_METHODS).METHOD_NAME, next_order_id, order, order.customer.address,
+                            "TC Surf Store, 1 Beach Road, Brighton")
+            repository.add_order(order)
+            next_order_id += 1
+
+
+async def concurrent_writers(catalog, journal: EventJournal, writers: int, changes: int) -> float:
+    """Each writer changes stock and waits for it to be durable, as checkout does; returns mean wait in ms."""
+    waits = []
+
+    async def writer(number: int):
+        rng = random.Random(number)
+        for _ in range(changes):
+            rng.choice(catalog.products).stock_quantity = rng.randint(0, 50)
+            started = time.perf_counter()
+            await journal.flushed()
+            waits.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(writer(number) for number in range(writers)))
+    return sum(waits) / len(waits) * 1000
+
+
+def same_state(catalog, orders, state) -> bool:
+    if [p.stock_quantity for p in catalog.products] != [state.catalog.get_product(p.product_id).stock_quantity
+                                                        for p in catalog.products]:
+        return False
+    return [(o.order_id, o.status, o.payment.status, o.delivery.status) for o in orders] == \
+        [(o.order_id, o.status, o.payment.status, o.delivery.status) for o in state.orders]
+
+
+def timed_replay(directory: str):
+    started = time.perf_counter()
+    state = replay(directory)
+    return state, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=20000, help="order history in the first snapshot")
+    parser.add_argument("--events", type=int, default=200000, help="model changes to journal")
+    parser.add_argument("--writers", type=int, default=64, help="concurrent writers waiting on durability")
+    parser.add_argument("--changes", type=int, default=50, help="changes per concurrent writer")
+    parser.add_argument("--no-fsync", action="store_true", help="write without fsync (page cache only)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.products, args.customers, seed=args.seed)
+    repository = InMemoryRepository()
+    repository.save_catalog(catalog)
+    repository.add_orders(build_orders(catalog, args.orders, seed=args.seed))
+    directory = tempfile.mkdtemp(prefix="journal-")
+    # Snapshots are left to the end, so replay reads every record from the journal
+    journal = EventJournal(directory, snapshot_every=10 ** 12, fsync=not args.no_fsync)
+    journal.attach(catalog, repository.orders)
+    journal.wait()
+
+    started = time.perf_counter()
+    record_events(catalog, repository, args.events, args.seed)
+    queued = time.perf_counter() - started
+    journal.wait()
+    durable = time.perf_counter() - started
+    records, commits = journal.seq, journal.commits
+    print(f"recorded {args.events:,} changes as {records:,} records: {queued:.2f}s to queue "
+          f"({records / queued:,.0f} records/s), {durable:.2f}s until durable, {commits:,} commits")
+
+    for writers in (1, args.writers):
+        seq, commits = journal.seq, journal.commits
+        started = time.perf_counter()
+        mean_wait = asyncio.run(concurrent_writers(catalog, journal, writers, args.changes))
+        elapsed = time.perf_counter() - started
+        written = journal.seq - seq
+        print(f"{writers:>4} writers: {written / elapsed:>10,.0f} durable changes/s, "
+              f"{written / max(1, journal.commits - commits):>6.1f} per fsync, mean wait {mean_wait:.3f} ms")
+
+    journal_bytes = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+                        if name.startswith("journal-"))
+    state, elapsed = timed_replay(directory)
+    print(f"replay from journal: {state.journal_records:,} records ({journal_bytes / 1e6:.1f} MB) over a "
+          f"{state.snapshot_records:,}-record snapshot in {elapsed:.2f}s "
+          f"({(state.journal_records + state.snapshot_records) / elapsed:,.0f} records/s)")
+    print(f"state matches the live store: {same_state(catalog, repository.orders, state)}")
+
+    journal.snapshot()
+    journal.close()
+    snapshot_bytes = os.path.getsize(os.path.join(directory, "snapshot.jsonl"))
+    state, elapsed = timed_replay(directory)
+    print(f"replay from snapshot: {state.snapshot_records:,} records ({snapshot_bytes / 1e6:.1f} MB) "
+          f"in {elapsed:.2f}s ({state.snapshot_records / elapsed:,.0f} records/s), "
+          f"{len(state.orders):,} orders")
+    print(f"state matches the live store: {same_state(catalog, repository.orders, state)}")
+
+
+if __name__ == "__main__":
+    main()
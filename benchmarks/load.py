@@ -0,0 +1,276 @@
+"""In-process load test of the FastAPI app over httpx's ASGI transport.
+
+A synthetic store (products, customers and order history) is written to a
+temporary SQLite database and the app is started on it. Virtual users then
+run a weighted mix of scenarios against it:
+
+    browse   /, /products (whole catalog or one category), /search
+    buy      /products, /cart/add, /cart, /checkout/process
+    admin    /admin
+
+Throughput, p50/p95/p99 latency per route and allocation counts are printed,
+and can be saved as JSON and compared with an earlier run:
+
+    python -m benchmarks.load --products 5000 --scenarios 2000 --output before.json
+    python -m benchmarks.load --products 5000 --scenarios 2000 --compare before.json
+"""
+import argparse
+import asyncio
+import gc
+import importlib
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+import httpx
+from surf_store import SQLiteRepository, DELIVERY_METHODS, PAYMENT_METHODS
+from .synthetic import build_catalog, build_orders
+
+DEFAULT_MIX = "browse=70,buy=25,admin=5"
+SEARCH_TERMS = ["board", "wet", "leash", "wax", "fins", "long", "short", "3/2", "firewire", "pro", "sup", "tee"]
+
+
+def build_store(path: str, args) -> dict:
+    """Write the synthetic store to SQLite; returns what the scenarios need to pick from."""
+    catalog = build_catalog(args.products, args.customers, seed=args.seed, family_sets=args.family_sets)
+    # Plenty of stock, so checkouts measure the happy path rather than stock-outs
+    for product in catalog.products:
+        product.stock_quantity = args.stock
+    repository = SQLiteRepository(path)
+    repository.save_catalog(catalog)
+    repository.add_orders(build_orders(catalog, args.orders, seed=args.seed))
+    repository.close()
+    return {
+        "product_ids": [p.product_id for p in catalog.products],
+        "scopes": [(c.family.family_id, c.category_id) for f in catalog.families for c in f.categories],
+        "customers": [(c.first_name, c.last_name, c.email, c.phone, c.address) for c in catalog.customers],
+    }
+
+
+def load_app(db_path: str, payment_latency_ms: float):
+    os.environ["SURF_STORE_DB"] = db_path
+    os.environ["SURF_STORE_PAYMENT_LATENCY_MS"] = str(payment_latency_ms)
+    os.environ.pop("SURF_STORE_BASKETS", None)
+    module = importlib.import_module("app")
+    # httpx's ASGI transport sends no lifespan events, so load the store directly
+    module.load_store()
+    return module
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name.strip()!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.enabled = True
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+        if self.enabled:
+            self.latencies[route].append(elapsed)
+            if response.status_code >= 400:
+                self.errors[route] += 1
+        return response
+
+
+async def browse(client, recorder, rng, store):
+    await recorder.request(client, "GET /", "GET", "/")
+    if rng.random() < 0.5:
+        await recorder.request(client, "GET /products", "GET", "/products")
+    else:
+        family_id, category_id = rng.choice(store["scopes"])
+        await recorder.request(client, "GET /products?category", "GET", "/products",
+                               params={"family_id": family_id, "category_id": category_id})
+    await recorder.request(client, "GET /search", "GET", "/search", params={"q": rng.choice(SEARCH_TERMS)})
+
+
+async def buy(client, recorder, rng, store):
+    family_id, category_id = rng.choice(store["scopes"])
+    await recorder.request(client, "GET /products?category", "GET", "/products",
+                           params={"family_id": family_id, "category_id": category_id})
+    for product_id in rng.sample(store["product_ids"], rng.randint(1, 3)):
+        await recorder.request(client, "POST /cart/add", "POST", "/cart/add",
+                               data={"product_id": product_id, "quantity": rng.randint(1, 2)})
+    await recorder.request(client, "GET /cart", "GET", "/cart")
+    if store["customers"] and rng.random() < 0.5:
+        first_name, last_name, email, phone, address = rng.choice(store["customers"])
+    else:
+        n = rng.randrange(10 ** 9)
+        first_name, last_name, email, phone, address = "Load", str(n), f"load{n}@example.com", "0", "1 Beach Road"
+    await recorder.request(client, "POST /checkout/process", "POST", "/checkout/process", data={
+        "first_name": first_name, "last_name": last_name, "email": email, "phone": phone, "address": address,
+        "payment_method": rng.choice(PAYMENT_METHODS),
+        "delivery_method": rng.choice(DELIVERY_METHODS).METHOD_NAME,
+    })
+
+
+async def admin(client, recorder, rng, store):
+    await recorder.request(client, "GET /admin", "GET", "/admin")
+
+
+SCENARIOS = {"browse": browse, "buy": buy, "admin": admin}
+
+
+async def drive(app, store: dict, mix: Dict[str, int], users: int, scenarios: int, recorder: Recorder, seed: int):
+    remaining = scenarios
+    names, weights = list(mix), list(mix.values())
+
+    async def user(number: int):
+        nonlocal remaining
+        rng = random.Random(seed * 1000 + number)
+        # One client per user, so each keeps its own basket cookie
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://store") as client:
+            while remaining > 0:
+                remaining -= 1
+                await SCENARIOS[rng.choices(names, weights)[0]](client, recorder, rng, store)
+
+    await asyncio.gather(*(user(number) for number in range(users)))
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": len(values) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(values) / len(values) * 1000,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": values[-1] * 1000,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: dict):
+    total = results["total"]
+    print(f"{total['requests']} requests in {results['elapsed_seconds']:.2f}s "
+          f"({total['rps']:,.0f} req/s, {total['errors']} errors) at commit {results['commit']}")
+    print(f"{'route':>26} {'count':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, stats in sorted(results["routes"].items()) + [("total", total)]:
+        print(f"{route:>26} {stats['requests']:>7} {stats['errors']:>5} {stats['rps']:>8,.0f} "
+              f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+    allocations = results["allocations"]
+    print("allocations: " + ", ".join(f"{name}={value:,}" for name, value in allocations.items()))
+
+
+def print_comparison(results: dict, baseline: dict):
+    print(f"\nversus {baseline.get('commit', '?')} (negative is faster / fewer):")
+    print(f"{'route':>26} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    rows = sorted(results["routes"].items()) + [("total", results["total"])]
+    for route, stats in rows:
+        before = baseline["total"] if route == "total" else baseline.get("routes", {}).get(route)
+        if not before:
+            continue
+        changes = [(stats[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+                   for key in ("rps", "p50_ms", "p95_ms", "p99_ms")]
+        print(f"{route:>26} " + " ".join(f"{change:>+8.1f}%" for change in changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=2000, help="order history written before the run")
+    parser.add_argument("--family-sets", type=int, default=1)
+    parser.add_argument("--stock", type=int, default=10 ** 6)
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--scenarios", type=int, default=1000, help="scenarios to run after warmup")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--payment-latency-ms", type=float, default=0.0)
+    parser.add_argument("--trace-malloc", action="store_true", help="record peak traced memory (slows the run)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    db_path = os.path.join(tempfile.mkdtemp(), "load.db")
+    store = build_store(db_path, args)
+    module = load_app(db_path, args.payment_latency_ms)
+    recorder = Recorder()
+
+    async def run():
+        recorder.enabled = False
+        await drive(module.app, store, mix, args.users, args.warmup, recorder, args.seed + 1)
+        recorder.enabled = True
+
+        gc.collect()
+        collections = sum(stat["collections"] for stat in gc.get_stats())
+        blocks = sys.getallocatedblocks()
+        if args.trace_malloc:
+            tracemalloc.start()
+        started = time.perf_counter()
+        await drive(module.app, store, mix, args.users, args.scenarios, recorder, args.seed)
+        elapsed = time.perf_counter() - started
+
+        allocations = {
+            "gc_collections": sum(stat["collections"] for stat in gc.get_stats()) - collections,
+            "allocated_blocks_delta": sys.getallocatedblocks() - blocks,
+        }
+        if args.trace_malloc:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            allocations.update(traced_current_bytes=current, traced_peak_bytes=peak)
+        await module.payment_pipeline.close()
+        return elapsed, allocations
+
+    elapsed, allocations = asyncio.run(run())
+    every_latency = [value for values in recorder.latencies.values() for value in values]
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "elapsed_seconds": elapsed,
+        "total": summarize(every_latency, sum(recorder.errors.values()), elapsed),
+        "routes": {route: summarize(values, recorder.errors[route], elapsed)
+                   for route, values in recorder.latencies.items()},
+        "allocations": allocations,
+    }
+    print_results(results)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            print_comparison(results, json.load(baseline))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Memory held per product and per customer: dict-backed objects, slotted models and ColumnarCatalog.
+
+Each representation is built from the same rows and measured with tracemalloc.
+Strings are copied fresh inside each build, as if they had just been read from
+the database, so the measurement includes the text each representation keeps.
+"legacy" mirrors the models before they had __slots__: one __dict__ per
+object, no string interning and a ShoppingCart built with every Customer.
+
+    python -m benchmarks.memory --products 200000 --customers 200000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from surf_store import ColumnarCatalog, Customer, ShoppingCart
+from surf_store.repository import PRODUCT_TYPES
+from .synthetic import build_catalog
+
+
+class LegacyProduct:
+    def __init__(self, product_id, name, description, price, stock_quantity, category, **attributes):
+        self.product_id = product_id
+        self.name = name
+        self.description = description
+        self.price = price
+        self.stock_quantity = stock_quantity
+        self.category = category
+        self.__dict__.update(attributes)
+
+
+class LegacyCustomer:
+    def __init__(self, customer_id, first_name, last_name, email, phone, address):
+        self.customer_id = customer_id
+        self.first_name = first_name
+        self.last_name = last_name
+        self.email = email
+        self.phone = phone
+        self.address = address
+        self.orders = []
+        self.shopping_cart = ShoppingCart()
+
+
+def fresh(value):
+    return value.encode().decode() if isinstance(value, str) else value
+
+
+def product_rows(catalog):
+    rows = []
+    for product in catalog.products:
+        product_class, fields = PRODUCT_TYPES[type(product).__name__]
+        rows.append((product_class, fields, product.product_id, product.name, product.description,
+                     product.price, product.stock_quantity, product.category,
+                     tuple(getattr(product, field) for field in fields)))
+    return rows
+
+
+def customer_rows(count):
+    return [(n, "Buyer", str(n), f"buyer{n}@example.com", "0", "1 Beach Road") for n in range(1, count + 1)]
+
+
+def measure(build, rows):
+    """Bytes still allocated by whatever build(rows) returns, and how long it took."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    kept = build(rows)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, elapsed, kept
+
+
+def legacy_products(rows):
+    return [LegacyProduct(pid, fresh(name), fresh(description), price, stock, category,
+                          **{field: fresh(value) for field, value in zip(fields, values)})
+            for _, fields, pid, name, description, price, stock, category, values in rows]
+
+
+def slotted_products(rows):
+    return [product_class(pid, fresh(name), fresh(description), price, stock, category, *map(fresh, values))
+            for product_class, _, pid, name, description, price, stock, category, values in rows]
+
+
+def columnar_products(rows):
+    store = ColumnarCatalog()
+    for product_class, fields, pid, name, description, price, stock, category, values in rows:
+        store.append(product_class.__name__, pid, fresh(name), fresh(description), price, stock, category,
+                     {field: fresh(value) for field, value in zip(fields, values)})
+    return store
+
+
+def legacy_customers(rows):
+    return [LegacyCustomer(*map(fresh, row)) for row in rows]
+
+
+def lazy_customers(rows):
+    return [Customer(*map(fresh, row)) for row in rows]
+
+
+def scan(products):
+    """A typical read path: stock value across the catalog."""
+    started = time.perf_counter()
+    total = sum(p.price * p.stock_quantity for p in products)
+    return time.perf_counter() - started, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--customers", type=int, default=200000)
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.products)
+    rows = product_rows(catalog)
+    # Slotted products register with their category; empty the categories between runs
+    categories = [category for family in catalog.families for category in family.categories]
+    for category in categories:
+        category.products.clear()
+    del catalog
+
+    print(f"{'products':>20} {'MiB':>9} {'bytes/each':>11} {'build ms':>9} {'scan ms':>8}")
+    for name, build in (("legacy (__dict__)", legacy_products), ("models (__slots__)", slotted_products),
+                        ("ColumnarCatalog", columnar_products)):
+        size, elapsed, products = measure(build, rows)
+        if isinstance(products, ColumnarCatalog):
+            scan_started = time.perf_counter()
+            sum(price * stock for price, stock in zip(products.prices, products.stock))
+            scan_time = time.perf_counter() - scan_started
+        else:
+            scan_time, _ = scan(products)
+        print(f"{name:>20} {size / 2 ** 20:>9.1f} {size / len(rows):>11.0f} {elapsed * 1000:>9.0f} "
+              f"{scan_time * 1000:>8.1f}")
+        del products
+        for category in categories:
+            category.products.clear()
+
+    rows = customer_rows(args.customers)
+    print(f"\n{'customers':>20} {'MiB':>9} {'bytes/each':>11} {'build ms':>9}")
+    for name, build in (("legacy (eager cart)", legacy_customers), ("models (lazy cart)", lazy_customers)):
+        size, elapsed, customers = measure(build, rows)
+        print(f"{name:>20} {size / 2 ** 20:>9.1f} {size / len(rows):>11.0f} {elapsed * 1000:>9.0f}")
+        del customers
+
+
+if __name__ == "__main__":
+    main()
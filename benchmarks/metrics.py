@@ -0,0 +1,92 @@
+"""Cost of StoreMetrics on the hot paths: never enabled, enabled, and disabled again.
+
+Each hot-path method is timed in a tight loop, and a page request is timed
+through the app's middleware stack. With metrics off the methods are the
+original functions, so "off" and "off again" should match within noise.
+
+    python -m benchmarks.metrics --loops 200000 --requests 2000
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import time
+import httpx
+from surf_store import Customer, Order, StandardDelivery, ShippingQuoteEngine
+from .synthetic import build_catalog
+
+
+def time_loop(fn, loops: int) -> float:
+    started = time.perf_counter()
+    for _ in range(loops):
+        fn()
+    return (time.perf_counter() - started) / loops * 1e9
+
+
+def hot_paths(catalog, loops: int) -> dict:
+    product = catalog.products[0]
+    customer = Customer(1, "Bench", "Mark", "bench@example.com", "0", "1 Beach Road")
+    order = Order(1, customer)
+    delivered = Order(2, customer)
+    delivered.add_order_detail(product, 2, reserved=True)
+    delivery = StandardDelivery(1, delivered, customer.address)
+    engine = ShippingQuoteEngine(catalog)
+    product_ids = [p.product_id for p in catalog.products[:1000]]
+
+    def add_line():
+        # Keep the order small so list growth doesn't dominate
+        if len(order.order_details) > 1000:
+            order.order_details.clear()
+        order.add_order_detail(product, 1, reserved=True)
+
+    results = {
+        "Catalog.get_product": time_loop(lambda: catalog.get_product(product_ids[0]), loops),
+        "Order.add_order_detail": time_loop(add_line, loops),
+        "StandardDelivery.calculate_shipping_cost": time_loop(delivery.calculate_shipping_cost, loops),
+        "ShippingQuoteEngine.quote_weight": time_loop(lambda: engine.quote_weight(12.5), loops // 4),
+    }
+    engine.close()
+    return results
+
+
+def request_latency(app, requests: int) -> float:
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://store") as client:
+            await client.get("/cart")
+            started = time.perf_counter()
+            for _ in range(requests):
+                await client.get("/cart")
+            return (time.perf_counter() - started) / requests * 1e6
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--loops", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.products)
+    # The app's own StoreMetrics is switched, so the same wrappers time both loops and requests
+    os.environ["SURF_STORE_PAYMENT_LATENCY_MS"] = "0"
+    app = importlib.import_module("app")
+    app.load_store()
+
+    rows = []
+    for state, switch in (("off", None), ("on", "enable"), ("off again", "disable")):
+        if switch:
+            getattr(app.metrics, switch)()
+        timings = hot_paths(catalog, args.loops)
+        timings["GET /cart (us)"] = request_latency(app.app, args.requests)
+        rows.append((state, timings))
+
+    names = list(rows[0][1])
+    print(f"{'ns per call':>42} " + " ".join(f"{state:>10}" for state, _ in rows) + f" {'on/off':>8}")
+    for name in names:
+        off, on = rows[0][1][name], rows[1][1][name]
+        print(f"{name:>42} " + " ".join(f"{timings[name]:>10.1f}" for _, timings in rows) + f" {on / off:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
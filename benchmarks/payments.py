@@ -0,0 +1,104 @@
+"""Checkout throughput with payments charged inline versus through PaymentPipeline.
+
+Inline mode charges each payment with a blocking call inside the request, as
+checkout used to, so the event loop does one payment at a time. Pipeline mode
+submits to a pool of asyncio workers in front of SimulatedGateway.
+
+    python -m benchmarks.payments --checkouts 500 --clients 64 --workers 8 32 64 --latency-ms 200
+"""
+import argparse
+import asyncio
+import time
+from surf_store import Customer, Order, PaymentPipeline, SimulatedGateway, create_payment
+from .search import percentile
+from .synthetic import build_catalog
+
+
+def make_orders(catalog, count: int, start_id: int):
+    customer = Customer(1, "Bench", "Customer", "bench@example.com", "0", "1 Beach Road")
+    orders = []
+    for n in range(count):
+        order = Order(start_id + n, customer)
+        product = catalog.products[n % len(catalog.products)]
+        order.add_order_detail(product, 1, reserved=True)
+        orders.append(order)
+    return orders
+
+
+async def drive(orders, clients: int, checkout):
+    queue = asyncio.Queue()
+    for order in orders:
+        queue.put_nowait(order)
+    latencies = []
+
+    async def client():
+        while not queue.empty():
+            order = queue.get_nowait()
+            started = time.perf_counter()
+            await checkout(order)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return len(orders) / (time.perf_counter() - started), latencies
+
+
+def run_inline(orders, clients: int, latency_ms: float):
+    async def checkout(order):
+        payment = create_payment("Credit Card", order.order_id, order)
+        time.sleep(latency_ms / 1000)
+        payment.process_payment()
+
+    return asyncio.run(drive(orders, clients, checkout))
+
+
+def run_pipeline(orders, clients: int, workers: int, args):
+    gateway = SimulatedGateway(args.latency_ms, args.jitter_ms, args.failure_rate, seed=1)
+    pipeline = PaymentPipeline(gateway, workers=workers, timeout_seconds=args.timeout, backoff_seconds=0.01)
+
+    async def checkout(order):
+        payment = create_payment("Credit Card", order.order_id, order)
+        await pipeline.submit(payment, f"order-{order.order_id}")
+
+    async def main():
+        try:
+            return await drive(orders, clients, checkout)
+        finally:
+            await pipeline.close()
+
+    throughput, latencies = asyncio.run(main())
+    return throughput, latencies, pipeline.stats()
+
+
+def report(label: str, throughput: float, latencies, extra: str = ""):
+    print(f"{label:>14} {throughput:>10,.1f} {percentile(latencies, 50) * 1000:>9.0f} "
+          f"{percentile(latencies, 99) * 1000:>9.0f}  {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checkouts", type=int, default=500)
+    parser.add_argument("--clients", type=int, default=64, help="concurrent checkouts in flight")
+    parser.add_argument("--workers", type=int, nargs="+", default=[8, 32, 64])
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    parser.add_argument("--skip-inline", action="store_true")
+    args = parser.parse_args()
+
+    catalog = build_catalog(1000)
+    print(f"{'mode':>14} {'checkouts/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    if not args.skip_inline:
+        # Blocking payments serialise everything, so a smaller run is enough
+        orders = make_orders(catalog, min(args.checkouts, 50), 1)
+        report("inline", *run_inline(orders, args.clients, args.latency_ms))
+    for n, workers in enumerate(args.workers):
+        orders = make_orders(catalog, args.checkouts, (n + 1) * 1000000)
+        throughput, latencies, stats = run_pipeline(orders, args.clients, workers, args)
+        report(f"pipeline x{workers}", throughput, latencies,
+               f"retried {stats['retried']}, failed {stats['failed']}")
+
+
+if __name__ == "__main__":
+    main()
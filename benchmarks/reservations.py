@@ -0,0 +1,103 @@
+"""Checkout throughput of StockReservationEngine as concurrent checkouts grow.
+
+Each worker thread runs reserve -> simulated payment -> commit. Striped locks
+are compared against a single stripe, which behaves like one global inventory
+lock, in three cases:
+
+- spread: every worker checks out its own SKUs, with --hold-ms of stock I/O
+  (a write-through to a shared store, say) inside each locked section
+- hot: every worker buys the same SKU, so the stock I/O of all of them lands
+  on one stripe however many there are
+- in-memory: the spread case with nothing held under the lock but the stock
+  check and decrement themselves
+
+Striping only pays off when a locked section waits on something that releases
+the GIL. In-memory checks and decrements are a few microseconds of Python, so
+threads queue on the GIL whichever lock they take, and the in-memory case
+stays around 1x. Hot SKUs are serialized by design.
+
+    python -m benchmarks.reservations --threads 1 4 8 --hold-ms 1
+"""
+import argparse
+import threading
+import time
+from contextlib import contextmanager
+from surf_store import ProductFamily, ProductCategory, Accessory, StockReservationEngine
+
+
+class HeldReservationEngine(StockReservationEngine):
+    """Spends hold_seconds inside every locked section, as stock I/O would."""
+
+    def __init__(self, product_lookup, stripes: int, hold_seconds: float):
+        super().__init__(product_lookup, stripes=stripes)
+        self.hold_seconds = hold_seconds
+
+    @contextmanager
+    def locked(self, product_ids):
+        with super().locked(product_ids):
+            if self.hold_seconds:
+                time.sleep(self.hold_seconds)
+            yield
+
+
+def build_products(count: int):
+    family = ProductFamily(1, "Bench", "Synthetic family")
+    category = ProductCategory(1, "Bench", "Synthetic category", family)
+    return {i: Accessory(i, f"SKU {i}", "Synthetic product", 9.99, 10 ** 9, category, "wax")
+            for i in range(1, count + 1)}
+
+
+def run(threads: int, stripes: int, checkouts: int, lines: int, payment_ms: float, hold_ms: float,
+        products: dict, hot: bool = False) -> float:
+    engine = HeldReservationEngine(products.get, stripes, hold_ms / 1000)
+    per_thread = checkouts // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(worker_id: int):
+        # Distinct SKUs per worker: worker k owns ids k+1, k+1+threads, ...; hot workers all share SKU 1
+        skus = [1] if hot else list(range(worker_id + 1, len(products) + 1, threads))
+        barrier.wait()
+        for n in range(per_thread):
+            basket = {skus[(n * lines + j) % len(skus)]: 1 for j in range(lines)}
+            reservation = engine.reserve(basket)
+            if payment_ms:
+                time.sleep(payment_ms / 1000)
+            engine.commit(reservation)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return per_thread * threads / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--checkouts", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=3, help="basket lines per checkout")
+    parser.add_argument("--skus", type=int, default=4096)
+    parser.add_argument("--stripes", type=int, default=64)
+    parser.add_argument("--payment-ms", type=float, default=1.0,
+                        help="simulated payment time between reserve and commit, outside the lock")
+    parser.add_argument("--hold-ms", type=float, default=1.0,
+                        help="simulated stock I/O inside each locked section")
+    args = parser.parse_args()
+
+    products = build_products(args.skus)
+    cases = (("spread", args.hold_ms, False), ("hot", args.hold_ms, True), ("in-memory", 0.0, False))
+    print(f"{'case':>9} {'threads':>7} {'global lock/s':>14} {'striped/s':>12} {'speedup':>8}")
+    for name, hold_ms, hot in cases:
+        for threads in args.threads:
+            single = run(threads, 1, args.checkouts, args.lines, args.payment_ms, hold_ms, products, hot)
+            striped = run(threads, args.stripes, args.checkouts, args.lines, args.payment_ms, hold_ms, products,
+                          hot)
+            print(f"{name:>9} {threads:>7} {single:>14,.0f} {striped:>12,.0f} {striped / single:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
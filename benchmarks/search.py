@@ -0,0 +1,63 @@
+"""Type-ahead latency of SearchIndex on a large synthetic catalog.
+
+    python -m benchmarks.search --products 100000 --queries 5000
+"""
+import argparse
+import random
+import time
+from surf_store.search import SearchIndex
+from .synthetic import build_catalog, BRANDS, BOARD_MODELS, ADJECTIVES, DESCRIPTION_WORDS
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def make_queries(count: int, rng: random.Random):
+    words = [w.lower() for w in BRANDS + BOARD_MODELS + ADJECTIVES + DESCRIPTION_WORDS]
+    words += ["longboard", "shortboard", "wetsuit", "4/3mm", "5/4", "leash", "fins", "thruster", "sup"]
+    queries = []
+    for _ in range(count):
+        phrase = " ".join(rng.sample(words, rng.choice([1, 1, 2, 3])))
+        # Simulate typing: a random-length prefix of the phrase
+        queries.append(phrase[:rng.randint(2, len(phrase))])
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--baseline", action="store_true",
+                        help="also time the old substring scan for comparison")
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.products)
+    start = time.perf_counter()
+    index = SearchIndex(catalog.products, catalog=catalog)
+    print(f"indexed {len(index):,} products in {time.perf_counter() - start:.2f}s")
+
+    queries = make_queries(args.queries, random.Random(7))
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, args.limit)
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"search  p50={percentile(timings, 50):.3f}ms  p95={percentile(timings, 95):.3f}ms  "
+          f"p99={percentile(timings, 99):.3f}ms  max={max(timings):.3f}ms")
+
+    if args.baseline:
+        timings = []
+        for query in queries[:200]:
+            keyword = query.lower()
+            start = time.perf_counter()
+            [p for p in catalog.products
+             if keyword in p.name.lower() or keyword in p.description.lower()][:args.limit]
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"scan    p50={percentile(timings, 50):.3f}ms  p99={percentile(timings, 99):.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
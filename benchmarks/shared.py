@@ -0,0 +1,95 @@
+"""Checkout stock throughput across worker processes sharing one catalog segment.
+
+The parent publishes a synthetic catalog with SharedCatalog.create(). For each
+worker count, that many fresh processes attach to it, bind their own copy of
+the catalog and run checkouts (reserve a basket, then commit or release it)
+through SharedStockReservationEngine, with zero-copy price and stock reads in
+between. Afterwards the units left in the segment are checked against the
+units each worker reports having sold.
+
+    python -m benchmarks.shared --products 5000 --seconds 3 --workers 1,2,4,8
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from surf_store import SharedCatalog, SharedStockReservationEngine
+from .synthetic import build_catalog
+
+START_STOCK = 10 ** 9
+
+
+def worker(name: str, products: int, seed: int, number: int, seconds: float, reads: int, start, results):
+    catalog = build_catalog(products, seed=seed)
+    shared = SharedCatalog.attach(name)
+    shared.bind(catalog)
+    engine = SharedStockReservationEngine(catalog.get_product, shared)
+    product_ids = shared.product_ids()
+    rng = random.Random(number)
+    checkouts = sold = read = 0
+    start.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        shared.sync()
+        basket = {product_id: rng.randint(1, 2) for product_id in rng.sample(product_ids, rng.randint(1, 3))}
+        reservation = engine.reserve(basket)
+        if rng.random() < 0.9:
+            engine.commit(reservation)
+            sold += sum(basket.values())
+        else:
+            engine.release(reservation)
+        checkouts += 1
+        # Listing pages read prices and stock straight from the segment
+        for product_id in rng.sample(product_ids, reads):
+            read += shared.stock(product_id) > 0 and shared.price(product_id) > 0
+    shared.close()
+    results.put((checkouts, sold, read))
+
+
+def run(shared: SharedCatalog, args, workers: int) -> dict:
+    for product_id in shared.product_ids():
+        shared.set_stock(product_id, START_STOCK)
+    context = multiprocessing.get_context("spawn")
+    start, results = context.Barrier(workers + 1), context.Queue()
+    processes = [context.Process(target=worker, args=(shared.name, args.products, args.seed, number, args.seconds,
+                                                      args.reads, start, results))
+                 for number in range(workers)]
+    for process in processes:
+        process.start()
+    start.wait()
+    counts = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    checkouts, sold, reads = (sum(column) for column in zip(*counts))
+    remaining = sum(shared.stock(product_id) for product_id in shared.product_ids())
+    return {"checkouts": checkouts / args.seconds, "reads": reads / args.seconds,
+            "consistent": START_STOCK * len(shared) - remaining == sold}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--reads", type=int, default=20, help="price and stock reads per checkout")
+    parser.add_argument("--workers", default=",".join(str(n) for n in (1, 2, 4, 8) if n <= (os.cpu_count() or 1))
+                        or "1", help="comma-separated worker counts")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    shared = SharedCatalog.create(build_catalog(args.products, seed=args.seed), f"surf_store_bench_{os.getpid()}")
+    print(f"{os.cpu_count()} cores, {len(shared):,} products")
+    print(f"{'workers':>8} {'checkouts/s':>12} {'speedup':>8} {'reads/s':>12}  stock consistent")
+    try:
+        baseline = None
+        for workers in (int(n) for n in args.workers.split(",")):
+            result = run(shared, args, workers)
+            baseline = baseline or result["checkouts"]
+            print(f"{workers:>8} {result['checkouts']:>12,.0f} {result['checkouts'] / baseline:>7.2f}x "
+                  f"{result['reads']:>12,.0f}  {result['consistent']}")
+    finally:
+        shared.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Bulk shipping quotes: per-order polymorphic pricing versus ShippingQuoteEngine.
+
+The per-order path is what quoting used to cost: walk each order's lines
+calling get_shipping_weight() on every product, once per delivery method.
+The engine walks each order once over precomputed weights, and uses NumPy
+for the arithmetic when it is installed.
+
+    python -m benchmarks.shipping --orders 20000
+"""
+import argparse
+import time
+from surf_store import InMemoryRepository, ShippingQuoteEngine, DELIVERY_METHODS, import_orders, read_jsonl
+from surf_store import shipping
+from .ingest import make_feed
+from .synthetic import build_catalog
+
+
+def quote_per_order(orders):
+    columns = {method.METHOD_NAME: [] for method in DELIVERY_METHODS}
+    for order in orders:
+        for method in DELIVERY_METHODS:
+            weight = sum(d.product.get_shipping_weight() * d.quantity for d in order.order_details)
+            columns[method.METHOD_NAME].append(method.quote(weight))
+    return columns
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--products", type=int, default=5000)
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.products)
+    for product in catalog.products:
+        product.stock_quantity = 10 ** 9
+    repository = InMemoryRepository(catalog)
+    import_orders(read_jsonl(make_feed(catalog, args.orders)), catalog, repository)
+    orders = repository.orders
+
+    build_time, engine = timed(ShippingQuoteEngine, catalog)
+    baseline, expected = timed(quote_per_order, orders)
+    results = [("per order", baseline)]
+    numpy = shipping.np
+    if numpy is not None:
+        elapsed, quoted = timed(engine.quote_orders, orders)
+        results.append(("engine (numpy)", elapsed))
+        shipping.np = None
+    elapsed, quoted = timed(engine.quote_orders, orders)
+    shipping.np = numpy
+    results.append(("engine (python)", elapsed))
+
+    for name in expected:
+        assert all(abs(a - b) < 1e-9 for a, b in zip(expected[name], quoted[name])), name
+    print(f"{len(orders)} orders, weights precomputed in {build_time * 1000:.1f} ms")
+    print(f"{'mode':>16} {'ms':>9} {'orders/s':>12}")
+    for name, elapsed in results:
+        print(f"{name:>16} {elapsed * 1000:>9.1f} {len(orders) / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
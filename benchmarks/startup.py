@@ -0,0 +1,95 @@
+"""Worker boot time: importing the package and the app, loading the store, serving the first page.
+
+Each measurement runs in a fresh interpreter, the way a uvicorn worker
+starts. It runs once on the built-in sample data and once on a prebuilt
+synthetic SQLite store.
+
+    python -m benchmarks.startup --products 20000 --orders 20000 --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from .synthetic import build_catalog, build_orders
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ("import surf_store", "import app", "load_store", "first GET /")
+
+# Runs in the child interpreter; httpx and asyncio are imported first as the server would have them already
+CHILD = """
+import asyncio, json, time, httpx
+started = time.perf_counter()
+marks = []
+import surf_store
+marks.append(time.perf_counter())
+import app
+marks.append(time.perf_counter())
+app.load_store()
+marks.append(time.perf_counter())
+
+async def first_page():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://store") as client:
+        return (await client.get("/")).status_code
+
+status = asyncio.run(first_page())
+marks.append(time.perf_counter())
+print(json.dumps({"status": status, "products": len(app.products),
+                  "marks": [mark - started for mark in marks]}))
+"""
+
+
+def run_child(db_path: str = None) -> dict:
+    env = {key: value for key, value in os.environ.items() if not key.startswith("SURF_STORE_")}
+    if db_path:
+        env["SURF_STORE_DB"] = db_path
+    output = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env, capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def build_store(path: str, products: int, orders: int):
+    from surf_store import SQLiteRepository
+    catalog = build_catalog(products, max(1, orders // 4))
+    repository = SQLiteRepository(path)
+    repository.save_catalog(catalog)
+    repository.add_orders(build_orders(catalog, orders))
+    repository.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "startup.db")
+    build_store(db_path, args.products, args.orders)
+
+    results = {}
+    for store, path in (("sample data", None), (f"sqlite {args.products} products", db_path)):
+        runs = [run_child(path) for _ in range(args.repeat)]
+        marks = [statistics.median(run["marks"][i] for run in runs) for i in range(len(PHASES))]
+        # Each phase on its own, then the running total
+        phases = [marks[0]] + [later - earlier for earlier, later in zip(marks, marks[1:])]
+        results[store] = {"products": runs[0]["products"], "status": runs[0]["status"],
+                          "phases_ms": {name: phase * 1000 for name, phase in zip(PHASES, phases)},
+                          "total_ms": marks[-1] * 1000}
+
+    print(f"median of {args.repeat} fresh interpreters, ms")
+    print(f"{'store':>24} " + " ".join(f"{name:>18}" for name in PHASES) + f" {'total':>9}")
+    for store, result in results.items():
+        print(f"{store:>24} " + " ".join(f"{result['phases_ms'][name]:>18.1f}" for name in PHASES)
+              + f" {result['total_ms']:>9.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({"config": vars(args), "results": results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
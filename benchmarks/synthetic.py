@@ -0,0 +1,116 @@
+"""Synthetic surf store catalogs, customers and order history of any size, built from the real model classes."""
+import random
+from datetime import datetime, timedelta
+from typing import List
+from surf_store import (Catalog, Customer, Order, ProductFamily, ProductCategory, SurfBoard, Wetsuit, Accessory,
+                        DELIVERY_METHODS, PAYMENT_METHODS, create_delivery, create_payment)
+
+BRANDS = ["Firewire", "Channel Islands", "Lost", "Pyzel", "Haydenshapes", "Torq", "Rip Curl",
+          "O'Neill", "Xcel", "Patagonia", "Billabong", "Quiksilver", "FCS", "Futures", "Creatures",
+          "Sticky Bumps", "Mr Zogs", "Dakine", "Vissla", "Roark"]
+BOARD_MODELS = ["Seaside", "Sci-Fi", "Puddle Jumper", "Ghost", "Mayhem", "Twin Pin", "Mid Length",
+                "Log", "Pinline", "Chancho", "Rocket", "Dominator", "Evo", "Crossbow", "Cruiser"]
+ADJECTIVES = ["Classic", "Performance", "Pro", "Team", "Grom", "Hybrid", "Vintage", "Elite",
+              "Step-Up", "Everyday", "Competition", "Travel", "Eco", "Carbon", "Soft-Top"]
+DESCRIPTION_WORDS = ["fast", "loose", "stable", "paddle", "glide", "drive", "rail", "rocker", "volume",
+                     "beginner", "advanced", "small", "waves", "barrels", "point", "beach", "reef",
+                     "durable", "lightweight", "flexible", "warm", "comfortable", "grip", "quick-dry"]
+
+BOARD_TYPES = [("longboard", ["9'0\"", "9'2\"", "9'6\"", "10'0\""], ["single fin", "2+1 fin setup"]),
+               ("shortboard", ["5'8\"", "5'10\"", "6'0\"", "6'2\"", "6'4\""], ["thruster", "quad", "twin"]),
+               ("SUP", ["10'6\"", "11'0\"", "12'6\""], ["center fin"])]
+SUIT_TYPES = [("full suit", ["3/2mm", "4/3mm", "5/4mm"]), ("spring suit", ["2mm", "3/2mm"])]
+ACCESSORY_TYPES = [("leash", "All surfboards"), ("wax", "All surfboards"), ("fins", "Shortboards"),
+                   ("tshirt", "Universal"), ("boardshorts", "Universal")]
+FIRST_NAMES = ["Kai", "Sarah", "Mike", "Emma", "Jack", "Leilani", "Tom", "Ana", "Noah", "Mia", "Luke", "Zoe"]
+LAST_NAMES = ["Chen", "Johnson", "Silva", "Kahale", "Smith", "Moreno", "Walsh", "Nakamura", "Brown", "Okafor"]
+STREETS = ["Beach Road", "Ocean Drive", "Pier Street", "Harbour Lane", "Reef Avenue", "Cliff Walk"]
+
+
+def build_catalog(product_count: int, customer_count: int = 0, seed: int = 42, family_sets: int = 1) -> Catalog:
+    """Families and categories mirror the sample data; products are split evenly by subtype.
+
+    family_sets > 1 repeats the three families and their categories (as separate
+    product lines) so larger catalogs also get more families and categories.
+    """
+    rng = random.Random(seed)
+    families, board_lines, suit_lines, accessory_lines = [], [], [], []
+    category_id = 1
+    for number in range(1, family_sets + 1):
+        suffix = f" (Line {number})" if number > 1 else ""
+        boards = ProductFamily(len(families) + 1, f"Surfboards{suffix}", "High-quality surfboards for all skill levels")
+        suits = ProductFamily(len(families) + 2, f"Wetsuits{suffix}", "Premium wetsuits for all water conditions")
+        accessories = ProductFamily(len(families) + 3, f"Surf Accessories{suffix}", "Essential accessories for surfers")
+        families += [boards, suits, accessories]
+
+        board_lines.append({kind: ProductCategory(category_id + i, name, f"{name} for every surfer", boards)
+                            for i, (kind, name) in enumerate(
+                                [("longboard", "Longboards"), ("shortboard", "Shortboards"), ("SUP", "SUP Boards")])})
+        suit_lines.append({kind: ProductCategory(category_id + 3 + i, name, f"{name} for all conditions", suits)
+                           for i, (kind, name) in enumerate([("full suit", "Full Suits"), ("spring suit", "Spring Suits")])})
+        accessory_lines.append({kind: ProductCategory(category_id + 5 + i, name, f"Quality {name.lower()}", accessories)
+                                for i, (kind, name) in enumerate(
+                                    [("leash", "Leashes"), ("wax", "Surf Wax"), ("fins", "Fins"),
+                                     ("tshirt", "T-Shirts"), ("boardshorts", "Boardshorts")])})
+        category_id += 10
+
+    def description():
+        return " ".join(rng.sample(DESCRIPTION_WORDS, 6)).capitalize()
+
+    def line():
+        return rng.randrange(family_sets) if family_sets > 1 else 0
+
+    products = []
+    for product_id in range(1, product_count + 1):
+        brand = rng.choice(BRANDS)
+        price = round(rng.uniform(3, 1500), 2)
+        stock = rng.randint(0, 60)
+        kind = product_id % 3
+        if kind == 0:
+            board_type, lengths, fins = rng.choice(BOARD_TYPES)
+            length = rng.choice(lengths)
+            name = f"{length} {brand} {rng.choice(ADJECTIVES)} {rng.choice(BOARD_MODELS)}"
+            products.append(SurfBoard(product_id, name, description(), price, stock,
+                                      board_lines[line()][board_type], length, board_type, rng.choice(fins)))
+        elif kind == 1:
+            suit_type, thicknesses = rng.choice(SUIT_TYPES)
+            thickness = rng.choice(thicknesses)
+            name = f"{thickness} {brand} {rng.choice(ADJECTIVES)} {suit_type.title()}"
+            products.append(Wetsuit(product_id, name, description(), price, stock,
+                                    suit_lines[line()][suit_type], thickness, suit_type, "neoprene"))
+        else:
+            accessory_type, compatibility = rng.choice(ACCESSORY_TYPES)
+            name = f"{brand} {rng.choice(ADJECTIVES)} {accessory_type.title()}"
+            products.append(Accessory(product_id, name, description(), price, stock,
+                                      accessory_lines[line()][accessory_type], accessory_type, compatibility))
+
+    customers = []
+    for customer_id in range(1, customer_count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        customers.append(Customer(customer_id, first, last, f"{first}.{last}.{customer_id}@example.com".lower(),
+                                  f"555-{customer_id:07d}", f"{rng.randint(1, 400)} {rng.choice(STREETS)}"))
+
+    return Catalog(families, products, customers)
+
+
+def build_orders(catalog: Catalog, order_count: int, seed: int = 42, days: int = 90) -> List[Order]:
+    """Paid, delivered-to-address order history spread over the last `days` days.
+
+    Lines are added as already reserved, so building history leaves stock alone.
+    """
+    if order_count and not catalog.customers:
+        raise ValueError("build_orders needs a catalog with customers")
+    rng = random.Random(seed)
+    now = datetime.now()
+    orders = []
+    for order_id in range(1, order_count + 1):
+        customer = rng.choice(catalog.customers)
+        order = Order(order_id, customer, now - timedelta(seconds=rng.uniform(0, days * 24 * 3600)))
+        for product in rng.sample(catalog.products, min(len(catalog.products), rng.randint(1, 4))):
+            order.add_order_detail(product, rng.randint(1, 3), reserved=True)
+        payment = create_payment(rng.choice(PAYMENT_METHODS), order_id, order, card_number="4242")
+        payment.process_payment()
+        create_delivery(rng.choice(DELIVERY_METHODS).METHOD_NAME, order_id, order, customer.address,
+                        "TC Surf Store, 1 Beach Road, Brighton")
+        orders.append(order)
+    return orders
@@ -1,20 +1,54 @@
 # Surf Store Package
-from .enums import OrderStatus, PaymentStatus, DeliveryStatus
-from .models import (Customer, ProductFamily, ProductCategory, Product,
-                    SurfBoard, Wetsuit, Accessory, ShoppingCart, Inventory)
-from .orders import (Order, OrderDetail, Payment, Delivery,
-                    CreditCardPayment, PayPalPayment, ApplePayPayment,
-                    StandardDelivery, ExpressDelivery, PickupDelivery)
-from .data_structures import ProductOrderNode, ProductOrderLinkedList
-from .demo import create_sample_data, demonstrate_surf_store
+#
+# Names are imported from their submodule on first use, so `import surf_store`
+# is cheap and admin-only or demo code (ingest, exports, columnar, demo) is
+# only loaded by the processes that use it.
+import importlib
 
-__all__ = [
-    'OrderStatus', 'PaymentStatus', 'DeliveryStatus',
-    'Customer', 'ProductFamily', 'ProductCategory', 'Product',
-    'SurfBoard', 'Wetsuit', 'Accessory', 'ShoppingCart', 'Inventory',
-    'Order', 'OrderDetail', 'Payment', 'Delivery',
-    'CreditCardPayment', 'PayPalPayment', 'ApplePayPayment',
-    'StandardDelivery', 'ExpressDelivery', 'PickupDelivery',
-    'ProductOrderNode', 'ProductOrderLinkedList',
-    'create_sample_data', 'demonstrate_surf_store'
-]
\ No newline at end of file
+_EXPORTS = {
+    'enums': ('OrderStatus', 'PaymentStatus', 'DeliveryStatus'),
+    'models': ('Customer', 'ProductFamily', 'ProductCategory', 'Product',
+               'SurfBoard', 'Wetsuit', 'Accessory', 'ShoppingCart', 'Inventory', 'normalize_email'),
+    'orders': ('Order', 'OrderContact', 'OrderDetail', 'Payment', 'Delivery',
+               'CreditCardPayment', 'PayPalPayment', 'ApplePayPayment',
+               'StandardDelivery', 'ExpressDelivery', 'PickupDelivery'),
+    'data_structures': ('ProductOrderNode', 'ProductOrderLinkedList', 'BestSellerTracker', 'WindowedCounter'),
+    'catalog': ('Catalog',),
+    'baskets': ('BasketStore', 'InMemoryBasketStore', 'SQLiteBasketStore'),
+    'reservations': ('StockReservationEngine', 'Reservation', 'InsufficientStockError'),
+    'repository': ('StoreRepository', 'InMemoryRepository', 'SQLiteRepository'),
+    'aggregates': ('StoreAggregates',),
+    'search': ('SearchIndex', 'SubstringIndex'),
+    'facets': ('FacetIndex', 'FacetResult', 'FACETS', 'FACET_NAMES', 'PRICE_BANDS'),
+    'payments': ('PaymentGateway', 'SimulatedGateway', 'PaymentPipeline', 'PaymentGatewayError',
+                 'PaymentDeclinedError', 'PAYMENT_METHODS', 'create_payment'),
+    'ingest': ('OrderImporter', 'ImportReport', 'import_orders', 'read_jsonl', 'read_csv'),
+    'exports': ('export_orders', 'export_order_lines', 'export_products', 'parse_date', 'parse_statuses',
+                'EXPORT_FORMATS', 'ORDER_COLUMNS', 'PRODUCT_COLUMNS'),
+    'shipping': ('ShippingQuoteEngine', 'ShippingQuote', 'DELIVERY_METHODS', 'DELIVERY_METHODS_BY_NAME',
+                 'create_delivery'),
+    'render_cache': ('FragmentCache', 'LRUFragmentCache', 'CatalogVersions'),
+    'columnar': ('ColumnarCatalog', 'ProductView'),
+    'metrics': ('StoreMetrics', 'MetricsMiddleware', 'STORE_HOT_PATHS', 'METRICS_CONTENT_TYPE'),
+    'dispatch': ('TrackingIndex', 'DispatchScheduler', 'WAVE_STEPS'),
+    'journal': ('EventJournal', 'JournalState', 'replay'),
+    'shared': ('SharedCatalog', 'SharedStockReservationEngine'),
+    'catalog_snapshot': ('CatalogSnapshot', 'write_catalog_snapshot', 'SNAPSHOT_VERSION'),
+    'demo': ('create_sample_data', 'demonstrate_surf_store'),
+}
+_MODULE_OF = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULE_OF)
+
+
+def __getattr__(name: str):
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,172 @@
+"""Command line tools for a store database.
+
+    python -m surf_store export orders --db store.db --format csv --since 2025-01-01 --status confirmed
+    python -m surf_store export products --db store.db --format jsonl -o inventory.jsonl
+    python -m surf_store serve --db store.db --workers 4
+    python -m surf_store snapshot --db store.db -o catalog.snap
+    python -m surf_store shipping --db store.db --since 2025-01-01 -o quotes.csv
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+from typing import List
+from .enums import OrderStatus
+from .exports import EXPORT_FORMATS, export_order_lines, export_products, parse_date, parse_statuses
+from .repository import SQLiteRepository
+
+
+def iso_date(value: str) -> datetime:
+    try:
+        return parse_date(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO date: {value!r}")
+
+
+def statuses(value: str) -> List[OrderStatus]:
+    try:
+        return parse_statuses([value])
+    except ValueError:
+        choices = ", ".join(status.value for status in OrderStatus)
+        raise argparse.ArgumentTypeError(f"unknown status in {value!r} (choose from {choices})")
+
+
+def export(args):
+    repository = SQLiteRepository(args.db)
+    # Customers and orders aren't loaded: order rows are written as the cursor returns them
+    catalog = repository.load_catalog(customers=False)
+    if args.dataset == "orders":
+        chosen = [status for group in args.status for status in group] if args.status else None
+        lines = repository.iter_order_lines(args.since, args.until, chosen)
+        chunks = export_order_lines(lines, catalog, args.format)
+    else:
+        chunks = export_products(catalog, args.format)
+
+    output = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+        repository.close()
+
+
+def serve(args):
+    import uvicorn
+    from .catalog import Catalog
+    from .shared import SharedCatalog
+
+    repository = SQLiteRepository(args.db)
+    catalog = repository.load_catalog()
+    if not len(catalog):
+        from .demo import create_sample_data
+        store_data = create_sample_data()
+        catalog = Catalog(store_data['families'], store_data['products'], store_data['customers'])
+        repository.save_catalog(catalog)
+    repository.close()
+
+    # Workers inherit the environment, so they open the same database and attach to the segment
+    shared = SharedCatalog.create(catalog)
+    os.environ["SURF_STORE_DB"] = args.db
+    os.environ["SURF_STORE_SHARED"] = shared.name
+    # A basket must follow its shopper to whichever worker takes the next request
+    os.environ["SURF_STORE_BASKETS"] = (args.baskets or os.environ.get("SURF_STORE_BASKETS")
+                                        or os.path.splitext(args.db)[0] + "-baskets.db")
+    try:
+        uvicorn.run(args.app, host=args.host, port=args.port, workers=args.workers)
+    finally:
+        shared.close()
+
+
+def snapshot(args):
+    from .catalog_snapshot import write_catalog_snapshot
+    if args.db:
+        repository = SQLiteRepository(args.db)
+        catalog = repository.load_catalog()
+        repository.close()
+    else:
+        from .catalog import Catalog
+        from .demo import create_sample_data
+        store_data = create_sample_data()
+        catalog = Catalog(store_data['families'], store_data['products'])
+    size = write_catalog_snapshot(catalog, args.output)
+    print(f"{args.output}: {len(catalog.families)} families, {len(catalog.products)} products, {size:,} bytes",
+          file=sys.stderr)
+
+
+def shipping(args):
+    import csv
+    from .shipping import ShippingQuoteEngine
+
+    repository = SQLiteRepository(args.db)
+    catalog = repository.load_catalog(customers=False)
+    engine = ShippingQuoteEngine(catalog)
+    chosen = [status for group in args.status for status in group] if args.status else None
+    # ORDER_LINES_QUERY columns: order_id first, then product_id and quantity at 9 and 10
+    lines = ((row[0], row[9], row[10]) for row in repository.iter_order_lines(args.since, args.until, chosen))
+    try:
+        columns = engine.quote_order_lines(lines)
+    finally:
+        engine.close()
+        repository.close()
+
+    output = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        writer = csv.writer(output)
+        writer.writerow(columns)
+        writer.writerows(zip(*columns.values()))
+    finally:
+        if args.output:
+            output.close()
+    unknown = sum(columns["unknown_lines"])
+    if unknown:
+        print(f"{unknown} order lines name products not in the catalog and were left out of the weights",
+              file=sys.stderr)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(prog="python -m surf_store", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="stream orders or inventory as CSV or JSONL")
+    export_parser.add_argument("dataset", choices=("orders", "products"))
+    export_parser.add_argument("--db", required=True, help="SQLite store database (SURF_STORE_DB)")
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    export_parser.add_argument("--since", type=iso_date, help="first order date to include (ISO format)")
+    export_parser.add_argument("--until", type=iso_date, help="order date to stop before (ISO format)")
+    export_parser.add_argument("--status", action="append", type=statuses,
+                               help="order status to include; repeat or comma-separate")
+    export_parser.add_argument("-o", "--output", help="file to write instead of stdout")
+    export_parser.set_defaults(handler=export)
+
+    serve_parser = commands.add_parser("serve", help="run the app in several workers sharing one catalog")
+    serve_parser.add_argument("--db", required=True, help="SQLite store database (SURF_STORE_DB)")
+    serve_parser.add_argument("--baskets", help="SQLite basket database (SURF_STORE_BASKETS); "
+                                                "<db name>-baskets.db next to the store database if omitted")
+    serve_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument("--app", default="app:app", help="ASGI app to import in each worker")
+    serve_parser.set_defaults(handler=serve)
+
+    snapshot_parser = commands.add_parser("snapshot", help="write the catalog as a binary snapshot file")
+    snapshot_parser.add_argument("--db", help="SQLite store database (SURF_STORE_DB); the sample catalog if omitted")
+    snapshot_parser.add_argument("-o", "--output", required=True, help="snapshot file to write")
+    snapshot_parser.set_defaults(handler=snapshot)
+
+    shipping_parser = commands.add_parser("shipping", help="quote every delivery method for each order as CSV")
+    shipping_parser.add_argument("--db", required=True, help="SQLite store database (SURF_STORE_DB)")
+    shipping_parser.add_argument("--since", type=iso_date, help="first order date to include (ISO format)")
+    shipping_parser.add_argument("--until", type=iso_date, help="order date to stop before (ISO format)")
+    shipping_parser.add_argument("--status", action="append", type=statuses,
+                                 help="order status to include; repeat or comma-separate")
+    shipping_parser.add_argument("-o", "--output", help="file to write instead of stdout")
+    shipping_parser.set_defaults(handler=shipping)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
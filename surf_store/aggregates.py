@@ -0,0 +1,118 @@
+from typing import Dict, Iterable, List
+from . import events
+from .enums import OrderStatus
+from .catalog import Catalog
+from .models import Product
+from .orders import Order, OrderDetail
+
+
+class StoreAggregates:
+    """Running admin dashboard totals for one catalog.
+
+    Totals are built once from the catalog and the existing orders, then kept
+    up to date from model events, so reading them never walks the catalog.
+    Cancelled orders are taken back out of revenue and the order count.
+    """
+
+    def __init__(self, catalog: Catalog, orders: Iterable[Order] = (), low_stock_threshold: int = 5):
+        self.catalog = catalog
+        self.low_stock_threshold = low_stock_threshold
+        self._subscriptions = [
+            (events.STOCK_CHANGED, self._on_stock_changed),
+            (events.PRODUCT_ADDED, self._on_product_added),
+            (events.PRODUCT_REMOVED, self._on_product_removed),
+            (events.PRODUCT_UPDATED, self._on_product_updated),
+            (events.ORDER_LINE_ADDED, self._on_order_line_added),
+            (events.ORDER_STATUS_CHANGED, self._on_order_status_changed),
+        ]
+        self.recompute(orders)
+        for event, listener in self._subscriptions:
+            events.subscribe(event, listener)
+
+    def recompute(self, orders: Iterable[Order] = ()):
+        self.revenue = 0.0
+        self.order_count = 0
+        self._counted_orders = set()
+        self._product_values: Dict[int, float] = {}
+        self.inventory_value = 0.0
+        self.low_stock: Dict[int, Product] = {}
+        for product in self.catalog.products:
+            self._track_product(product)
+        self.count_orders(orders)
+
+    def count_orders(self, orders: Iterable[Order]):
+        """Add orders built without order line events, such as those loaded from the repository."""
+        for order in orders:
+            if (order.status != OrderStatus.CANCELLED and order.order_details
+                    and order.order_id not in self._counted_orders):
+                self._counted_orders.add(order.order_id)
+                self.order_count += 1
+                self.revenue += order.total_amount
+
+    def close(self):
+        for event, listener in self._subscriptions:
+            events.unsubscribe(event, listener)
+
+    @property
+    def product_count(self) -> int:
+        return len(self.catalog)
+
+    @property
+    def low_stock_count(self) -> int:
+        return len(self.low_stock)
+
+    def get_low_stock_products(self) -> List[Product]:
+        return list(self.low_stock.values())
+
+    def to_dict(self) -> dict:
+        return {
+            "product_count": self.product_count,
+            "order_count": self.order_count,
+            "revenue": round(self.revenue, 2),
+            "inventory_value": round(self.inventory_value, 2),
+            "low_stock_count": self.low_stock_count,
+            "low_stock_threshold": self.low_stock_threshold,
+        }
+
+    def _track_product(self, product: Product):
+        value = product.price * product.stock_quantity
+        self.inventory_value += value - self._product_values.get(product.product_id, 0.0)
+        self._product_values[product.product_id] = value
+        if product.stock_quantity < self.low_stock_threshold:
+            self.low_stock[product.product_id] = product
+        else:
+            self.low_stock.pop(product.product_id, None)
+
+    def _on_stock_changed(self, product: Product, old_quantity: int):
+        if product in self.catalog:
+            self._track_product(product)
+
+    def _on_product_added(self, product: Product):
+        if product in self.catalog:
+            self._track_product(product)
+
+    def _on_product_updated(self, product: Product, changed: tuple):
+        if product in self.catalog:
+            self._track_product(product)
+
+    def _on_product_removed(self, product: Product):
+        self.inventory_value -= self._product_values.pop(product.product_id, 0.0)
+        self.low_stock.pop(product.product_id, None)
+
+    def _on_order_line_added(self, order: Order, detail: OrderDetail):
+        if detail.product not in self.catalog or order.status == OrderStatus.CANCELLED:
+            return
+        if order.order_id not in self._counted_orders:
+            self._counted_orders.add(order.order_id)
+            self.order_count += 1
+        self.revenue += detail.subtotal
+
+    def _on_order_status_changed(self, order: Order, old_status: OrderStatus):
+        if order.status == OrderStatus.CANCELLED and order.order_id in self._counted_orders:
+            self._counted_orders.discard(order.order_id)
+            self.order_count -= 1
+            self.revenue -= order.total_amount
+
+    def __str__(self):
+        return (f"Aggregates: {self.order_count} orders, ${self.revenue:.2f} revenue, "
+                f"{self.low_stock_count} low stock, ${self.inventory_value:.2f} inventory")
@@ -0,0 +1,147 @@
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+from .models import Product, ShoppingCart
+
+
+class BasketStore(ABC):
+    """Session-keyed shopping baskets.
+
+    Callers load a basket, mutate it and save it back. Backends decide whether
+    the basket lives in this process or somewhere every worker can see it.
+    """
+
+    def __init__(self, ttl_seconds: float = 24 * 3600):
+        self.ttl_seconds = ttl_seconds
+
+    def new_session_id(self) -> str:
+        return secrets.token_urlsafe(16)
+
+    @abstractmethod
+    def load(self, session_id: str) -> ShoppingCart:
+        pass
+
+    @abstractmethod
+    def save(self, session_id: str, cart: ShoppingCart):
+        pass
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class InMemoryBasketStore(BasketStore):
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 24 * 3600):
+        super().__init__(ttl_seconds)
+        self.max_sessions = max_sessions
+        # Kept in least-recently-used order, so expired entries sit at the front
+        self._baskets: 'OrderedDict[str, Tuple[ShoppingCart, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> ShoppingCart:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._baskets.get(session_id)
+            if entry and now - entry[1] <= self.ttl_seconds:
+                self._baskets[session_id] = (entry[0], now)
+                self._baskets.move_to_end(session_id)
+                return entry[0]
+            self._baskets.pop(session_id, None)
+        return ShoppingCart()
+
+    def save(self, session_id: str, cart: ShoppingCart):
+        now = time.monotonic()
+        with self._lock:
+            self._baskets[session_id] = (cart, now)
+            self._baskets.move_to_end(session_id)
+            self._evict(now)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._baskets.pop(session_id, None)
+
+    def _evict(self, now: float):
+        while self._baskets:
+            oldest_id, (_, last_seen) = next(iter(self._baskets.items()))
+            if len(self._baskets) > self.max_sessions or now - last_seen > self.ttl_seconds:
+                del self._baskets[oldest_id]
+            else:
+                break
+
+    def __len__(self) -> int:
+        return len(self._baskets)
+
+
+class SQLiteBasketStore(BasketStore):
+    """Baskets shared through a SQLite file, so several workers see the same basket.
+
+    Only product ids and quantities are stored; products are resolved through
+    product_lookup when a basket is loaded.
+    """
+
+    def __init__(self, path: str, product_lookup: Callable[[int], Optional[Product]],
+                 ttl_seconds: float = 24 * 3600, purge_every: int = 500):
+        super().__init__(ttl_seconds)
+        self.path = path
+        self.product_lookup = product_lookup
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+        with self._connection() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS baskets (
+                                session_id TEXT PRIMARY KEY,
+                                items TEXT NOT NULL,
+                                updated_at REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_baskets_updated ON baskets(updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id: str) -> ShoppingCart:
+        cart = ShoppingCart()
+        now = time.time()
+        # Reading a basket keeps it alive, as it does in InMemoryBasketStore
+        with self._connection() as conn:
+            row = conn.execute("UPDATE baskets SET updated_at = ? WHERE session_id = ? AND updated_at >= ? "
+                               "RETURNING items", (now, session_id, now - self.ttl_seconds)).fetchone()
+        if row is None:
+            return cart
+        for product_id, quantity in json.loads(row[0]):
+            product = self.product_lookup(product_id)
+            if product:
+                cart.set_quantity(product, quantity)
+        return cart
+
+    def save(self, session_id: str, cart: ShoppingCart):
+        items = json.dumps(list(cart.get_quantities().items()))
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO baskets (session_id, items, updated_at) VALUES (?, ?, ?)",
+                         (session_id, items, now))
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                conn.execute("DELETE FROM baskets WHERE updated_at < ?", (now - self.ttl_seconds,))
+
+    def delete(self, session_id: str):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM baskets WHERE session_id = ?", (session_id,))
+
+    def __len__(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM baskets WHERE updated_at >= ?", (cutoff,)).fetchone()[0]
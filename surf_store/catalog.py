@@ -0,0 +1,173 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+from .models import Customer, ProductFamily, ProductCategory, Product, normalize_email
+from .events import emit, PRODUCT_ADDED, PRODUCT_REMOVED, PRODUCT_UPDATED
+
+
+class Catalog:
+    """Families, products and customers indexed by id, category and family.
+
+    Add, move and remove products through the catalog so the indexes stay in step.
+    """
+
+    def __init__(self, families: Iterable[ProductFamily] = (),
+                 products: Iterable[Product] = (),
+                 customers: Iterable[Customer] = ()):
+        self.families: List[ProductFamily] = []
+        self.products: List[Product] = []
+        self.customers: List[Customer] = []
+        self._families_by_id: Dict[int, ProductFamily] = {}
+        self._categories_by_id: Dict[int, ProductCategory] = {}
+        self._products_by_id: Dict[int, Product] = {}
+        self._customers_by_id: Dict[int, Customer] = {}
+        self._customers_by_email: Dict[str, Customer] = {}
+        self._products_by_category: Dict[int, Dict[int, Product]] = {}
+        self._products_by_family: Dict[int, Dict[int, Product]] = {}
+        self._sorted_product_ids: List[int] = []
+        self._next_customer_id = 1
+
+        for family in families:
+            self.add_family(family)
+        for product in products:
+            self.add_product(product)
+        for customer in customers:
+            self.add_customer(customer)
+
+    # Families and categories
+
+    def add_family(self, family: ProductFamily):
+        if family.family_id in self._families_by_id:
+            return
+        self._families_by_id[family.family_id] = family
+        self._products_by_family.setdefault(family.family_id, {})
+        self.families.append(family)
+        for category in family.categories:
+            self._index_category(category)
+
+    def _index_category(self, category: ProductCategory):
+        self._categories_by_id[category.category_id] = category
+        self._products_by_category.setdefault(category.category_id, {})
+
+    def get_family(self, family_id: int) -> Optional[ProductFamily]:
+        return self._families_by_id.get(family_id)
+
+    def get_category(self, category_id: int) -> Optional[ProductCategory]:
+        return self._categories_by_id.get(category_id)
+
+    # Products
+
+    def add_product(self, product: Product):
+        if product.product_id in self._products_by_id:
+            raise ValueError(f"Duplicate product id {product.product_id}")
+        family = product.get_family()
+        if family.family_id not in self._families_by_id:
+            self.add_family(family)
+        elif product.category.category_id not in self._categories_by_id:
+            self._index_category(product.category)
+        self._products_by_id[product.product_id] = product
+        self.products.append(product)
+        insort(self._sorted_product_ids, product.product_id)
+        self._index_product(product)
+        emit(PRODUCT_ADDED, product)
+
+    def remove_product(self, product_id: int) -> Optional[Product]:
+        product = self._products_by_id.pop(product_id, None)
+        if product is None:
+            return None
+        self._unindex_product(product)
+        self.products.remove(product)
+        del self._sorted_product_ids[bisect_left(self._sorted_product_ids, product_id)]
+        product.category.remove_product(product)
+        emit(PRODUCT_REMOVED, product)
+        return product
+
+    def update_product(self, product_id: int, **changes) -> Product:
+        product = self._products_by_id.get(product_id)
+        if product is None:
+            raise KeyError(product_id)
+        if 'product_id' in changes:
+            raise ValueError("product_id cannot be changed")
+
+        changed = tuple(changes)
+        new_category = changes.pop('category', None)
+        for name, value in changes.items():
+            if not hasattr(product, name):
+                raise AttributeError(f"{type(product).__name__} has no attribute '{name}'")
+            setattr(product, name, value)
+
+        if new_category is not None and new_category is not product.category:
+            self._unindex_product(product)
+            product.category.remove_product(product)
+            product.category = new_category
+            new_category.add_product(product)
+            if new_category.family.family_id not in self._families_by_id:
+                self.add_family(new_category.family)
+            elif new_category.category_id not in self._categories_by_id:
+                self._index_category(new_category)
+            self._index_product(product)
+        emit(PRODUCT_UPDATED, product, changed)
+        return product
+
+    def _index_product(self, product: Product):
+        self._products_by_category.setdefault(product.category.category_id, {})[product.product_id] = product
+        self._products_by_family.setdefault(product.get_family().family_id, {})[product.product_id] = product
+
+    def _unindex_product(self, product: Product):
+        self._products_by_category.get(product.category.category_id, {}).pop(product.product_id, None)
+        self._products_by_family.get(product.get_family().family_id, {}).pop(product.product_id, None)
+
+    def get_product(self, product_id: int) -> Optional[Product]:
+        return self._products_by_id.get(product_id)
+
+    def page_products(self, after_id: int = 0, limit: int = 50) -> Tuple[List[Product], Optional[int]]:
+        # Keyset pagination: the cursor is the last product_id already shown
+        start = bisect_right(self._sorted_product_ids, after_id)
+        ids = self._sorted_product_ids[start:start + limit]
+        next_cursor = ids[-1] if start + limit < len(self._sorted_product_ids) else None
+        return [self._products_by_id[i] for i in ids], next_cursor
+
+    def get_products_by_category(self, category_id: int) -> List[Product]:
+        return list(self._products_by_category.get(category_id, {}).values())
+
+    def get_products_by_family(self, family_id: int) -> List[Product]:
+        return list(self._products_by_family.get(family_id, {}).values())
+
+    # Customers
+
+    def add_customer(self, customer: Customer):
+        if customer.customer_id in self._customers_by_id:
+            raise ValueError(f"Duplicate customer id {customer.customer_id}")
+        self._customers_by_id[customer.customer_id] = customer
+        # Older data may hold the same email twice; the first customer keeps it
+        self._customers_by_email.setdefault(normalize_email(customer.email), customer)
+        self.customers.append(customer)
+        self._next_customer_id = max(self._next_customer_id, customer.customer_id + 1)
+
+    def get_customer(self, customer_id: int) -> Optional[Customer]:
+        return self._customers_by_id.get(customer_id)
+
+    def get_customer_by_email(self, email: str) -> Optional[Customer]:
+        return self._customers_by_email.get(normalize_email(email))
+
+    def update_customer_contact(self, customer: Customer, email: str = None, phone: str = None,
+                                address: str = None):
+        old_email = normalize_email(customer.email)
+        customer.update_contact_info(email, phone, address)
+        new_email = normalize_email(customer.email)
+        if new_email != old_email:
+            if self._customers_by_email.get(old_email) is customer:
+                del self._customers_by_email[old_email]
+            self._customers_by_email.setdefault(new_email, customer)
+
+    def next_customer_id(self) -> int:
+        return self._next_customer_id
+
+    def __contains__(self, product: Product) -> bool:
+        return self._products_by_id.get(product.product_id) is product
+
+    def __len__(self):
+        return len(self._products_by_id)
+
+    def __str__(self):
+        return (f"Catalog: {len(self.families)} families, {len(self._products_by_id)} products, "
+                f"{len(self._customers_by_id)} customers")
@@ -0,0 +1,227 @@
+"""Versioned binary catalog snapshots, read through mmap.
+
+A snapshot holds families, categories and products in fixed-width records
+that point into one string table. A reader that needs a few products, such
+as a lookup or one page, maps the file and builds only those. The app is not
+such a reader: its indexes walk every product at startup, so it seeds an
+empty store through load_catalog(), which builds them all and saves the
+SQLite and sample-data work rather than the object building. Layout, all
+little-endian:
+
+    header      magic, version, counts, then the offset of each section
+    strings     uint32 end offsets, then every distinct string in UTF-8, NUL-separated
+    families    family_id, name, description
+    categories  category_id, family_id, name, description
+    product_ids int64 per product, ascending, for lookups by bisection
+    products    one record per product in product_id order: ids, price, stock,
+                type code, name, description and up to three subtype fields
+
+Strings are referenced by index into the table. Index NO_STRING is reserved
+for a missing value (None).
+"""
+import mmap
+import os
+import struct
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from .catalog import Catalog
+from .models import Product, ProductFamily, ProductCategory
+from .repository import PRODUCT_TYPES
+
+MAGIC = b"SURFCAT\x00"
+SNAPSHOT_VERSION = 1
+NO_STRING = 0
+# Written into the file, so codes are fixed here rather than taken from PRODUCT_TYPES order
+PRODUCT_TYPE_CODES = ('SurfBoard', 'Wetsuit', 'Accessory')
+MAX_SUBTYPE_FIELDS = 3
+
+_HEADER = struct.Struct('<8sHHIIII6Q')
+_FAMILY = struct.Struct('<qII')
+_CATEGORY = struct.Struct('<qqII')
+_PRODUCT = struct.Struct('<qqdqB3xIIIII')
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class _StringTable:
+    def __init__(self):
+        self.indexes: Dict[str, int] = {}
+        self.encoded: List[bytes] = [b""]
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        index = self.indexes.get(value)
+        if index is None:
+            if "\0" in value:
+                raise ValueError(f"Snapshot strings cannot contain NUL: {value!r}")
+            index = self.indexes[value] = len(self.encoded)
+            self.encoded.append(value.encode('utf-8'))
+        return index
+
+
+def write_catalog_snapshot(catalog: Catalog, path: str) -> int:
+    """Write catalog's families, categories and products to path; returns the file size in bytes."""
+    strings = _StringTable()
+    families = [_FAMILY.pack(f.family_id, strings.add(f.name), strings.add(f.description))
+                for f in catalog.families]
+    categories = [_CATEGORY.pack(c.category_id, f.family_id, strings.add(c.name), strings.add(c.description))
+                  for f in catalog.families for c in f.categories]
+    products = sorted(catalog.products, key=lambda p: p.product_id)
+    records = []
+    for product in products:
+        product_type = type(product).__name__
+        fields = [strings.add(getattr(product, field)) for field in PRODUCT_TYPES[product_type][1]]
+        fields += [NO_STRING] * (MAX_SUBTYPE_FIELDS - len(fields))
+        records.append(_PRODUCT.pack(product.product_id, product.category.category_id, product.price,
+                                     product.stock_quantity, PRODUCT_TYPE_CODES.index(product_type),
+                                     strings.add(product.name), strings.add(product.description), *fields))
+
+    # The separators let a full load decode the whole table with one decode and one split
+    ends, end = [], 0
+    for encoded in strings.encoded:
+        end += len(encoded)
+        ends.append(end)
+        end += 1
+    sections = [struct.pack(f'<{len(ends)}I', *ends), b"\0".join(strings.encoded), b"".join(families),
+                b"".join(categories), struct.pack(f'<{len(products)}q', *(p.product_id for p in products)),
+                b"".join(records)]
+    offsets, offset = [], _HEADER.size
+    for section in sections:
+        offset = _aligned(offset)
+        offsets.append(offset)
+        offset += len(section)
+
+    with open(path + ".tmp", "wb") as file:
+        file.write(_HEADER.pack(MAGIC, SNAPSHOT_VERSION, 0, len(strings.encoded), len(families), len(categories),
+                                len(products), *offsets))
+        for section_offset, section in zip(offsets, sections):
+            file.write(b"\0" * (section_offset - file.tell()))
+            file.write(section)
+        size = file.tell()
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + ".tmp", path)
+    return size
+
+
+class CatalogSnapshot:
+    """A catalog snapshot file, mapped read-only.
+
+    Families and categories are built when the file is opened. Products are
+    built on first access and kept, so each row becomes one Product object at
+    most. A category only lists the products built so far; load_catalog()
+    builds the rest and returns a full Catalog.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, _flags, string_count, family_count, category_count, product_count,
+             *offsets) = _HEADER.unpack_from(self._map)
+        except struct.error:
+            self._map.close()
+            raise ValueError(f"{path} is not a catalog snapshot")
+        if magic != MAGIC or version != SNAPSHOT_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} catalog snapshot")
+        string_ends, self._string_data, families, categories, product_ids, self._products_offset = offsets
+
+        view = memoryview(self._map)
+        self._string_ends = view[string_ends:string_ends + 4 * string_count].cast('I')
+        self._ids = view[product_ids:product_ids + 8 * product_count].cast('q')
+        view.release()
+        self._strings: Dict[int, str] = {}
+        self._rows: Dict[int, Product] = {}
+
+        self.families: List[ProductFamily] = []
+        for family_id, name, description in _FAMILY.iter_unpack(
+                self._map[families:families + _FAMILY.size * family_count]):
+            self.families.append(ProductFamily(family_id, self.string(name), self.string(description)))
+        families_by_id = {family.family_id: family for family in self.families}
+        self.categories: Dict[int, ProductCategory] = {}
+        for category_id, family_id, name, description in _CATEGORY.iter_unpack(
+                self._map[categories:categories + _CATEGORY.size * category_count]):
+            self.categories[category_id] = ProductCategory(category_id, self.string(name), self.string(description),
+                                                           families_by_id[family_id])
+
+    def close(self):
+        self._string_ends.release()
+        self._ids.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def string(self, index: int) -> Optional[str]:
+        if index == NO_STRING:
+            return None
+        value = self._strings.get(index)
+        if value is None:
+            start = self._string_data + self._string_ends[index - 1] + 1
+            value = self._strings[index] = self._map[start:self._string_data + self._string_ends[index]].decode(
+                'utf-8')
+        return value
+
+    def _all_strings(self) -> List[Optional[str]]:
+        end = self._string_data + (self._string_ends[-1] if len(self._string_ends) else 0)
+        strings: List[Optional[str]] = self._map[self._string_data:end].decode('utf-8').split('\0')
+        strings[NO_STRING] = None
+        return strings
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def row_of(self, product_id: int) -> Optional[int]:
+        row = bisect_left(self._ids, product_id)
+        if row < len(self._ids) and self._ids[row] == product_id:
+            return row
+        return None
+
+    def product_at(self, row: int) -> Product:
+        product = self._rows.get(row)
+        if product is None:
+            product = self._rows[row] = self._build(
+                _PRODUCT.unpack_from(self._map, self._products_offset + row * _PRODUCT.size), self.string)
+        return product
+
+    def _build(self, record: tuple, string: Callable[[int], Optional[str]]) -> Product:
+        product_id, category_id, price, stock, type_code, name, description, *fields = record
+        product_class, field_names = PRODUCT_TYPES[PRODUCT_TYPE_CODES[type_code]]
+        return product_class(product_id, string(name), string(description), price, stock,
+                             self.categories[category_id], *[string(field) for field in fields[:len(field_names)]])
+
+    def get_product(self, product_id: int) -> Optional[Product]:
+        row = self.row_of(product_id)
+        return None if row is None else self.product_at(row)
+
+    def __iter__(self) -> Iterator[Product]:
+        return (self.product_at(row) for row in range(len(self._ids)))
+
+    def page_products(self, after_id: int = 0, limit: int = 50) -> Tuple[List[Product], Optional[int]]:
+        # Same keyset cursor as Catalog.page_products
+        start = bisect_right(self._ids, after_id)
+        stop = min(start + limit, len(self._ids))
+        next_cursor = self._ids[stop - 1] if stop < len(self._ids) else None
+        return [self.product_at(row) for row in range(start, stop)], next_cursor
+
+    def load_catalog(self) -> Catalog:
+        """Build every product not built yet and index them all in a Catalog."""
+        start, stop = self._products_offset, self._products_offset + _PRODUCT.size * len(self._ids)
+        rows, categories, strings = self._rows, self.categories, self._all_strings()
+        types = [(PRODUCT_TYPES[name][0], len(PRODUCT_TYPES[name][1])) for name in PRODUCT_TYPE_CODES]
+        # The same steps as _build, unrolled: this loop runs once per product at startup
+        for row, (product_id, category_id, price, stock, type_code, name, description, *fields) in enumerate(
+                _PRODUCT.iter_unpack(self._map[start:stop])):
+            if row not in rows:
+                product_class, field_count = types[type_code]
+                rows[row] = product_class(product_id, strings[name], strings[description], price, stock,
+                                          categories[category_id], *[strings[f] for f in fields[:field_count]])
+        return Catalog(self.families, [rows[row] for row in range(len(self._ids))])
@@ -0,0 +1,219 @@
+"""Column-per-field product storage for very large catalogs.
+
+ColumnarCatalog keeps products as a struct of arrays rather than one object
+per product. Ids, prices, stock and category ids live in flat typed arrays.
+Names and descriptions are packed into one UTF-8 buffer with offsets. The
+subtype attributes (board_type, thickness, ...) repeat a lot, so each column
+holds small integer codes into a shared table of interned strings.
+
+Products are read through ProductView, a two-slot handle onto one row that
+behaves like the model object for reading and for stock updates. Call
+to_product() on a view when a full model object is needed, for example to
+put it in an order.
+"""
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .catalog import Catalog
+from .models import Product, ProductCategory
+from .repository import PRODUCT_TYPES, PRODUCT_ATTRIBUTES
+
+TYPE_NAMES = tuple(PRODUCT_TYPES)
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+
+
+class _TextColumn:
+    """Strings packed end to end in one UTF-8 buffer."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offsets = array('q', [0])
+
+    def append(self, value: str):
+        self.buffer += value.encode('utf-8')
+        self.offsets.append(len(self.buffer))
+
+    def __getitem__(self, row: int) -> str:
+        return self.buffer[self.offsets[row]:self.offsets[row + 1]].decode('utf-8')
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.buffer) + self.offsets.itemsize * len(self.offsets)
+
+
+class _CodedColumn:
+    """Repeated strings stored once, with a small integer code per row. Code 0 means unset."""
+
+    def __init__(self):
+        self.values: List[Optional[str]] = [None]
+        self._codes_by_value: Dict[str, int] = {}
+        self.codes = array('H')
+
+    def append(self, value: Optional[str]):
+        if value is None:
+            self.codes.append(0)
+            return
+        code = self._codes_by_value.get(value)
+        if code is None:
+            code = self._codes_by_value[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        self.codes.append(code)
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        return self.values[self.codes[row]]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.itemsize * len(self.codes)
+
+
+class ProductView:
+    """One row of a ColumnarCatalog, read like a Product.
+
+    Subtype attributes and methods resolve through the row's product class, so
+    view.get_shipping_weight() and view.board_type work as they do on the
+    model. Setting stock_quantity writes straight into the stock column.
+    """
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store: 'ColumnarCatalog', row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def product_class(self) -> type:
+        return PRODUCT_TYPES[TYPE_NAMES[self._store.type_codes[self._row]]][0]
+
+    @property
+    def product_id(self) -> int:
+        return self._store.ids[self._row]
+
+    @property
+    def name(self) -> str:
+        return self._store.names[self._row]
+
+    @property
+    def description(self) -> str:
+        return self._store.descriptions[self._row]
+
+    @property
+    def price(self) -> float:
+        return self._store.prices[self._row]
+
+    @property
+    def stock_quantity(self) -> int:
+        return self._store.stock[self._row]
+
+    @stock_quantity.setter
+    def stock_quantity(self, quantity: int):
+        if quantity < 0:
+            raise ValueError("Stock quantity cannot be negative")
+        self._store.stock[self._row] = quantity
+
+    @property
+    def category(self) -> ProductCategory:
+        return self._store.categories[self._store.category_ids[self._row]]
+
+    def __getattr__(self, name: str):
+        product_class = self.product_class
+        if name in PRODUCT_TYPES[product_class.__name__][1]:
+            return self._store.attributes[name][self._row]
+        member = getattr(product_class, name, None)
+        if callable(member) and not name.startswith('_'):
+            return member.__get__(self)
+        raise AttributeError(f"{product_class.__name__} view has no attribute {name!r}")
+
+    def to_product(self) -> Product:
+        product_class, fields = PRODUCT_TYPES[self.product_class.__name__]
+        return product_class(self.product_id, self.name, self.description, self.price, self.stock_quantity,
+                             self.category, *(getattr(self, field) for field in fields))
+
+    def __eq__(self, other):
+        return isinstance(other, ProductView) and other._store is self._store and other._row == self._row
+
+    def __hash__(self):
+        return hash((id(self._store), self._row))
+
+    def __str__(self):
+        return self.product_class.__str__(self)
+
+
+class ColumnarCatalog:
+    """Products as parallel arrays, sorted by product_id."""
+
+    def __init__(self):
+        self.ids = array('q')
+        self.prices = array('d')
+        self.stock = array('q')
+        self.category_ids = array('l')
+        self.type_codes = array('B')
+        self.names = _TextColumn()
+        self.descriptions = _TextColumn()
+        self.categories: Dict[int, ProductCategory] = {}
+        self.attributes = {attribute: _CodedColumn() for attribute in PRODUCT_ATTRIBUTES}
+
+    @classmethod
+    def from_products(cls, products: Iterable[Product]) -> 'ColumnarCatalog':
+        store = cls()
+        for product in sorted(products, key=lambda p: p.product_id):
+            store.append(type(product).__name__, product.product_id, product.name, product.description,
+                         product.price, product.stock_quantity, product.category,
+                         {attribute: getattr(product, attribute, None) for attribute in PRODUCT_ATTRIBUTES})
+        return store
+
+    @classmethod
+    def from_catalog(cls, catalog: Catalog) -> 'ColumnarCatalog':
+        return cls.from_products(catalog.products)
+
+    def append(self, product_type: str, product_id: int, name: str, description: str, price: float,
+               stock_quantity: int, category: ProductCategory, attributes: Dict[str, Optional[str]]):
+        """Add one product row without building a model object. Rows must arrive in product_id order."""
+        if product_type not in TYPE_CODES:
+            raise ValueError(f"Unknown product type: {product_type}")
+        if self.ids and product_id <= self.ids[-1]:
+            raise ValueError(f"Product ids must be added in ascending order, got {product_id} after {self.ids[-1]}")
+        self.ids.append(product_id)
+        self.prices.append(price)
+        self.stock.append(stock_quantity)
+        self.category_ids.append(category.category_id)
+        self.type_codes.append(TYPE_CODES[product_type])
+        self.names.append(name)
+        self.descriptions.append(description)
+        self.categories.setdefault(category.category_id, category)
+        for attribute, column in self.attributes.items():
+            column.append(attributes.get(attribute))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[ProductView]:
+        return (ProductView(self, row) for row in range(len(self.ids)))
+
+    def row_of(self, product_id: int) -> Optional[int]:
+        row = bisect_left(self.ids, product_id)
+        if row < len(self.ids) and self.ids[row] == product_id:
+            return row
+        return None
+
+    def get_product(self, product_id: int) -> Optional[ProductView]:
+        row = self.row_of(product_id)
+        return None if row is None else ProductView(self, row)
+
+    def page_products(self, after_id: int = 0, limit: int = 50) -> Tuple[List[ProductView], Optional[int]]:
+        # Same keyset cursor as Catalog.page_products
+        start = bisect_right(self.ids, after_id)
+        stop = min(start + limit, len(self.ids))
+        next_cursor = self.ids[stop - 1] if stop < len(self.ids) else None
+        return [ProductView(self, row) for row in range(start, stop)], next_cursor
+
+    def in_stock(self, product_id: int, quantity: int = 1) -> bool:
+        row = self.row_of(product_id)
+        return row is not None and self.stock[row] >= quantity
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the columns themselves; shared category objects and interned values not included."""
+        arrays = (self.ids, self.prices, self.stock, self.category_ids, self.type_codes)
+        return (sum(a.itemsize * len(a) for a in arrays) + self.names.nbytes + self.descriptions.nbytes
+                + sum(column.nbytes for column in self.attributes.values()))
@@ -1,4 +1,9 @@
-from typing import Optional, List
+import heapq
+import itertools
+import time
+from bisect import insort
+from operator import itemgetter
+from typing import Callable, Dict, List, Optional, Tuple
 from .models import Product
 
 
@@ -12,32 +17,189 @@ class ProductOrderNode:
         return f"{self.product.name}: {self.order_count} orders"
 
 
+class WindowedCounter:
+    """Per-product counts over a sliding time window, kept as time buckets.
+
+    Running totals are adjusted as buckets enter and leave the window, so a
+    query never re-sums the buckets.
+    """
+
+    def __init__(self, window_seconds: float, bucket_seconds: float = None):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds or max(1.0, window_seconds / 60)
+        self._bucket_keys: List[int] = []
+        self._buckets: Dict[int, Dict[int, int]] = {}
+        self.totals: Dict[int, int] = {}
+
+    def add(self, product_id: int, quantity: int, at: float):
+        key = int(at // self.bucket_seconds)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = {}
+            insort(self._bucket_keys, key)
+        bucket[product_id] = bucket.get(product_id, 0) + quantity
+        self.totals[product_id] = self.totals.get(product_id, 0) + quantity
+
+    def expire(self, now: float):
+        oldest_kept = int((now - self.window_seconds) // self.bucket_seconds) + 1
+        while self._bucket_keys and self._bucket_keys[0] < oldest_kept:
+            for product_id, quantity in self._buckets.pop(self._bucket_keys.pop(0)).items():
+                remaining = self.totals[product_id] - quantity
+                if remaining:
+                    self.totals[product_id] = remaining
+                else:
+                    del self.totals[product_id]
+
+    def top(self, k: int) -> List[Tuple[int, int]]:
+        return heapq.nlargest(k, self.totals.items(), key=itemgetter(1))
+
+
+class BestSellerTracker:
+    """Order counts per product with cheap increments and top-k queries.
+
+    Counts live in a dict, so increment() is O(1). Products are also kept in an
+    indexed max-heap ordered by the count each entry had when it was last
+    settled; increments only mark entries dirty, and the next query re-keys the
+    dirty entries one at a time (O(d log n)). top(k) then walks the heap from
+    the root in O(k log k). Ties go to the product that was first counted.
+
+    Optional windows (e.g. {'hour': 3600, 'day': 86400}) keep sliding-window
+    counts alongside the all-time ones.
+    """
+
+    def __init__(self, windows: Dict[str, float] = None, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._products: Dict[int, Product] = {}
+        self._counts: Dict[int, int] = {}
+        self._heap_counts: Dict[int, int] = {}
+        self._seq: Dict[int, int] = {}
+        self._heap: List[int] = []
+        self._pos: Dict[int, int] = {}
+        self._dirty = set()
+        self._next_seq = itertools.count()
+        self.windows = {name: WindowedCounter(seconds) for name, seconds in (windows or {}).items()}
+
+    def increment(self, product: Product, quantity: int = 1, at: float = None):
+        product_id = product.product_id
+        if product_id not in self._counts:
+            self._products[product_id] = product
+            self._counts[product_id] = 0
+            self._heap_counts[product_id] = 0
+            self._seq[product_id] = next(self._next_seq)
+            self._pos[product_id] = len(self._heap)
+            self._heap.append(product_id)
+        self._counts[product_id] += quantity
+        self._dirty.add(product_id)
+        if self.windows:
+            at = at if at is not None else self.clock()
+            for counter in self.windows.values():
+                counter.add(product_id, quantity, at)
+
+    def count(self, product: Product, window: str = None) -> int:
+        if window is not None:
+            counter = self.windows[window]
+            counter.expire(self.clock())
+            return counter.totals.get(product.product_id, 0)
+        return self._counts.get(product.product_id, 0)
+
+    def top(self, k: int = 5, window: str = None) -> List[Tuple[Product, int]]:
+        if window is not None:
+            counter = self.windows[window]
+            counter.expire(self.clock())
+            return [(self._products[pid], quantity) for pid, quantity in counter.top(k)]
+
+        self._settle()
+        result = []
+        if not self._heap:
+            return result
+        frontier = [self._heap_key(0)]
+        while frontier and len(result) < k:
+            _, _, index = heapq.heappop(frontier)
+            product_id = self._heap[index]
+            result.append((self._products[product_id], self._counts[product_id]))
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(self._heap):
+                    heapq.heappush(frontier, self._heap_key(child))
+        return result
+
+    def _heap_key(self, index: int) -> Tuple[int, int, int]:
+        product_id = self._heap[index]
+        return (-self._heap_counts[product_id], self._seq[product_id], index)
+
+    def _ranks_above(self, a: int, b: int) -> bool:
+        # Higher count first, earlier-seen product first on a tie
+        count_a, count_b = self._heap_counts[a], self._heap_counts[b]
+        return count_a > count_b or (count_a == count_b and self._seq[a] < self._seq[b])
+
+    def _settle(self):
+        # One key change at a time keeps every sift working on an otherwise valid heap
+        for product_id in self._dirty:
+            self._heap_counts[product_id] = self._counts[product_id]
+            index = self._pos[product_id]
+            self._sift_up(index)
+            self._sift_down(self._pos[product_id])
+        self._dirty.clear()
+
+    def _swap(self, i: int, j: int):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._pos[heap[i]] = i
+        self._pos[heap[j]] = j
+
+    def _sift_up(self, index: int):
+        while index > 0:
+            parent = (index - 1) // 2
+            if not self._ranks_above(self._heap[index], self._heap[parent]):
+                return
+            self._swap(index, parent)
+            index = parent
+
+    def _sift_down(self, index: int):
+        size = len(self._heap)
+        while True:
+            best = index
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size and self._ranks_above(self._heap[child], self._heap[best]):
+                    best = child
+            if best == index:
+                return
+            self._swap(index, best)
+            index = best
+
+    def __len__(self):
+        return len(self._counts)
+
+
 class ProductOrderLinkedList:
+    """Linked-list view of product order counts, backed by a BestSellerTracker.
+
+    The head/next chain is kept for callers that walk it; lookups and sorting
+    go through a node index and the tracker instead of walking the list.
+    """
+
     def __init__(self):
         self.head: Optional[ProductOrderNode] = None
+        self._tail: Optional[ProductOrderNode] = None
+        self._nodes: Dict[int, ProductOrderNode] = {}
+        self._tracker = BestSellerTracker()
 
     def add_or_update_product(self, product: Product, quantity: int = 1):
-        if not self.head:
-            self.head = ProductOrderNode(product, quantity)
-            return
-
-        current = self.head
-        while current:
-            if current.product.product_id == product.product_id:
-                current.order_count += quantity
-                return
-            if not current.next:
-                current.next = ProductOrderNode(product, quantity)
-                return
-            current = current.next
+        node = self._nodes.get(product.product_id)
+        if node:
+            node.order_count += quantity
+        else:
+            node = ProductOrderNode(product, quantity)
+            self._nodes[product.product_id] = node
+            if self._tail:
+                self._tail.next = node
+            else:
+                self.head = node
+            self._tail = node
+        self._tracker.increment(product, quantity)
 
     def get_product_order_count(self, product: Product) -> int:
-        current = self.head
-        while current:
-            if current.product.product_id == product.product_id:
-                return current.order_count
-            current = current.next
-        return 0
+        node = self._nodes.get(product.product_id)
+        return node.order_count if node else 0
 
     def display_all(self):
         if not self.head:
@@ -51,9 +213,5 @@ class ProductOrderLinkedList:
             current = current.next
 
     def get_sorted_products_by_orders(self) -> List[ProductOrderNode]:
-        products = []
-        current = self.head
-        while current:
-            products.append(current)
-            current = current.next
-        return sorted(products, key=lambda x: x.order_count, reverse=True)
\ No newline at end of file
+        return [self._nodes[product.product_id]
+                for product, _ in self._tracker.top(len(self._nodes))]
@@ -7,8 +7,6 @@ from .data_structures import ProductOrderLinkedList
 
 
 def create_sample_data():
-    print("Creating Enhanced Surf Store Sample Data...")
-    print("Demonstrating Inheritance, Polymorphism, and Containment!")
 
     # Product families and categories
     surfboard_family = ProductFamily(1, "Surfboards", "High-quality surfboards for all skill levels")
@@ -91,6 +89,8 @@ def demonstrate_oop_concepts():
     print("=" * 80)
     print("          ENHANCED SURF STORE - OOP CONCEPTS DEMONSTRATION")
     print("=" * 80)
+    print("Creating Enhanced Surf Store Sample Data...")
+    print("Demonstrating Inheritance, Polymorphism, and Containment!")
 
     data = create_sample_data()
     products = data['products']
@@ -0,0 +1,191 @@
+import asyncio
+import fcntl
+import os
+from typing import Callable, Dict, Iterable, List, Optional
+from . import events
+from .enums import OrderStatus, DeliveryStatus
+from .orders import Order, Delivery, PickupDelivery
+
+# One step per wave for every delivery, taken latest stage first so nothing moves twice
+WAVE_STEPS = (
+    (DeliveryStatus.IN_TRANSIT, DeliveryStatus.DELIVERED),
+    (DeliveryStatus.DISPATCHED, DeliveryStatus.IN_TRANSIT),
+    (DeliveryStatus.PREPARING, DeliveryStatus.DISPATCHED),
+)
+
+
+def normalize_tracking_number(tracking_number: str) -> str:
+    return tracking_number.strip().upper()
+
+
+class TrackingIndex:
+    """Saved deliveries by tracking number, and grouped by status.
+
+    Built once from the existing orders, then kept up to date from ORDERS_SAVED
+    and DELIVERY_STATUS_CHANGED, so neither a lookup nor a dispatch wave walks
+    the order history.
+    """
+
+    def __init__(self, orders: Iterable[Order] = ()):
+        self._by_tracking_number: Dict[str, Delivery] = {}
+        self._by_status: Dict[DeliveryStatus, Dict[str, Delivery]] = {status: {} for status in DeliveryStatus}
+        for order in orders:
+            if order.delivery:
+                self._add(order.delivery)
+        self._subscriptions = [
+            (events.ORDERS_SAVED, self._on_orders_saved),
+            (events.DELIVERY_STATUS_CHANGED, self._on_delivery_status_changed),
+        ]
+        for event, listener in self._subscriptions:
+            events.subscribe(event, listener)
+
+    def close(self):
+        for event, listener in self._subscriptions:
+            events.unsubscribe(event, listener)
+
+    def get(self, tracking_number: str) -> Optional[Delivery]:
+        return self._by_tracking_number.get(normalize_tracking_number(tracking_number))
+
+    def with_status(self, status: DeliveryStatus) -> List[Delivery]:
+        return list(self._by_status[status].values())
+
+    def counts(self) -> Dict[str, int]:
+        return {status.value: len(deliveries) for status, deliveries in self._by_status.items()}
+
+    def _add(self, delivery: Delivery):
+        key = normalize_tracking_number(delivery.tracking_number)
+        previous = self._by_tracking_number.get(key)
+        if previous is not None:
+            self._by_status[previous.status].pop(key, None)
+        self._by_tracking_number[key] = delivery
+        self._by_status[delivery.status][key] = delivery
+
+    def _on_orders_saved(self, orders: List[Order]):
+        for order in orders:
+            if order.delivery:
+                self._add(order.delivery)
+
+    def _on_delivery_status_changed(self, delivery: Delivery, old_status: DeliveryStatus):
+        key = normalize_tracking_number(delivery.tracking_number)
+        if self._by_tracking_number.get(key) is delivery:
+            self._by_status[old_status].pop(key, None)
+            self._by_status[delivery.status][key] = delivery
+
+    def __contains__(self, tracking_number: str) -> bool:
+        return normalize_tracking_number(tracking_number) in self._by_tracking_number
+
+    def __len__(self):
+        return len(self._by_tracking_number)
+
+
+class DispatchScheduler:
+    """Background asyncio task that moves deliveries through their statuses in waves.
+
+    At each cutoff (every interval_seconds) one wave runs. Deliveries in
+    transit are delivered, dispatched ones go into transit (store pickups are
+    collected instead), and everything still preparing is dispatched. Order
+    statuses follow through Delivery.update_status. The orders a wave changed
+    are handed to on_wave in one call, so the app saves them with one
+    repository write. Large waves yield to the event loop every batch_size
+    deliveries.
+
+    When several worker processes share one store, give each the same
+    lock_path. Only the worker holding byte 0 of that file runs the cutoff
+    waves. The others take over if it exits. Every wave, whether at the
+    cutoff or started by hand, holds byte 1 and first calls before_wave, so
+    it moves this worker's orders only after they have caught up with what
+    other workers saved.
+    """
+
+    def __init__(self, index: TrackingIndex, interval_seconds: float = 300.0,
+                 on_wave: Callable[[List[Order]], None] = None, batch_size: int = 500,
+                 lock_path: str = None, before_wave: Callable[[], None] = None):
+        self.index = index
+        self.interval_seconds = interval_seconds
+        self.on_wave = on_wave
+        self.batch_size = batch_size
+        self.lock_path = lock_path
+        self.before_wave = before_wave
+        self.waves = 0
+        self.moved = 0
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_file: Optional[int] = None
+        self.leader = lock_path is None
+
+    def _file(self) -> int:
+        if self._lock_file is None:
+            self._lock_file = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        return self._lock_file
+
+    def _lead(self) -> bool:
+        """Whether this process runs the cutoff waves, claiming them if no other process does."""
+        if not self.leader:
+            try:
+                fcntl.lockf(self._file(), fcntl.LOCK_EX | fcntl.LOCK_NB, 1, 0)
+                self.leader = True
+            except OSError:
+                pass
+        return self.leader
+
+    def start(self):
+        """Start the cutoff loop on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._lock_file is not None:
+            # Closing the file gives up the cutoffs to another process
+            os.close(self._lock_file)
+            self._lock_file = None
+            self.leader = self.lock_path is None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            if self._lead():
+                await self.run_wave()
+
+    async def run_wave(self) -> Dict[str, int]:
+        """Move every delivery one step now; returns how many reached each status."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # A wave started by hand and one at the cutoff would otherwise both move the same deliveries
+        async with self._lock:
+            if self.lock_path is not None:
+                # ...and so would waves in two processes
+                await asyncio.to_thread(fcntl.lockf, self._file(), fcntl.LOCK_EX, 1, 1)
+            try:
+                if self.before_wave:
+                    self.before_wave()
+                moved: Dict[str, int] = {}
+                changed: List[Order] = []
+                for from_status, to_status in WAVE_STEPS:
+                    for number, delivery in enumerate(self.index.with_status(from_status), 1):
+                        if delivery.status != from_status or delivery.order.status == OrderStatus.CANCELLED:
+                            continue
+                        status = to_status
+                        if to_status == DeliveryStatus.IN_TRANSIT and isinstance(delivery, PickupDelivery):
+                            status = DeliveryStatus.DELIVERED
+                        delivery.update_status(status)
+                        moved[status.value] = moved.get(status.value, 0) + 1
+                        changed.append(delivery.order)
+                        if number % self.batch_size == 0:
+                            await asyncio.sleep(0)
+                if changed and self.on_wave:
+                    self.on_wave(changed)
+            finally:
+                if self.lock_path is not None:
+                    fcntl.lockf(self._file(), fcntl.LOCK_UN, 1, 1)
+            self.waves += 1
+            self.moved += len(changed)
+            return moved
+
+    def stats(self) -> Dict[str, object]:
+        return {"waves": self.waves, "moved": self.moved, "interval_seconds": self.interval_seconds,
+                "leader": self.leader,
+                "deliveries": self.index.counts()}
@@ -0,0 +1,49 @@
+import weakref
+from typing import Callable, Dict, List
+
+# Model change notifications. Listeners are called synchronously, in the
+# order they subscribed, with the arguments given below.
+PRODUCT_ADDED = "product_added"            # (product)
+PRODUCT_REMOVED = "product_removed"        # (product)
+PRODUCT_UPDATED = "product_updated"        # (product, changed_field_names)
+STOCK_CHANGED = "stock_changed"            # (product, old_quantity)
+ORDER_CREATED = "order_created"            # (order)
+ORDER_LINE_ADDED = "order_line_added"      # (order, detail)
+ORDER_STATUS_CHANGED = "order_status_changed"  # (order, old_status)
+ORDERS_SAVED = "orders_saved"              # (orders) once a repository has stored them
+PAYMENT_STATUS_CHANGED = "payment_status_changed"    # (payment, old_status)
+DELIVERY_STATUS_CHANGED = "delivery_status_changed"  # (delivery, old_status)
+
+# Bound methods are held weakly, so an index or cache that goes out of scope
+# stops listening instead of being kept alive by its subscription.
+_listeners: Dict[str, List[Callable]] = {}
+
+
+def _ref(listener: Callable) -> Callable:
+    if hasattr(listener, '__self__'):
+        return weakref.WeakMethod(listener)
+    return lambda: listener
+
+
+def subscribe(event: str, listener: Callable):
+    _listeners.setdefault(event, []).append(_ref(listener))
+
+
+def unsubscribe(event: str, listener: Callable):
+    listeners = _listeners.get(event)
+    if listeners:
+        listeners[:] = [ref for ref in listeners if ref() not in (None, listener)]
+
+
+def emit(event: str, *args):
+    listeners = _listeners.get(event)
+    if listeners:
+        dead = False
+        for ref in tuple(listeners):
+            listener = ref()
+            if listener is None:
+                dead = True
+            else:
+                listener(*args)
+        if dead:
+            listeners[:] = [ref for ref in listeners if ref() is not None]
@@ -0,0 +1,255 @@
+"""Streaming order and inventory exports for reporting.
+
+Rows are produced one at a time from generators and grouped into chunks, so
+an export holds one chunk in memory however many rows it covers. Filters are
+applied while streaming. From a SQLite store, order rows are read straight off
+a cursor with the filters in SQL (export_order_lines), so no Order is built.
+
+    python -m surf_store export orders --db store.db --format csv --since 2025-01-01 --status confirmed
+    python -m surf_store export products --db store.db --format jsonl -o inventory.jsonl
+"""
+import csv
+import io
+import json
+from bisect import bisect_right
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Optional, Sequence
+from .enums import OrderStatus
+from .catalog import Catalog
+from .orders import Order, CreditCardPayment
+from .repository import PRODUCT_ATTRIBUTES, PAYMENT_TYPES, DELIVERY_TYPES
+
+ORDER_COLUMNS = (
+    'order_id', 'order_date', 'status', 'customer_id', 'customer_name', 'customer_email', 'order_total',
+    'detail_id', 'product_id', 'product_name', 'quantity', 'unit_price', 'subtotal',
+    'payment_id', 'payment_method', 'payment_status', 'payment_amount', 'transaction_fee',
+    'delivery_id', 'delivery_method', 'delivery_status', 'tracking_number', 'delivery_address', 'shipping_cost',
+)
+PRODUCT_COLUMNS = (
+    'product_id', 'product_type', 'name', 'description', 'price', 'stock_quantity',
+    'category_id', 'category', 'family_id', 'family',
+) + PRODUCT_ATTRIBUTES
+EXPORT_FORMATS = ('csv', 'jsonl')
+CHUNK_SIZE = 64 * 1024
+
+
+def local_time(moment: datetime) -> datetime:
+    # Order dates are naive local times; one with an offset is converted so the two always compare
+    return moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
+
+
+def iter_orders(orders: Sequence[Order], since: datetime = None, until: datetime = None,
+                statuses: Iterable[OrderStatus] = None) -> Iterator[Order]:
+    """Orders in id order, filtered on the fly.
+
+    Walks by order_id rather than position, so orders inserted while the
+    export runs are neither skipped nor repeated.
+    """
+    statuses = set(statuses) if statuses else None
+    since = since and local_time(since)
+    until = until and local_time(until)
+    last_id, index = 0, 0
+    while True:
+        if index >= len(orders) or (index and orders[index - 1].order_id != last_id):
+            index = bisect_right(orders, last_id, key=lambda o: o.order_id)
+        if index >= len(orders):
+            return
+        order = orders[index]
+        last_id, index = order.order_id, index + 1
+        if statuses and order.status not in statuses:
+            continue
+        if since or until:
+            order_date = local_time(order.order_date)
+            if (since and order_date < since) or (until and order_date >= until):
+                continue
+        yield order
+
+
+def order_record(order: Order) -> dict:
+    payment, delivery = order.payment, order.delivery
+    return {
+        'order_id': order.order_id,
+        'order_date': order.order_date.isoformat(),
+        'status': order.status.value,
+        'customer_id': order.customer.customer_id,
+        'customer_name': order.customer.get_full_name(),
+        'customer_email': order.customer.email,
+        'order_total': round(order.total_amount, 2),
+        'lines': [{
+            'detail_id': detail.detail_id,
+            'product_id': detail.product.product_id,
+            'product_name': detail.product.name,
+            'quantity': detail.quantity,
+            'unit_price': round(detail.unit_price, 2),
+            'subtotal': round(detail.subtotal, 2),
+        } for detail in order.order_details],
+        'payment': payment and {
+            'payment_id': payment.payment_id,
+            'payment_method': getattr(payment, 'payment_method', type(payment).__name__),
+            'payment_status': payment.status.value,
+            'payment_amount': round(payment.amount, 2),
+            'transaction_fee': round(payment.get_transaction_fee(), 2),
+        },
+        'delivery': delivery and {
+            'delivery_id': delivery.delivery_id,
+            'delivery_method': delivery.get_delivery_method(),
+            'delivery_status': delivery.status.value,
+            'tracking_number': delivery.tracking_number,
+            'delivery_address': delivery.address,
+            'shipping_cost': round(delivery.calculate_shipping_cost(), 2),
+        },
+    }
+
+
+def line_records(lines: Iterable[tuple], catalog: Catalog) -> Iterator[dict]:
+    """order_record() dicts from SQLiteRepository.iter_order_lines rows, holding one order at a time.
+
+    Products come from catalog for their names and shipping weights. Lines
+    whose product is gone are left out, as SQLiteRepository.load_orders does.
+    """
+    for _, rows in groupby(lines, key=itemgetter(0)):
+        rows = list(rows)
+        (order_id, order_date, status, total_amount, customer_id, first_name, last_name, email,
+         *_, payment_id, payment_type, card_type, payment_status, amount,
+         delivery_id, delivery_type, delivery_status, tracking_number, address) = rows[0]
+        order_lines, weight = [], 0.0
+        for row in rows:
+            detail_id, product_id, quantity, unit_price, subtotal = row[8:13]
+            product = catalog.get_product(product_id) if detail_id is not None else None
+            if product is None:
+                continue
+            weight += product.get_shipping_weight() * quantity
+            order_lines.append({
+                'detail_id': detail_id,
+                'product_id': product_id,
+                'product_name': product.name,
+                'quantity': quantity,
+                'unit_price': round(unit_price, 2),
+                'subtotal': round(subtotal, 2),
+            })
+        payment_class, delivery_class = PAYMENT_TYPES.get(payment_type), DELIVERY_TYPES.get(delivery_type)
+        yield {
+            'order_id': order_id,
+            'order_date': order_date,
+            'status': status,
+            'customer_id': customer_id,
+            'customer_name': f"{first_name} {last_name}",
+            'customer_email': email,
+            'order_total': round(total_amount, 2),
+            'lines': order_lines,
+            'payment': payment_class and {
+                'payment_id': payment_id,
+                'payment_method': ("Debit Card" if card_type == "Debit" else "Credit Card")
+                if payment_class is CreditCardPayment else payment_class.payment_method,
+                'payment_status': payment_status,
+                'payment_amount': round(amount, 2),
+                'transaction_fee': round(payment_class.fee(amount), 2),
+            },
+            'delivery': delivery_class and {
+                'delivery_id': delivery_id,
+                'delivery_method': delivery_class.METHOD_NAME,
+                'delivery_status': delivery_status,
+                'tracking_number': tracking_number,
+                'delivery_address': address,
+                'shipping_cost': round(delivery_class.quote(weight), 2),
+            },
+        }
+
+
+def order_rows(records: Iterable[dict]) -> Iterator[dict]:
+    """One flat row per order line, with the order, payment and delivery repeated on each."""
+    for record in records:
+        lines = record.pop('lines') or [{}]
+        payment = record.pop('payment') or {}
+        delivery = record.pop('delivery') or {}
+        for line in lines:
+            yield {**record, **line, **payment, **delivery}
+
+
+def iter_products(catalog: Catalog, page_size: int = 500) -> Iterator[dict]:
+    after_id = 0
+    while after_id is not None:
+        page, after_id = catalog.page_products(after_id, page_size)
+        for product in page:
+            category = product.category
+            record = {
+                'product_id': product.product_id,
+                'product_type': type(product).__name__,
+                'name': product.name,
+                'description': product.description,
+                'price': product.price,
+                'stock_quantity': product.stock_quantity,
+                'category_id': category.category_id,
+                'category': category.name,
+                'family_id': category.family.family_id,
+                'family': category.family.name,
+            }
+            for attribute in PRODUCT_ATTRIBUTES:
+                if hasattr(product, attribute):
+                    record[attribute] = getattr(product, attribute)
+            yield record
+
+
+def csv_chunks(rows: Iterable[dict], columns: Sequence[str], chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def jsonl_chunks(records: Iterable[dict], chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    lines: List[str] = []
+    size = 0
+    for record in records:
+        line = json.dumps(record, separators=(',', ':')) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield "".join(lines)
+            lines, size = [], 0
+    if lines:
+        yield "".join(lines)
+
+
+def export_order_records(records: Iterable[dict], format: str = 'csv') -> Iterator[str]:
+    if format == 'jsonl':
+        return jsonl_chunks(records)
+    return csv_chunks(order_rows(records), ORDER_COLUMNS)
+
+
+def export_orders(orders: Sequence[Order], format: str = 'csv', since: datetime = None, until: datetime = None,
+                  statuses: Iterable[OrderStatus] = None) -> Iterator[str]:
+    return export_order_records((order_record(order) for order in iter_orders(orders, since, until, statuses)),
+                                format)
+
+
+def export_order_lines(lines: Iterable[tuple], catalog: Catalog, format: str = 'csv') -> Iterator[str]:
+    """export_orders() for SQLiteRepository.iter_order_lines rows."""
+    return export_order_records(line_records(lines, catalog), format)
+
+
+def export_products(catalog: Catalog, format: str = 'csv') -> Iterator[str]:
+    if format == 'jsonl':
+        return jsonl_chunks(iter_products(catalog))
+    return csv_chunks(iter_products(catalog), PRODUCT_COLUMNS)
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return local_time(datetime.fromisoformat(value))
+
+
+def parse_statuses(values: Optional[Iterable[str]]) -> Optional[List[OrderStatus]]:
+    if not values:
+        return None
+    return [OrderStatus(v.strip().lower()) for value in values for v in value.split(',') if v.strip()]
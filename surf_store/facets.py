@@ -0,0 +1,269 @@
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+from . import events
+from .models import Product
+
+# Facets shown to shoppers, in display order, with their labels
+FACETS = (
+    ('board_type', "Board type"),
+    ('length', "Length"),
+    ('fin_setup', "Fins"),
+    ('suit_type', "Suit type"),
+    ('thickness', "Thickness"),
+    ('compatibility', "Fits"),
+    ('price', "Price"),
+    ('availability', "Availability"),
+)
+FACET_NAMES = tuple(name for name, _ in FACETS)
+# Subtype attributes indexed as they are; price and availability are derived
+ATTRIBUTE_FACETS = ('board_type', 'length', 'fin_setup', 'suit_type', 'thickness', 'compatibility')
+# (value, label, lowest price, price the band stops before)
+PRICE_BANDS = (
+    ("0-50", "Under £50", 0.0, 50.0),
+    ("50-150", "£50 to £150", 50.0, 150.0),
+    ("150-300", "£150 to £300", 150.0, 300.0),
+    ("300-600", "£300 to £600", 300.0, 600.0),
+    ("600-", "£600 and over", 600.0, float("inf")),
+)
+_BAND_FLOORS = [low for _, _, low, _ in PRICE_BANDS]
+IN_STOCK = "in_stock"
+# Scopes filter like facets but aren't listed with counts
+_FAMILY, _CATEGORY = "family", "category"
+_NUMBER = re.compile(r"(\d+)")
+
+
+def _natural_key(value: str):
+    # 5'10" sorts after 5'8" and before 10'0"
+    return [int(part) if part.isdigit() else part.lower() for part in _NUMBER.split(value)]
+
+
+class FacetResult:
+    def __init__(self, products: List[Product], facets: List[dict], selections: Dict[str, List[str]]):
+        self.products = products
+        self.facets = facets
+        self.selections = selections
+
+    @property
+    def total(self) -> int:
+        return len(self.products)
+
+    def __len__(self):
+        return len(self.products)
+
+
+class FacetIndex:
+    """Product attributes as bitmaps, one Python int per facet value.
+
+    Every product gets a bit position when it is added. Values of one facet
+    are ORed together and different facets ANDed, and the counts next to each
+    value are popcounts of its bitmap against the other facets' selections,
+    so a filter or a count never walks the products. Stock, price, attribute
+    and category changes flip only the bits of the product that changed.
+    Pass a catalog to also index its new products as they are added.
+    """
+
+    def __init__(self, products: Iterable[Product] = (), catalog=None):
+        self.catalog = catalog
+        self._bitmaps: Dict[str, Dict[object, int]] = {name: {} for name in FACET_NAMES + (_FAMILY, _CATEGORY)}
+        self._slots: Dict[int, int] = {}
+        self._products: List[Optional[Product]] = []
+        # The (facet, value) pairs each slot is set under, so a change clears exactly those bits
+        self._keys: List[Tuple[Tuple[str, object], ...]] = []
+        self._live = 0
+        # Which attribute facets each product class has
+        self._attributes: Dict[type, Tuple[str, ...]] = {}
+        self._build(products)
+        self._subscriptions = [
+            (events.STOCK_CHANGED, self._on_stock_changed),
+            (events.PRODUCT_UPDATED, self._on_product_updated),
+            (events.PRODUCT_REMOVED, self._on_product_removed),
+        ]
+        if catalog is not None:
+            self._subscriptions.append((events.PRODUCT_ADDED, self._on_product_added))
+        for event, listener in self._subscriptions:
+            events.subscribe(event, listener)
+
+    def close(self):
+        for event, listener in self._subscriptions:
+            events.unsubscribe(event, listener)
+
+    def _keys_for(self, product: Product) -> Tuple[Tuple[str, object], ...]:
+        category = product.category
+        keys = [(_FAMILY, category.family.family_id), (_CATEGORY, category.category_id)]
+        product_class = type(product)
+        attributes = self._attributes.get(product_class)
+        if attributes is None:
+            attributes = self._attributes[product_class] = tuple(
+                facet for facet in ATTRIBUTE_FACETS if hasattr(product, facet))
+        for facet in attributes:
+            value = getattr(product, facet)
+            if value:
+                keys.append((facet, value))
+        band = bisect_right(_BAND_FLOORS, product.price) - 1
+        if band >= 0:
+            keys.append(('price', PRICE_BANDS[band][0]))
+        if product.stock_quantity > 0:
+            keys.append(('availability', IN_STOCK))
+        return tuple(keys)
+
+    def _build(self, products: Iterable[Product]):
+        # Growing one int per product would copy every bitmap each time; set the bits in bytes instead
+        slots_by_key: Dict[Tuple[str, object], List[int]] = {}
+        for product in products:
+            if product.product_id in self._slots:
+                raise ValueError(f"Duplicate product id {product.product_id}")
+            slot = self._slots[product.product_id] = len(self._products)
+            self._products.append(product)
+            keys = self._keys_for(product)
+            self._keys.append(keys)
+            for key in keys:
+                slots_by_key.setdefault(key, []).append(slot)
+        size = (len(self._products) + 7) // 8
+        for (facet, value), slots in slots_by_key.items():
+            bits = bytearray(size)
+            for slot in slots:
+                bits[slot >> 3] |= 1 << (slot & 7)
+            self._bitmaps[facet][value] = int.from_bytes(bits, 'little')
+        self._live = (1 << len(self._products)) - 1
+
+    def _set(self, slot: int, keys: Iterable[Tuple[str, object]]):
+        bit = 1 << slot
+        for facet, value in keys:
+            values = self._bitmaps[facet]
+            values[value] = values.get(value, 0) | bit
+
+    def _clear(self, slot: int, keys: Iterable[Tuple[str, object]]):
+        mask = ~(1 << slot)
+        for facet, value in keys:
+            values = self._bitmaps[facet]
+            bitmap = values[value] & mask
+            if bitmap:
+                values[value] = bitmap
+            else:
+                del values[value]
+
+    def add_product(self, product: Product):
+        slot = self._slots.get(product.product_id)
+        if slot is None:
+            # Slots are never reused, so bit order stays the order products were added
+            slot = self._slots[product.product_id] = len(self._products)
+            self._products.append(product)
+            self._keys.append(())
+        else:
+            self._clear(slot, self._keys[slot])
+            self._products[slot] = product
+        self._keys[slot] = self._keys_for(product)
+        self._set(slot, self._keys[slot])
+        self._live |= 1 << slot
+
+    def remove_product(self, product: Product):
+        slot = self._slots.pop(product.product_id, None)
+        if slot is not None:
+            self._clear(slot, self._keys[slot])
+            self._keys[slot] = ()
+            self._products[slot] = None
+            self._live &= ~(1 << slot)
+
+    def _slot_of(self, product: Product) -> Optional[int]:
+        slot = self._slots.get(product.product_id)
+        return slot if slot is not None and self._products[slot] is product else None
+
+    def _reindex(self, product: Product):
+        slot = self._slot_of(product)
+        if slot is not None:
+            keys, old_keys = self._keys_for(product), self._keys[slot]
+            if keys != old_keys:
+                # Each bitmap touched is copied whole, so only the values that changed are touched
+                self._clear(slot, set(old_keys).difference(keys))
+                self._set(slot, set(keys).difference(old_keys))
+                self._keys[slot] = keys
+
+    def _on_product_added(self, product: Product):
+        if product in self.catalog:
+            self.add_product(product)
+
+    def _on_stock_changed(self, product: Product, old_quantity: int):
+        # Only crossing zero moves a bit
+        if (old_quantity > 0) != (product.stock_quantity > 0):
+            self._reindex(product)
+
+    def _on_product_updated(self, product: Product, changed: tuple):
+        self._reindex(product)
+
+    def _on_product_removed(self, product: Product):
+        if self._slot_of(product) is not None:
+            self.remove_product(product)
+
+    # Queries
+
+    def bitmap(self, facet: str, value) -> int:
+        return self._bitmaps[facet].get(value, 0)
+
+    def scope(self, family_id: int = None, category_id: int = None) -> int:
+        """Bitmap of the products in a family and/or category; every product when neither is given."""
+        bitmap = self._live
+        if family_id is not None:
+            bitmap &= self.bitmap(_FAMILY, family_id)
+        if category_id is not None:
+            bitmap &= self.bitmap(_CATEGORY, category_id)
+        return bitmap
+
+    def _selected(self, facet: str, values: Iterable[str]) -> int:
+        bitmap = 0
+        for value in values:
+            bitmap |= self.bitmap(facet, value)
+        return bitmap
+
+    def match(self, selections: Dict[str, List[str]], scope: int) -> int:
+        """AND across facets of the OR of each facet's selected values, within scope."""
+        for facet, values in selections.items():
+            scope &= self._selected(facet, values)
+        return scope
+
+    def products(self, bitmap: int) -> List[Product]:
+        # Set bits are found by str.find over the binary digits, lowest slot first
+        digits = bin(bitmap)[:1:-1]
+        found, slot = [], digits.find('1')
+        while slot >= 0:
+            found.append(self._products[slot])
+            slot = digits.find('1', slot + 1)
+        return found
+
+    def counts(self, selections: Dict[str, List[str]], scope: int) -> Dict[str, Dict[object, int]]:
+        """Products per value of every facet, as if only that facet's own selection were cleared."""
+        selected = {facet: self._selected(facet, values) for facet, values in selections.items()}
+        counts = {}
+        for facet in FACET_NAMES:
+            base = scope
+            for other, bitmap in selected.items():
+                if other != facet:
+                    base &= bitmap
+            counts[facet] = {value: (base & bitmap).bit_count() for value, bitmap in self._bitmaps[facet].items()}
+        return counts
+
+    def search(self, selections: Dict[str, List[str]], family_id: int = None,
+               category_id: int = None) -> FacetResult:
+        """Products matching selections, with every facet's values, labels and counts for display."""
+        selections = {facet: list(values) for facet, values in selections.items() if facet in FACET_NAMES and values}
+        scope = self.scope(family_id, category_id)
+        counts = self.counts(selections, scope)
+        facets = []
+        for facet, label in FACETS:
+            if facet == 'price':
+                values = [(value, band_label) for value, band_label, _, _ in PRICE_BANDS]
+            elif facet == 'availability':
+                values = [(IN_STOCK, "In stock")]
+            else:
+                values = [(value, value) for value in sorted(counts[facet], key=_natural_key)]
+            chosen = selections.get(facet, ())
+            options = [{"value": value, "label": value_label, "count": counts[facet].get(value, 0),
+                        "selected": value in chosen}
+                       for value, value_label in values]
+            options = [option for option in options if option["count"] or option["selected"]]
+            if options:
+                facets.append({"name": facet, "label": label, "options": options})
+        return FacetResult(self.products(self.match(selections, scope)), facets, selections)
+
+    def __len__(self):
+        return len(self._slots)
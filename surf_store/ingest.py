@@ -0,0 +1,273 @@
+import csv
+import itertools
+import json
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .enums import OrderStatus
+from .exports import parse_date
+from .catalog import Catalog
+from .models import Customer, Product, normalize_email
+from .orders import Order
+from .repository import StoreRepository
+from .reservations import StockReservationEngine
+
+CUSTOMER_FIELDS = ('first_name', 'last_name', 'email', 'phone', 'address')
+
+
+def read_jsonl(lines: Iterable[str]) -> Iterator[dict]:
+    """One order per line: {"reference", "customer": {...}, "lines": [{"product_id", "quantity"}]}."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield {'reference': f"line {number}", 'error': f"Invalid JSON: {e}"}
+            continue
+        if not isinstance(record, dict):
+            yield {'reference': f"line {number}", 'error': "Expected a JSON object"}
+            continue
+        record.setdefault('reference', f"line {number}")
+        yield record
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[dict]:
+    """One order line per row; consecutive rows with the same reference form one order.
+
+    Columns: reference, email, first_name, last_name, phone, address, product_id,
+    quantity and an optional order_date.
+    """
+    rows = csv.DictReader(lines)
+    for reference, group in itertools.groupby(rows, key=lambda row: row.get('reference') or ''):
+        group = list(group)
+        first = group[0]
+        yield {
+            'reference': reference,
+            'customer': {field: first.get(field) or '' for field in CUSTOMER_FIELDS},
+            'order_date': first.get('order_date') or None,
+            'lines': [{'product_id': row.get('product_id'), 'quantity': row.get('quantity')} for row in group],
+        }
+
+
+class ImportReport:
+    def __init__(self, max_errors: int = 100):
+        self.max_errors = max_errors
+        self.received = 0
+        self.imported = 0
+        self.rejected = 0
+        self.lines = 0
+        self.batches = 0
+        self.revenue = 0.0
+        self.elapsed_seconds = 0.0
+        self.errors: List[Tuple[str, str]] = []
+
+    def reject(self, reference: str, reason: str):
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((reference, reason))
+
+    @property
+    def orders_per_second(self) -> float:
+        return self.imported / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "imported": self.imported,
+            "rejected": self.rejected,
+            "lines": self.lines,
+            "batches": self.batches,
+            "revenue": round(self.revenue, 2),
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "orders_per_second": round(self.orders_per_second, 1),
+            "errors": [{"reference": reference, "error": reason} for reference, reason in self.errors],
+        }
+
+    def __str__(self):
+        return (f"Imported {self.imported}/{self.received} orders ({self.rejected} rejected, "
+                f"{self.lines} lines, ${self.revenue:.2f}) in {self.elapsed_seconds:.2f}s "
+                f"= {self.orders_per_second:,.0f} orders/s")
+
+
+class _PendingOrder:
+    def __init__(self, reference: str, customer: dict, lines: Dict[int, int], order_date: Optional[datetime]):
+        self.reference = reference
+        self.customer = customer
+        self.lines = lines
+        self.order_date = order_date
+
+
+class OrderImporter:
+    """Bulk order ingestion for wholesale and marketplace feeds.
+
+    Records are taken a batch at a time. Each batch is validated, then stock
+    for the whole batch is checked and taken in one pass under the
+    reservation locks, so it can't race web checkouts. Orders that don't fit
+    the remaining stock are rejected on their own. Ids are allocated in one
+    block, and the batch's customers, orders and stock are each written with
+    a single repository call.
+    """
+
+    def __init__(self, catalog: Catalog, repository: StoreRepository,
+                 reservations: StockReservationEngine = None, batch_size: int = 500,
+                 status: OrderStatus = OrderStatus.CONFIRMED,
+                 on_commit: Callable[[List[Order]], None] = None):
+        self.catalog = catalog
+        self.repository = repository
+        self.reservations = reservations or StockReservationEngine(catalog.get_product)
+        self.batch_size = batch_size
+        self.status = status
+        self.on_commit = on_commit
+
+    def run(self, records: Iterable[dict]) -> ImportReport:
+        report = ImportReport()
+        for _ in self.process(records, report):
+            pass
+        return report
+
+    def process(self, records: Iterable[dict], report: ImportReport) -> Iterator[List[Order]]:
+        """Import batch by batch, yielding each committed batch so callers can interleave other work."""
+        records = iter(records)
+        while True:
+            batch = list(itertools.islice(records, self.batch_size))
+            if not batch:
+                return
+            started = time.perf_counter()
+            orders = self.import_batch(batch, report)
+            report.elapsed_seconds += time.perf_counter() - started
+            yield orders
+
+    def import_batch(self, records: List[dict], report: ImportReport) -> List[Order]:
+        report.received += len(records)
+        report.batches += 1
+        pending = [p for p in (self._validate(record, report) for record in records) if p]
+        accepted, products = self._take_stock(pending, report)
+        if not accepted:
+            return []
+
+        orders = []
+        try:
+            new_customers_by_email: Dict[str, Customer] = {}
+            customers = [self._customer_for(p.customer, new_customers_by_email) for p in accepted]
+            new_customers = list(new_customers_by_email.values())
+            for customer, customer_id in zip(new_customers,
+                                             self.repository.next_ids('customer', len(new_customers))):
+                customer.customer_id = customer_id
+                self.catalog.add_customer(customer)
+
+            for p, customer, order_id in zip(accepted, customers,
+                                             self.repository.next_ids('order', len(accepted))):
+                order = Order(order_id, customer, p.order_date)
+                orders.append(order)
+                for product_id, quantity in p.lines.items():
+                    order.add_order_detail(products[product_id], quantity, reserved=True)
+                order.update_status(self.status)
+
+            self.repository.add_customers(new_customers)
+            self.repository.add_orders(orders)
+        except Exception:
+            self._abandon(accepted, products, orders)
+            raise
+        for p, order in zip(accepted, orders):
+            report.lines += len(p.lines)
+            report.revenue += order.total_amount
+        self.repository.save_stock(products.values())
+        report.imported += len(orders)
+        if self.on_commit:
+            self.on_commit(orders)
+        return orders
+
+    def _validate(self, record: dict, report: ImportReport) -> Optional[_PendingOrder]:
+        reference = str(record.get('reference', ''))
+        if record.get('error'):
+            report.reject(reference, record['error'])
+            return None
+        customer = record.get('customer') or {}
+        if (not isinstance(customer, dict) or not isinstance(customer.get('email'), str)
+                or not customer['email'].strip()):
+            report.reject(reference, "Missing customer email")
+            return None
+        record_lines = record.get('lines') or []
+        if not isinstance(record_lines, list):
+            report.reject(reference, f"Lines must be a list, not {record_lines!r}")
+            return None
+
+        lines: Dict[int, int] = {}
+        for line in record_lines:
+            try:
+                product_id, quantity = int(line['product_id']), int(line['quantity'])
+            except (KeyError, TypeError, ValueError):
+                report.reject(reference, f"Malformed line {line!r}")
+                return None
+            if quantity <= 0:
+                report.reject(reference, f"Invalid quantity {quantity} for product {product_id}")
+                return None
+            if self.catalog.get_product(product_id) is None:
+                report.reject(reference, f"Unknown product {product_id}")
+                return None
+            lines[product_id] = lines.get(product_id, 0) + quantity
+        if not lines:
+            report.reject(reference, "Order has no lines")
+            return None
+
+        order_date = None
+        if record.get('order_date'):
+            try:
+                # Stored order dates are naive local times, so an offset is converted rather than kept
+                order_date = parse_date(record['order_date'])
+            except (TypeError, ValueError):
+                report.reject(reference, f"Invalid order_date {record['order_date']!r}")
+                return None
+        return _PendingOrder(reference, customer, lines, order_date)
+
+    def _take_stock(self, pending: List[_PendingOrder],
+                    report: ImportReport) -> Tuple[List[_PendingOrder], Dict[int, Product]]:
+        products = {product_id: self.catalog.get_product(product_id)
+                    for p in pending for product_id in p.lines}
+        accepted = []
+        taken: Dict[int, int] = {}
+        with self.reservations.locked(products):
+            for p in pending:
+                short = next((product_id for product_id, quantity in p.lines.items()
+                              if products[product_id].stock_quantity - taken.get(product_id, 0) < quantity),
+                             None)
+                if short is not None:
+                    report.reject(p.reference, f"Insufficient stock for {products[short].name}")
+                    continue
+                for product_id, quantity in p.lines.items():
+                    taken[product_id] = taken.get(product_id, 0) + quantity
+                accepted.append(p)
+            # One stock change per product for the whole batch
+            for product_id, quantity in taken.items():
+                products[product_id].update_stock(-quantity)
+        return accepted, {product_id: products[product_id] for product_id in taken}
+
+    def _abandon(self, accepted: List[_PendingOrder], products: Dict[int, Product], orders: List[Order]):
+        # The batch's orders were never saved: its stock goes back on the shelf, as an abandoned checkout's does
+        returned: Dict[int, int] = {}
+        for p in accepted:
+            for product_id, quantity in p.lines.items():
+                returned[product_id] = returned.get(product_id, 0) + quantity
+        with self.reservations.locked(returned):
+            for product_id, quantity in returned.items():
+                products[product_id].update_stock(quantity)
+        for order in orders:
+            order.update_status(OrderStatus.CANCELLED)
+            order.customer.remove_order(order)
+
+    def _customer_for(self, fields: dict, new_customers: Dict[str, Customer]) -> Customer:
+        # Customers first seen in this batch have no id yet, so aren't in the catalog
+        email = normalize_email(fields['email'])
+        customer = self.catalog.get_customer_by_email(email) or new_customers.get(email)
+        if customer is None:
+            customer = Customer(0, *(str(fields.get(field) or '') for field in CUSTOMER_FIELDS))
+            new_customers[email] = customer
+        return customer
+
+
+def import_orders(records: Iterable[dict], catalog: Catalog, repository: StoreRepository,
+                  reservations: StockReservationEngine = None, batch_size: int = 500,
+                  on_commit: Callable[[List[Order]], None] = None) -> ImportReport:
+    return OrderImporter(catalog, repository, reservations, batch_size, on_commit=on_commit).run(records)
@@ -0,0 +1,639 @@
+"""Append-only journal of order, payment, delivery, stock and product changes.
+
+Each change is a record numbered by a sequence:
+
+    [seq, "stock", product_id, quantity]
+    [seq, "order_status", order_id, status]
+    [seq, "delivery_status", order_id, status, delivery_date]
+
+Model event listeners only queue a record. A writer thread takes everything
+queued so far and writes it as one line, a JSON array of records, with one
+write() and one fsync() (group commit). It then wakes whoever waits on those
+sequence numbers. A line cut short by a crash was never acknowledged, so
+recovery drops it whole. Every record sets a value
+outright rather than applying a delta, so applying a record again, or over a
+snapshot that already includes it, gives the same state.
+
+A snapshot is the whole store written as the same kind of records. Once it is
+on disk the journal moves to a new segment and the older segments are deleted.
+Recovery applies the snapshot and then every later record.
+"""
+import asyncio
+import gc
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from . import events
+from .catalog import Catalog
+from .enums import OrderStatus, PaymentStatus, DeliveryStatus
+from .models import Customer, ProductFamily, ProductCategory, Product
+from .orders import Order, OrderDetail
+from .repository import PRODUCT_TYPES, PRODUCT_ATTRIBUTES, SQLiteRepository
+
+SNAPSHOT_NAME = "snapshot.jsonl"
+SEGMENT_PREFIX = "journal-"
+SEGMENT_SUFFIX = ".log"
+READ_CHUNK_SIZE = 4 * 1024 * 1024
+SNAPSHOT_RECORDS_PER_LINE = 4096
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+_ORDER_STATUSES = {status.value: status for status in OrderStatus}
+_PAYMENT_STATUSES = {status.value: status for status in PaymentStatus}
+_DELIVERY_STATUSES = {status.value: status for status in DeliveryStatus}
+
+
+def _segment_name(first_seq: int) -> str:
+    return f"{SEGMENT_PREFIX}{first_seq:012d}{SEGMENT_SUFFIX}"
+
+
+def _segments(directory: str) -> List[str]:
+    """Journal segment paths, oldest first."""
+    names = sorted(name for name in os.listdir(directory)
+                   if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(directory, name) for name in names]
+
+
+def _sync_directory(directory: str):
+    # Makes a rename or new file durable; not possible on every platform
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# Records. Each returns the record without its sequence number.
+
+def _family_record(family: ProductFamily) -> tuple:
+    return ("family", family.family_id, family.name, family.description)
+
+
+def _category_record(category: ProductCategory) -> tuple:
+    return ("category", category.category_id, category.family.family_id, category.name, category.description)
+
+
+def _product_record(product: Product) -> tuple:
+    return ("product",) + SQLiteRepository._product_row(product)
+
+
+def _customer_record(customer: Customer) -> tuple:
+    return ("customer",) + SQLiteRepository._customer_row(customer)
+
+
+def _order_record(order: Order) -> tuple:
+    lines = [(d.detail_id, d.product.product_id, d.quantity, d.unit_price) for d in order.order_details]
+    payment = SQLiteRepository._payment_row(order.payment)[1:] if order.payment else None
+    delivery = SQLiteRepository._delivery_row(order.delivery)[1:] if order.delivery else None
+    return ("order", order.order_id, order.customer.customer_id, order.order_date.isoformat(),
+            order.total_amount, order.status.value, lines, payment, delivery)
+
+
+class _Snapshot:
+    """A snapshot request, queued behind the records it covers."""
+
+    def __init__(self, seq: int, families: List[ProductFamily], products: List[Product],
+                 customers: List[Customer], orders: List[Order]):
+        self.seq = seq
+        self.families = families
+        self.products = products
+        self.customers = customers
+        self.orders = orders
+
+    def records(self) -> Iterator[tuple]:
+        for family in self.families:
+            yield _family_record(family)
+            for category in family.categories:
+                yield _category_record(category)
+        for product in self.products:
+            yield _product_record(product)
+        for customer in self.customers:
+            yield _customer_record(customer)
+        for order in self.orders:
+            yield _order_record(order)
+
+
+class JournalState:
+    """A store rebuilt by replay(): its catalog, orders in id order and the last sequence applied."""
+
+    def __init__(self, catalog: Catalog, orders: List[Order], seq: int, snapshot_seq: int,
+                 snapshot_records: int, journal_records: int):
+        self.catalog = catalog
+        self.orders = orders
+        self.seq = seq
+        self.snapshot_seq = snapshot_seq
+        self.snapshot_records = snapshot_records
+        self.journal_records = journal_records
+
+
+class _StoreBuilder:
+    """Applies records to plain dicts, then builds the catalog once at the end.
+
+    Replay sets state quietly where it can: these are not new changes, and
+    event listeners would count them a second time.
+    """
+
+    def __init__(self):
+        self.families: Dict[int, ProductFamily] = {}
+        self.categories: Dict[int, ProductCategory] = {}
+        self.products: Dict[int, Product] = {}
+        self.customers: Dict[int, Customer] = {}
+        self.orders: Dict[int, Order] = {}
+        self.handlers = {
+            "stock": self.stock,
+            "order": self.order,
+            "order_status": self.order_status,
+            "payment_status": self.payment_status,
+            "delivery_status": self.delivery_status,
+            "customer": self.customer,
+            "product": self.product,
+            "product_removed": self.product_removed,
+            "family": self.family,
+            "category": self.category,
+        }
+
+    def apply(self, lines: Iterable[List[list]], after_seq: int = -1) -> Tuple[int, int]:
+        """Apply the records numbered after after_seq; returns how many and the last sequence seen."""
+        handlers = self.handlers
+        applied = 0
+        last_seq = after_seq
+        for records in lines:
+            for record in records:
+                seq = record[0]
+                if seq > after_seq:
+                    handlers[record[1]](record)
+                    applied += 1
+                    if seq > last_seq:
+                        last_seq = seq
+        return applied, last_seq
+
+    def family(self, record: list):
+        _, _, family_id, name, description = record
+        family = self.families.get(family_id)
+        if family is None:
+            self.families[family_id] = ProductFamily(family_id, name, description)
+        else:
+            family.name, family.description = name, description
+
+    def category(self, record: list):
+        _, _, category_id, family_id, name, description = record
+        category = self.categories.get(category_id)
+        if category is None:
+            family = self.families.get(family_id)
+            if family is not None:
+                self.categories[category_id] = ProductCategory(category_id, name, description, family)
+        else:
+            category.name, category.description = name, description
+
+    def product(self, record: list):
+        product_id, category_id, product_type, name, description, price, stock = record[2:9]
+        category = self.categories.get(category_id)
+        if category is None or product_type not in PRODUCT_TYPES:
+            return
+        product_class, fields = PRODUCT_TYPES[product_type]
+        attributes = dict(zip(PRODUCT_ATTRIBUTES, record[9:]))
+        product = self.products.get(product_id)
+        if product is not None and type(product) is product_class:
+            product.name, product.description, product.price = name, description, price
+            product._stock_quantity = stock
+            for field in fields:
+                setattr(product, field, attributes[field])
+            if product.category is not category:
+                product.category.remove_product(product)
+                product.category = category
+                category.add_product(product)
+            return
+        if product is not None:
+            product.category.remove_product(product)
+        self.products[product_id] = product_class(product_id, name, description, price, stock, category,
+                                                  *(attributes[field] for field in fields))
+
+    def product_removed(self, record: list):
+        product = self.products.pop(record[2], None)
+        if product is not None:
+            product.category.remove_product(product)
+
+    def stock(self, record: list):
+        product = self.products.get(record[2])
+        if product is not None:
+            product._stock_quantity = record[3]
+
+    def customer(self, record: list):
+        customer_id, first_name, last_name, email, phone, address = record[2:]
+        customer = self.customers.get(customer_id)
+        if customer is None:
+            self.customers[customer_id] = Customer(customer_id, first_name, last_name, email, phone, address)
+        else:
+            customer.first_name, customer.last_name = first_name, last_name
+            customer.email, customer.phone, customer.address = email, phone, address
+
+    def order(self, record: list):
+        _, _, order_id, customer_id, order_date, total_amount, status, lines, payment, delivery = record
+        customer = self.customers.get(customer_id)
+        if customer is None:
+            return
+        previous = self.orders.get(order_id)
+        if previous is not None:
+            previous.customer.remove_order(previous)
+        order = Order(order_id, customer, datetime.fromisoformat(order_date))
+        order.total_amount = total_amount
+        order.status = _ORDER_STATUSES[status]
+        products = self.products
+        for detail_id, product_id, quantity, unit_price in lines:
+            product = products.get(product_id)
+            if product is None:
+                continue
+            detail = OrderDetail(detail_id, order, product, quantity)
+            detail.unit_price = unit_price
+            detail.subtotal = unit_price * quantity
+            order.order_details.append(detail)
+        if payment:
+            SQLiteRepository._restore_payment(order, (order_id, *payment))
+        if delivery:
+            SQLiteRepository._restore_delivery(order, (order_id, *delivery))
+        self.orders[order_id] = order
+
+    def order_status(self, record: list):
+        order = self.orders.get(record[2])
+        if order is not None:
+            order.status = _ORDER_STATUSES[record[3]]
+
+    def payment_status(self, record: list):
+        order = self.orders.get(record[2])
+        if order is not None and order.payment is not None:
+            order.payment._status = _PAYMENT_STATUSES[record[3]]
+
+    def delivery_status(self, record: list):
+        order = self.orders.get(record[2])
+        if order is not None and order.delivery is not None:
+            order.delivery.status = _DELIVERY_STATUSES[record[3]]
+            order.delivery.delivery_date = datetime.fromisoformat(record[4]) if record[4] else None
+
+    def build(self) -> Tuple[Catalog, List[Order]]:
+        catalog = Catalog(self.families.values(), self.products.values(), self.customers.values())
+        return catalog, sorted(self.orders.values(), key=lambda order: order.order_id)
+
+
+class _TornRecord(Exception):
+    def __init__(self, offset: int):
+        super().__init__(offset)
+        self.offset = offset
+
+
+def _read_lines(path: str) -> Iterator[List[List[list]]]:
+    """The lines of one file, each a list of records, a chunk at a time.
+
+    A whole chunk of lines is parsed with one json.loads. A line that does not
+    parse, or a last line without its newline, raises _TornRecord with the
+    offset it starts at.
+    """
+    offset = 0
+    tail = b""
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            data = tail + chunk
+            end = data.rfind(b"\n") + 1
+            tail = data[end:]
+            if not end:
+                continue
+            try:
+                yield json.loads(b"[" + data[:end - 1].replace(b"\n", b",") + b"]")
+            except ValueError:
+                # Find the bad line, keeping the records before it
+                good = []
+                start = 0
+                for line in data[:end].splitlines(keepends=True):
+                    try:
+                        good.append(json.loads(line))
+                    except ValueError:
+                        yield good
+                        raise _TornRecord(offset + start)
+                    start += len(line)
+                yield good
+            offset += end
+    if tail:
+        raise _TornRecord(offset)
+
+
+def replay(directory: str) -> Optional[JournalState]:
+    """Rebuild the store from the snapshot and journal in directory; None if there is no snapshot yet.
+
+    A torn record at the end of the newest segment (a crash mid-write) is cut
+    off so appends continue from a clean end. Anything unreadable before that
+    raises ValueError.
+    """
+    snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+    if not os.path.exists(snapshot_path):
+        return None
+    # Everything replay allocates stays alive, so collecting as it piles up only
+    # costs time: about half of replay with the collector on
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        return _replay(directory, snapshot_path)
+    finally:
+        if collecting:
+            gc.enable()
+
+
+def _replay(directory: str, snapshot_path: str) -> JournalState:
+    builder = _StoreBuilder()
+    snapshot_seq = 0
+    snapshot_records = 0
+    try:
+        for lines in _read_lines(snapshot_path):
+            count, seq = builder.apply(lines)
+            snapshot_records += count
+            snapshot_seq = max(snapshot_seq, seq)
+    except _TornRecord:
+        raise ValueError(f"Snapshot {snapshot_path} is incomplete")
+
+    seq = snapshot_seq
+    journal_records = 0
+    segments = _segments(directory)
+    for number, path in enumerate(segments):
+        try:
+            for lines in _read_lines(path):
+                count, seq = builder.apply(lines, seq)
+                journal_records += count
+        except _TornRecord as torn:
+            if number != len(segments) - 1:
+                raise ValueError(f"Journal segment {path} is corrupt at byte {torn.offset}")
+            with open(path, "r+b") as file:
+                file.truncate(torn.offset)
+                os.fsync(file.fileno())
+
+    catalog, orders = builder.build()
+    return JournalState(catalog, orders, seq, snapshot_seq, snapshot_records, journal_records)
+
+
+class EventJournal:
+    """Journals store changes to a directory with group commit and periodic snapshots.
+
+    recover() rebuilds the store from disk; attach() starts recording changes
+    to a catalog and order list. Writes happen on a background thread, so a
+    change is durable only once flushed()/wait() says so.
+    """
+
+    def __init__(self, directory: str, snapshot_every: int = 100_000, fsync: bool = True):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.seq = 0
+        self.durable_seq = 0
+        self.commits = 0
+        self.error: Optional[BaseException] = None
+        self._snapshot_seq: Optional[int] = None
+        self._replayed = 0
+        self._catalog: Optional[Catalog] = None
+        self._orders: Optional[List[Order]] = None
+        self._category_ids = set()
+        self._pending: list = []
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._durable = threading.Condition(self._lock)
+        self._waiters: List[Tuple[int, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._closing = False
+        self._writer_idle = False
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        self._subscriptions = [
+            (events.STOCK_CHANGED, self._on_stock_changed),
+            (events.PRODUCT_ADDED, self._on_product_saved),
+            (events.PRODUCT_UPDATED, self._on_product_updated),
+            (events.PRODUCT_REMOVED, self._on_product_removed),
+            (events.ORDERS_SAVED, self._on_orders_saved),
+            (events.ORDER_STATUS_CHANGED, self._on_order_status_changed),
+            (events.PAYMENT_STATUS_CHANGED, self._on_payment_status_changed),
+            (events.DELIVERY_STATUS_CHANGED, self._on_delivery_status_changed),
+        ]
+        os.makedirs(directory, exist_ok=True)
+
+    def recover(self) -> Optional[JournalState]:
+        """Replay what is on disk and continue numbering after it. Call before attach()."""
+        state = replay(self.directory)
+        if state is not None:
+            self.seq = self.durable_seq = state.seq
+            self._snapshot_seq = state.snapshot_seq
+            self._replayed = state.journal_records
+        return state
+
+    def attach(self, catalog: Catalog, orders: List[Order]):
+        """Start journaling changes to catalog and orders (the repository's order list)."""
+        if self._thread is not None:
+            return
+        self._catalog = catalog
+        self._orders = orders
+        self._file = open(os.path.join(self.directory, _segment_name(self.seq + 1)), "ab")
+        self._thread = threading.Thread(target=self._run, name="surf-store-journal", daemon=True)
+        self._thread.start()
+        for event, listener in self._subscriptions:
+            events.subscribe(event, listener)
+        # A fresh directory needs its first snapshot; after a replay, one saves replaying it all next time
+        if self._snapshot_seq is None or self._replayed:
+            self.snapshot()
+
+    def close(self):
+        """Stop listening, write out everything queued and stop the writer."""
+        if self._thread is None:
+            return
+        for event, listener in self._subscriptions:
+            events.unsubscribe(event, listener)
+        with self._lock:
+            self._closing = True
+            self._wake.notify()
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+
+    def snapshot(self) -> int:
+        """Queue a snapshot of the attached store as of now; returns its sequence number."""
+        catalog = self._catalog
+        with self._lock:
+            seq = self._snapshot_seq = self.seq
+            self._category_ids = {c.category_id for f in catalog.families for c in f.categories}
+            # The lists are copied here; the writer reads the objects in them later, which is
+            # safe because every record after seq is applied over the snapshot at recovery
+            self._pending.append(_Snapshot(seq, list(catalog.families), list(catalog.products),
+                                           list(catalog.customers), list(self._orders)))
+            self._wake.notify()
+        return seq
+
+    # Waiting for durability
+
+    def wait(self, seq: int = None, timeout: float = None) -> bool:
+        """Block until seq (by default everything so far) is on disk; False on timeout."""
+        with self._lock:
+            seq = self.seq if seq is None else seq
+            done = self._durable.wait_for(lambda: self.durable_seq >= seq or self.error is not None, timeout)
+        if self.error is not None:
+            raise self.error
+        return done
+
+    async def flushed(self, seq: int = None):
+        """Wait without blocking the event loop until seq (by default everything so far) is on disk."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            seq = self.seq if seq is None else seq
+            if self.error is None and self.durable_seq >= seq:
+                return
+            future = loop.create_future()
+            if self.error is not None:
+                future.set_exception(self.error)
+            else:
+                self._waiters.append((seq, loop, future))
+        await future
+
+    # Recording
+
+    def _append(self, *records: tuple):
+        with self._lock:
+            for record in records:
+                self.seq += 1
+                self._pending.append((self.seq, *record))
+            # A busy writer picks these up with its next batch; only an idle one needs waking
+            if self._writer_idle:
+                self._writer_idle = False
+                self._wake.notify()
+            due = self._snapshot_seq is not None and self.seq - self._snapshot_seq >= self.snapshot_every
+        if due:
+            self.snapshot()
+
+    def _on_stock_changed(self, product: Product, old_quantity: int):
+        self._append(("stock", product.product_id, product.stock_quantity))
+
+    def _on_product_saved(self, product: Product):
+        records = []
+        category = product.category
+        if category.category_id not in self._category_ids:
+            # Categories are otherwise only written by snapshots
+            self._category_ids.add(category.category_id)
+            records += [_family_record(category.family), _category_record(category)]
+        self._append(*records, _product_record(product))
+
+    def _on_product_updated(self, product: Product, changed: tuple):
+        # Stock-only updates are already journaled by STOCK_CHANGED
+        if changed != ('stock_quantity',):
+            self._on_product_saved(product)
+
+    def _on_product_removed(self, product: Product):
+        self._append(("product_removed", product.product_id))
+
+    def _on_orders_saved(self, orders: List[Order]):
+        records = []
+        for order in orders:
+            records.append(_customer_record(order.customer))
+            records.append(_order_record(order))
+        self._append(*records)
+
+    def _on_order_status_changed(self, order: Order, old_status: OrderStatus):
+        self._append(("order_status", order.order_id, order.status.value))
+
+    def _on_payment_status_changed(self, payment, old_status):
+        self._append(("payment_status", payment.order.order_id, payment.status.value))
+
+    def _on_delivery_status_changed(self, delivery, old_status: DeliveryStatus):
+        delivery_date = delivery.delivery_date.isoformat() if delivery.delivery_date else None
+        self._append(("delivery_status", delivery.order.order_id, delivery.status.value, delivery_date))
+
+    # Writer thread
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._closing:
+                    self._writer_idle = True
+                    self._wake.wait()
+                self._writer_idle = False
+                batch, self._pending = self._pending, []
+                if not batch:
+                    return
+            try:
+                self._write(batch)
+            except BaseException as error:
+                self._fail(error)
+                return
+
+    def _write(self, batch: list):
+        records = []
+        seq = self.durable_seq
+        for item in batch:
+            if type(item) is _Snapshot:
+                self._commit(records)
+                records = []
+                self._write_snapshot(item)
+                seq = max(seq, item.seq)
+            else:
+                records.append(item)
+                seq = item[0]
+        self._commit(records)
+        self._mark_durable(seq)
+
+    def _commit(self, records: List[tuple]):
+        if not records:
+            return
+        # One encode call for the whole group; per-record calls cost several times more
+        self._file.write((_encode(records) + "\n").encode("utf-8"))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.commits += 1
+
+    def _write_snapshot(self, snapshot: _Snapshot):
+        path = os.path.join(self.directory, SNAPSHOT_NAME)
+        with open(path + ".tmp", "wb") as file:
+            records = []
+            for record in snapshot.records():
+                records.append((snapshot.seq, *record))
+                if len(records) >= SNAPSHOT_RECORDS_PER_LINE:
+                    file.write((_encode(records) + "\n").encode("utf-8"))
+                    records = []
+            if records:
+                file.write((_encode(records) + "\n").encode("utf-8"))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+        # Later records go to a new segment; everything in the older ones is in the snapshot
+        self._file.close()
+        new_segment = os.path.join(self.directory, _segment_name(snapshot.seq + 1))
+        self._file = open(new_segment, "ab")
+        for segment in _segments(self.directory):
+            if segment < new_segment:
+                os.remove(segment)
+        _sync_directory(self.directory)
+
+    def _mark_durable(self, seq: int):
+        with self._lock:
+            self.durable_seq = seq
+            self._durable.notify_all()
+            ready = [waiter for waiter in self._waiters if waiter[0] <= seq]
+            self._waiters = [waiter for waiter in self._waiters if waiter[0] > seq]
+        for _, loop, future in ready:
+            self._resolve(loop, future, None)
+
+    def _fail(self, error: BaseException):
+        with self._lock:
+            self.error = error
+            self._durable.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for _, loop, future in waiters:
+            self._resolve(loop, future, error)
+
+    @staticmethod
+    def _resolve(loop: asyncio.AbstractEventLoop, future: asyncio.Future, error: Optional[BaseException]):
+        def settle():
+            if not future.done():
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+        try:
+            loop.call_soon_threadsafe(settle)
+        except RuntimeError:
+            pass  # The loop has closed; nobody is waiting any more
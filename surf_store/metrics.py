@@ -0,0 +1,275 @@
+"""Store metrics in the Prometheus text format, switched on and off at runtime.
+
+While metrics are off nothing is wrapped or subscribed. Instrumented methods
+are the original functions, model events have no metrics listeners, and the
+ASGI middleware only checks one flag. enable() swaps timing wrappers onto
+the registered methods and subscribes to model events. disable() puts the
+originals back.
+"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from . import events
+from .catalog import Catalog
+from .enums import OrderStatus
+from .orders import (Order, CreditCardPayment, PayPalPayment, ApplePayPayment,
+                     StandardDelivery, ExpressDelivery, PickupDelivery)
+from .shipping import ShippingQuoteEngine
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Model methods on the checkout and catalog hot paths, timed as spans named Class.method
+STORE_HOT_PATHS = (
+    (Catalog, 'get_product'),
+    (Order, 'add_order_detail'),
+    (CreditCardPayment, 'process_payment'),
+    (PayPalPayment, 'process_payment'),
+    (ApplePayPayment, 'process_payment'),
+    (StandardDelivery, 'calculate_shipping_cost'),
+    (ExpressDelivery, 'calculate_shipping_cost'),
+    (PickupDelivery, 'calculate_shipping_cost'),
+    (ShippingQuoteEngine, 'quote_weight'),
+)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, labels: tuple = ()):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """A value read when metrics are scraped."""
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge",
+                f"{self.name} {_format_value(self.read())}"]
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (the last is +Inf), total count, sum]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, labels: tuple = ()):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += 1
+        series[2] += value
+
+    def count(self, labels: tuple = ()) -> int:
+        series = self._series.get(labels)
+        return series[1] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, (counts, total, value_sum) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labels, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(value_sum)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {total}")
+        return lines
+
+
+class StoreMetrics:
+    """Request latency, hot-path spans and order, revenue and stock counters for one store."""
+
+    def __init__(self, basket_count: Callable[[], int] = None, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.enabled = False
+        self.request_seconds = Histogram("surf_store_request_duration_seconds",
+                                         "Time to respond, by route template and method", ("method", "route"),
+                                         buckets)
+        self.span_seconds = Histogram("surf_store_span_duration_seconds",
+                                      "Time spent in instrumented store methods", ("span",), buckets)
+        self.orders = Counter("surf_store_orders_total", "Orders reaching each status", ("status",))
+        self.revenue = Counter("surf_store_revenue_total", "Total of orders when they are confirmed")
+        self.stock_outs = Counter("surf_store_stock_outs_total", "Times a product's stock fell to zero")
+        self.gauges = [Gauge("surf_store_metrics_enabled", "1 while metrics are being collected",
+                             lambda: int(self.enabled))]
+        if basket_count is not None:
+            self.gauges.append(Gauge("surf_store_baskets", "Open basket sessions", basket_count))
+        self._local = threading.local()
+        self._targets: List[Tuple[object, str, str]] = []
+        self._originals: Dict[Tuple[int, str], Tuple[Optional[object], Callable]] = {}
+        self._subscriptions = [
+            (events.ORDER_CREATED, self._on_order_created),
+            (events.ORDER_STATUS_CHANGED, self._on_order_status_changed),
+            (events.STOCK_CHANGED, self._on_stock_changed),
+        ]
+
+    def instrument(self, owner, attribute: str, span: str = None):
+        """Time owner.attribute as a span whenever metrics are on."""
+        if any(o is owner and a == attribute for o, a, _ in self._targets):
+            return
+        target = (owner, attribute, span or f"{owner.__name__}.{attribute}")
+        self._targets.append(target)
+        if self.enabled:
+            self._wrap(*target)
+
+    def instrument_all(self, targets: Iterable[Tuple[object, str]]):
+        for owner, attribute in targets:
+            self.instrument(owner, attribute)
+
+    def enable(self):
+        if self.enabled:
+            return
+        for target in self._targets:
+            self._wrap(*target)
+        for event, listener in self._subscriptions:
+            events.subscribe(event, listener)
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for event, listener in self._subscriptions:
+            events.unsubscribe(event, listener)
+        for owner, attribute, _ in self._targets:
+            own, timed = self._originals.pop((id(owner), attribute))
+            if owner.__dict__.get(attribute) is not timed:
+                continue  # Wrapped again by someone else since; leave their wrapper alone
+            if own is None:
+                delattr(owner, attribute)
+            else:
+                setattr(owner, attribute, own)
+
+    @contextmanager
+    def muted(self):
+        """Leave the order and stock counters alone for changes this thread makes inside the block.
+
+        For orders taken in from storage, which the process that created them
+        has already counted.
+        """
+        self._local.muted = getattr(self._local, 'muted', 0) + 1
+        try:
+            yield
+        finally:
+            self._local.muted -= 1
+
+    def _counting(self) -> bool:
+        return not getattr(self._local, 'muted', 0)
+
+    def _wrap(self, owner, attribute: str, span: str):
+        original = getattr(owner, attribute)
+        observe = self.span_seconds.observe
+        labels = (span,)
+        clock = time.perf_counter
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            started = clock()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                observe(clock() - started, labels)
+
+        # Remember whether owner defined the attribute itself, so disable() can restore inheritance
+        self._originals[(id(owner), attribute)] = (owner.__dict__.get(attribute), timed)
+        setattr(owner, attribute, timed)
+
+    def observe_request(self, method: str, route: str, seconds: float):
+        self.request_seconds.observe(seconds, (method, route))
+
+    def _on_order_created(self, order):
+        if self._counting():
+            self.orders.inc(1, (order.status.value,))
+
+    def _on_order_status_changed(self, order, old_status: OrderStatus):
+        if not self._counting():
+            return
+        self.orders.inc(1, (order.status.value,))
+        if order.status == OrderStatus.CONFIRMED:
+            self.revenue.inc(order.total_amount)
+
+    def _on_stock_changed(self, product, old_quantity: int):
+        if self._counting() and product.stock_quantity == 0 and old_quantity > 0:
+            self.stock_outs.inc()
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.request_seconds, self.span_seconds, self.orders, self.revenue, self.stock_outs,
+                       *self.gauges):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency by route template.
+
+    Routes are labelled with their path template (/track/{tracking_number},
+    not each tracking number). Requests that match no route share one label.
+    """
+
+    def __init__(self, app, metrics: StoreMetrics):
+        self.app = app
+        self.metrics = metrics
+        self._route_paths: Optional[Dict[object, str]] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.metrics.observe_request(scope["method"], self._route_of(scope), time.perf_counter() - started)
+
+    def _route_of(self, scope) -> str:
+        # The router fills in scope["endpoint"] once a route matches
+        if self._route_paths is None:
+            self._route_paths = {}
+            for route in getattr(scope.get("app"), "routes", ()):
+                endpoint = getattr(route, "endpoint", None) or getattr(route, "app", None)
+                self._route_paths.setdefault(endpoint, route.path)
+        return self._route_paths.get(scope.get("endpoint"), "unmatched")
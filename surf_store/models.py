@@ -1,8 +1,36 @@
-from typing import List
+import sys
+from typing import Dict, List, Optional, Tuple
 from abc import ABC, abstractmethod
+from .events import emit, STOCK_CHANGED
+
+# Shipping weights in kg, looked up by lower-cased subtype
+BOARD_SHIPPING_WEIGHTS = (("longboard", 5.0), ("shortboard", 4.0))
+SUP_SHIPPING_WEIGHT = 7.0
+FULL_SUIT_SHIPPING_WEIGHT = 1.5
+SPRING_SUIT_SHIPPING_WEIGHT = 1.0
+ACCESSORY_SHIPPING_WEIGHTS = {
+    "leash": 0.2,
+    "wax": 0.1,
+    "fins": 0.5,
+    "tshirt": 0.3,
+    "boardshorts": 0.4
+}
+DEFAULT_ACCESSORY_SHIPPING_WEIGHT = 0.3
+
+
+def _intern(value):
+    # Subtype attributes repeat across thousands of products; share one copy of each
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
 
 
 class Customer:
+    __slots__ = ('customer_id', 'first_name', 'last_name', 'email', 'phone', 'address',
+                 'orders', '_total_spent', '_shopping_cart')
+
     def __init__(self, customer_id: int, first_name: str, last_name: str,
                  email: str, phone: str, address: str):
         self.customer_id = customer_id
@@ -12,7 +40,16 @@ class Customer:
         self.phone = phone
         self.address = address
         self.orders: List['Order'] = []
-        self.shopping_cart = ShoppingCart(self)
+        # Kept in step by Order.total_amount, so history never has to be re-summed
+        self._total_spent = 0.0
+        self._shopping_cart: Optional['ShoppingCart'] = None
+
+    @property
+    def shopping_cart(self) -> 'ShoppingCart':
+        # Most customers never use their own cart (web baskets live in a BasketStore)
+        if self._shopping_cart is None:
+            self._shopping_cart = ShoppingCart(self)
+        return self._shopping_cart
 
     def get_full_name(self) -> str:
         return f"{self.first_name} {self.last_name}"
@@ -30,9 +67,24 @@ class Customer:
 
     def add_order(self, order: 'Order'):
         self.orders.append(order)
+        self._total_spent += order.total_amount
+
+    def remove_order(self, order: 'Order'):
+        # Abandoned checkouts are almost always the latest order
+        if self.orders and self.orders[-1] is order:
+            self.orders.pop()
+        else:
+            self.orders.remove(order)
+        self._total_spent -= order.total_amount
+
+    def _add_spend(self, amount: float):
+        self._total_spent += amount
+
+    def get_order_count(self) -> int:
+        return len(self.orders)
 
     def get_total_spent(self) -> float:
-        return sum(order.total_amount for order in self.orders)
+        return self._total_spent
 
     def __str__(self):
         return f"Customer: {self.get_full_name()} ({self.email})"
@@ -44,18 +96,28 @@ class ProductFamily:
         self.name = name
         self.description = description
         self.categories: List['ProductCategory'] = []
+        self._products_view: Optional[Tuple['Product', ...]] = None
 
     def add_category(self, category: 'ProductCategory'):
         self.categories.append(category)
+        self._invalidate_products()
 
     def get_categories(self) -> List['ProductCategory']:
         return self.categories.copy()
 
     def get_all_products(self) -> List['Product']:
-        all_products = []
-        for category in self.categories:
-            all_products.extend(category.get_products())
-        return all_products
+        return list(self.products_view)
+
+    @property
+    def products_view(self) -> Tuple['Product', ...]:
+        # Read-only snapshot shared between callers, rebuilt only after a change
+        if self._products_view is None:
+            self._products_view = tuple(product for category in self.categories
+                                        for product in category.products_view)
+        return self._products_view
+
+    def _invalidate_products(self):
+        self._products_view = None
 
     def __str__(self):
         return f"Product Family: {self.name} ({len(self.categories)} categories)"
@@ -68,29 +130,59 @@ class ProductCategory:
         self.description = description
         self.family = family
         self.products: List['Product'] = []
+        self._products_view: Optional[Tuple['Product', ...]] = None
         family.add_category(self)
 
     def add_product(self, product: 'Product'):
         self.products.append(product)
+        self._invalidate_products()
+
+    def remove_product(self, product: 'Product'):
+        if product in self.products:
+            self.products.remove(product)
+            self._invalidate_products()
 
     def get_products(self) -> List['Product']:
         return self.products.copy()
 
+    @property
+    def products_view(self) -> Tuple['Product', ...]:
+        if self._products_view is None:
+            self._products_view = tuple(self.products)
+        return self._products_view
+
+    def _invalidate_products(self):
+        self._products_view = None
+        self.family._invalidate_products()
+
     def __str__(self):
         return f"Category: {self.name} ({len(self.products)} products)"
 
 
 class Product(ABC):
+    __slots__ = ('product_id', 'name', 'description', 'price', '_stock_quantity', 'category')
+
     def __init__(self, product_id: int, name: str, description: str,
                  price: float, stock_quantity: int, category: ProductCategory):
         self.product_id = product_id
         self.name = name
         self.description = description
         self.price = price
-        self.stock_quantity = stock_quantity
+        self._stock_quantity = stock_quantity
         self.category = category
         category.add_product(self)
 
+    @property
+    def stock_quantity(self) -> int:
+        return self._stock_quantity
+
+    @stock_quantity.setter
+    def stock_quantity(self, quantity: int):
+        old_quantity = self._stock_quantity
+        self._stock_quantity = quantity
+        if quantity != old_quantity:
+            emit(STOCK_CHANGED, self, old_quantity)
+
     def update_stock(self, quantity: int):
         self.stock_quantity = max(0, self.stock_quantity + quantity)
 
@@ -119,22 +211,22 @@ class Product(ABC):
 
 
 class SurfBoard(Product):
+    __slots__ = ('length', 'board_type', 'fin_setup')
+
     def __init__(self, product_id: int, name: str, description: str,
                  price: float, stock_quantity: int, category: ProductCategory,
                  length: str, board_type: str, fin_setup: str):
         super().__init__(product_id, name, description, price, stock_quantity, category)
-        self.length = length
-        self.board_type = board_type
-        self.fin_setup = fin_setup
+        self.length = _intern(length)
+        self.board_type = _intern(board_type)
+        self.fin_setup = _intern(fin_setup)
 
     def get_shipping_weight(self) -> float:
-        base_weight = 3.0
-        if "longboard" in self.board_type.lower():
-            return base_weight + 2.0
-        elif "shortboard" in self.board_type.lower():
-            return base_weight + 1.0
-        else:  # SUP
-            return base_weight + 4.0
+        board_type = self.board_type.lower()
+        for keyword, weight in BOARD_SHIPPING_WEIGHTS:
+            if keyword in board_type:
+                return weight
+        return SUP_SHIPPING_WEIGHT
 
     def get_care_instructions(self) -> str:
         return "Rinse with fresh water after use. Store in a cool, dry place away from direct sunlight."
@@ -147,19 +239,20 @@ class SurfBoard(Product):
 
 
 class Wetsuit(Product):
+    __slots__ = ('thickness', 'suit_type', 'material')
+
     def __init__(self, product_id: int, name: str, description: str,
                  price: float, stock_quantity: int, category: ProductCategory,
                  thickness: str, suit_type: str, material: str):
         super().__init__(product_id, name, description, price, stock_quantity, category)
-        self.thickness = thickness
-        self.suit_type = suit_type
-        self.material = material
+        self.thickness = _intern(thickness)
+        self.suit_type = _intern(suit_type)
+        self.material = _intern(material)
 
     def get_shipping_weight(self) -> float:
         if "full" in self.suit_type.lower():
-            return 1.5
-        else:  # spring suit
-            return 1.0
+            return FULL_SUIT_SHIPPING_WEIGHT
+        return SPRING_SUIT_SHIPPING_WEIGHT
 
     def get_care_instructions(self) -> str:
         return f"Machine wash cold with {self.material}-friendly detergent. Hang dry only."
@@ -177,22 +270,17 @@ class Wetsuit(Product):
 
 
 class Accessory(Product):
+    __slots__ = ('accessory_type', 'compatibility')
+
     def __init__(self, product_id: int, name: str, description: str,
                  price: float, stock_quantity: int, category: ProductCategory,
                  accessory_type: str, compatibility: str = "Universal"):
         super().__init__(product_id, name, description, price, stock_quantity, category)
-        self.accessory_type = accessory_type
-        self.compatibility = compatibility
+        self.accessory_type = _intern(accessory_type)
+        self.compatibility = _intern(compatibility)
 
     def get_shipping_weight(self) -> float:
-        weight_map = {
-            "leash": 0.2,
-            "wax": 0.1,
-            "fins": 0.5,
-            "tshirt": 0.3,
-            "boardshorts": 0.4
-        }
-        return weight_map.get(self.accessory_type.lower(), 0.3)
+        return ACCESSORY_SHIPPING_WEIGHTS.get(self.accessory_type.lower(), DEFAULT_ACCESSORY_SHIPPING_WEIGHT)
 
     def get_care_instructions(self) -> str:
         if self.accessory_type.lower() in ["tshirt", "boardshorts"]:
@@ -207,59 +295,113 @@ class Accessory(Product):
 
 
 class ShoppingCart:
-    def __init__(self, customer: 'Customer'):
+    """Basket lines keyed by product_id, with subtotal, weight and item count kept as running totals.
+
+    Each line records the unit price and shipping weight at the time it was
+    last changed, so reading totals never walks the lines. reprice() brings
+    the lines up to date after a product's price or weight has changed.
+    """
+
+    def __init__(self, customer: Optional['Customer'] = None):
         self.customer = customer
-        self.items: List[dict] = []
+        self._lines: Dict[int, dict] = {}
+        self._subtotal = 0.0
+        self._weight = 0.0
+        self._item_count = 0
         self.discount_rate = 0.0
 
+    @property
+    def items(self):
+        return self._lines.values()
+
+    def get_line(self, product_id: int) -> Optional[dict]:
+        return self._lines.get(product_id)
+
+    def _set_line(self, product: Product, quantity: int):
+        line = self._lines.pop(product.product_id, None) if quantity <= 0 else self._lines.get(product.product_id)
+        if line is not None:
+            self._subtotal -= line['subtotal']
+            self._weight -= line['weight'] * line['quantity']
+            self._item_count -= line['quantity']
+        if quantity > 0:
+            if line is None:
+                line = self._lines[product.product_id] = {'product': product}
+            line['quantity'] = quantity
+            line['unit_price'] = product.price
+            line['weight'] = product.get_shipping_weight()
+            line['subtotal'] = product.price * quantity
+            self._subtotal += line['subtotal']
+            self._weight += line['weight'] * quantity
+            self._item_count += quantity
+        if not self._lines:
+            # Start clean so float drift from running sums can't linger
+            self._subtotal, self._weight = 0.0, 0.0
+
     def add_item(self, product: Product, quantity: int = 1):
         if not product.is_available(quantity):
             raise ValueError(f"Insufficient stock for {product.name}")
+        line = self._lines.get(product.product_id)
+        self._set_line(product, quantity + (line['quantity'] if line else 0))
 
-        for item in self.items:
-            if item['product'].product_id == product.product_id:
-                item['quantity'] += quantity
-                return
+    def set_quantity(self, product: Product, quantity: int):
+        self._set_line(product, quantity)
 
-        self.items.append({'product': product, 'quantity': quantity})
+    def reprice(self) -> bool:
+        """Re-read each line's price and weight from its product; True if any line changed."""
+        changed = False
+        for line in list(self._lines.values()):
+            product = line['product']
+            if line['unit_price'] != product.price or line['weight'] != product.get_shipping_weight():
+                self._set_line(product, line['quantity'])
+                changed = True
+        return changed
+
+    def get_quantities(self) -> dict:
+        return {product_id: line['quantity'] for product_id, line in self._lines.items()}
+
+    def get_item_count(self) -> int:
+        return self._item_count
 
     def remove_item(self, product: Product, quantity: int = None):
-        for i, item in enumerate(self.items):
-            if item['product'].product_id == product.product_id:
-                if quantity is None or quantity >= item['quantity']:
-                    del self.items[i]
-                else:
-                    item['quantity'] -= quantity
-                return
+        line = self._lines.get(product.product_id)
+        if line is not None:
+            remaining = 0 if quantity is None else line['quantity'] - quantity
+            self._set_line(product, remaining)
 
     def get_total_weight(self) -> float:
-        return sum(item['product'].get_shipping_weight() * item['quantity']
-                  for item in self.items)
+        return self._weight
 
     def get_subtotal(self) -> float:
-        return sum(item['product'].price * item['quantity'] for item in self.items)
+        return self._subtotal
 
     def get_total(self) -> float:
-        subtotal = self.get_subtotal()
-        return subtotal * (1 - self.discount_rate)
+        return self._subtotal * (1 - self.discount_rate)
 
     def apply_discount(self, rate: float):
         self.discount_rate = max(0, min(1, rate))
 
     def clear(self):
-        self.items.clear()
+        self._lines.clear()
+        self._subtotal, self._weight, self._item_count = 0.0, 0.0, 0
+
+    def __len__(self):
+        return len(self._lines)
 
     def __str__(self):
-        return f"Cart for {self.customer.get_full_name()}: {len(self.items)} items, Total: ${self.get_total():.2f}"
+        owner = self.customer.get_full_name() if self.customer else "guest"
+        return f"Cart for {owner}: {len(self._lines)} items, Total: ${self.get_total():.2f}"
 
 
 class Inventory:
     def __init__(self):
         self.products: List[Product] = []
         self.low_stock_threshold = 5
+        self._search_index = None
 
     def add_product(self, product: Product):
         self.products.append(product)
+        if self._search_index is not None:
+            self._search_index.add_product(product)
 
     def get_products_by_type(self, product_type: type) -> List[Product]:
         return [p for p in self.products if isinstance(p, product_type)]
@@ -271,9 +413,16 @@ class Inventory:
         return sum(p.price * p.stock_quantity for p in self.products)
 
     def search_products(self, keyword: str) -> List[Product]:
-        keyword_lower = keyword.lower()
-        return [p for p in self.products
-                if keyword_lower in p.name.lower() or keyword_lower in p.description.lower()]
+        """Products whose name or description contains keyword, ignoring case, in inventory order.
+
+        Answered from a trigram index (SubstringIndex), so "board" still finds
+        "Longboard". The storefront's ranked word and prefix search is SearchIndex.
+        """
+        # Built on first use, then kept up to date as products are added
+        if self._search_index is None:
+            from .search import SubstringIndex
+            self._search_index = SubstringIndex(self.products)
+        return self._search_index.search(keyword)
 
     def __str__(self):
         return f"Inventory: {len(self.products)} products, Value: ${self.get_total_inventory_value():.2f}"
\ No newline at end of file
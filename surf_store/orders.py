@@ -2,27 +2,61 @@ from datetime import datetime
 from typing import List, Optional
 from abc import ABC, abstractmethod
 from .enums import OrderStatus, PaymentStatus, DeliveryStatus
+from .events import (emit, ORDER_CREATED, ORDER_LINE_ADDED, ORDER_STATUS_CHANGED, PAYMENT_STATUS_CHANGED,
+                     DELIVERY_STATUS_CHANGED)
 from .models import Customer, Product
 
 
+class OrderContact:
+    """Name, email and phone given for one order, kept apart from the customer record they match."""
+    __slots__ = ('first_name', 'last_name', 'email', 'phone')
+
+    def __init__(self, first_name: str, last_name: str, email: str, phone: str):
+        self.first_name = first_name
+        self.last_name = last_name
+        self.email = email
+        self.phone = phone
+
+    def get_full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}"
+
+
 class Order:
-    def __init__(self, order_id: int, customer: Customer, order_date: datetime = None):
+    def __init__(self, order_id: int, customer: Customer, order_date: datetime = None,
+                 contact: OrderContact = None):
         self.order_id = order_id
         self.customer = customer
+        # Who to reach about this order; the customer's stored details unless others were given
+        self.contact = contact or customer
         self.order_date = order_date or datetime.now()
         self.order_details: List['OrderDetail'] = []
-        self.total_amount = 0.0
+        self._total_amount = 0.0
         self.status = OrderStatus.PENDING
         self.payment: Optional['Payment'] = None
         self.delivery: Optional['Delivery'] = None
         customer.add_order(self)
+        emit(ORDER_CREATED, self)
+
+    @property
+    def total_amount(self) -> float:
+        return self._total_amount
 
-    def add_order_detail(self, product: Product, quantity: int):
-        if product.is_available(quantity):
+    @total_amount.setter
+    def total_amount(self, amount: float):
+        # Carry the change into the customer's lifetime spend
+        self.customer._add_spend(amount - self._total_amount)
+        self._total_amount = amount
+
+    def add_order_detail(self, product: Product, quantity: int, reserved: bool = False):
+        # reserved: the stock was already taken by a StockReservationEngine hold
+        if reserved or product.is_available(quantity):
             detail = OrderDetail(len(self.order_details) + 1, self, product, quantity)
             self.order_details.append(detail)
-            product.update_stock(-quantity)
-            self.calculate_total()
+            if not reserved:
+                product.update_stock(-quantity)
+            # Running total; calculate_total() re-sums every line and is only needed after edits
+            self.total_amount += detail.subtotal
+            emit(ORDER_LINE_ADDED, self, detail)
             return detail
         else:
             raise ValueError(f"Insufficient stock for {product.name}")
@@ -31,7 +65,10 @@ class Order:
         self.total_amount = sum(detail.subtotal for detail in self.order_details)
 
     def update_status(self, status: OrderStatus):
+        old_status = self.status
         self.status = status
+        if status != old_status:
+            emit(ORDER_STATUS_CHANGED, self, old_status)
 
     def __str__(self):
         return f"Order #{self.order_id} - {self.customer.get_full_name()} - ${self.total_amount:.2f} ({self.status.value})"
@@ -60,9 +97,20 @@ class Payment(ABC):
         self.order = order
         self.amount = order.total_amount
         self.payment_date = datetime.now()
-        self.status = PaymentStatus.PENDING
+        self._status = PaymentStatus.PENDING
         order.payment = self
 
+    @property
+    def status(self) -> PaymentStatus:
+        return self._status
+
+    @status.setter
+    def status(self, status: PaymentStatus):
+        old_status = self._status
+        self._status = status
+        if status != old_status:
+            emit(PAYMENT_STATUS_CHANGED, self, old_status)
+
     @abstractmethod
     def process_payment(self) -> bool:
         pass
@@ -93,6 +141,7 @@ class CreditCardPayment(Payment):
         super().__init__(payment_id, order)
         self.card_number = f"****-****-****-{card_number[-4:]}"
         self.card_type = card_type
+        self.payment_method = "Debit Card" if card_type == "Debit" else "Credit Card"
 
     def process_payment(self) -> bool:
         try:
@@ -106,8 +155,12 @@ class CreditCardPayment(Payment):
             self.status = PaymentStatus.FAILED
             return False
 
+    @classmethod
+    def fee(cls, amount: float) -> float:
+        return amount * 0.029  # 2.9% fee
+
     def get_transaction_fee(self) -> float:
-        return self.amount * 0.029  # 2.9% fee
+        return self.fee(self.amount)
 
     def get_processing_time(self) -> str:
         return "Instant"
@@ -117,6 +170,8 @@ class CreditCardPayment(Payment):
 
 
 class PayPalPayment(Payment):
+    payment_method = "PayPal"
+
     def __init__(self, payment_id: int, order: Order, email: str):
         super().__init__(payment_id, order)
         self.email = email
@@ -133,8 +188,12 @@ class PayPalPayment(Payment):
             self.status = PaymentStatus.FAILED
             return False
 
+    @classmethod
+    def fee(cls, amount: float) -> float:
+        return amount * 0.034 + 0.30  # 3.4% + $0.30
+
     def get_transaction_fee(self) -> float:
-        return self.amount * 0.034 + 0.30  # 3.4% + $0.30
+        return self.fee(self.amount)
 
     def get_processing_time(self) -> str:
         return "1-2 business days"
@@ -144,6 +203,8 @@ class PayPalPayment(Payment):
 
 
 class ApplePayPayment(Payment):
+    payment_method = "Apple Pay"
+
     def __init__(self, payment_id: int, order: Order, device_id: str):
         super().__init__(payment_id, order)
         self.device_id = device_id
@@ -160,9 +221,13 @@ class ApplePayPayment(Payment):
             self.status = PaymentStatus.FAILED
             return False
 
-    def get_transaction_fee(self) -> float:
+    @classmethod
+    def fee(cls, amount: float) -> float:
         return 0.0  # No additional fee for Apple Pay
 
+    def get_transaction_fee(self) -> float:
+        return self.fee(self.amount)
+
     def get_processing_time(self) -> str:
         return "Instant"
 
@@ -171,6 +236,14 @@ class ApplePayPayment(Payment):
 
 
 class Delivery(ABC):
+    # Price rules as class data, so quotes can be made without an order:
+    # BASE_COST covers the first INCLUDED_WEIGHT kg, then PER_KG for each kg over
+    METHOD_NAME = ""
+    ESTIMATED_DAYS = 0
+    BASE_COST = 0.0
+    INCLUDED_WEIGHT = 0.0
+    PER_KG = 0.0
+
     def __init__(self, delivery_id: int, order: Order, address: str):
         self.delivery_id = delivery_id
         self.order = order
@@ -180,6 +253,10 @@ class Delivery(ABC):
         self.tracking_number = f"TC{delivery_id:06d}"
         order.delivery = self
 
+    @classmethod
+    def quote(cls, weight: float) -> float:
+        return cls.BASE_COST + max(0.0, weight - cls.INCLUDED_WEIGHT) * cls.PER_KG
+
     @abstractmethod
     def calculate_shipping_cost(self) -> float:
         pass
@@ -193,11 +270,15 @@ class Delivery(ABC):
         pass
 
     def update_status(self, status: DeliveryStatus):
+        old_status = self.status
         self.status = status
+        if status == DeliveryStatus.DELIVERED:
+            self.delivery_date = datetime.now()
+        if status != old_status:
+            emit(DELIVERY_STATUS_CHANGED, self, old_status)
         if status == DeliveryStatus.DISPATCHED:
             self.order.update_status(OrderStatus.DISPATCHED)
         elif status == DeliveryStatus.DELIVERED:
-            self.delivery_date = datetime.now()
             self.order.update_status(OrderStatus.DELIVERED)
 
     def track_delivery(self) -> str:
@@ -212,44 +293,51 @@ class Delivery(ABC):
 
 
 class StandardDelivery(Delivery):
+    METHOD_NAME = "Standard Delivery"
+    ESTIMATED_DAYS = 5
+    BASE_COST = 5.99
+    INCLUDED_WEIGHT = 5.0
+    PER_KG = 2.0
+
     def __init__(self, delivery_id: int, order: Order, address: str):
         super().__init__(delivery_id, order, address)
         self.tracking_number = f"STD{delivery_id:06d}"
 
     def calculate_shipping_cost(self) -> float:
-        weight = self.get_total_weight()
-        base_cost = 5.99
-        if weight > 5.0:
-            return base_cost + (weight - 5.0) * 2.0
-        return base_cost
+        return self.quote(self.get_total_weight())
 
     def get_estimated_delivery_days(self) -> int:
-        return 5
+        return self.ESTIMATED_DAYS
 
     def get_delivery_method(self) -> str:
-        return "Standard Delivery"
+        return self.METHOD_NAME
 
 
 class ExpressDelivery(Delivery):
+    METHOD_NAME = "Express Delivery"
+    ESTIMATED_DAYS = 2
+    BASE_COST = 15.99
+    INCLUDED_WEIGHT = 3.0
+    PER_KG = 3.0
+
     def __init__(self, delivery_id: int, order: Order, address: str):
         super().__init__(delivery_id, order, address)
         self.tracking_number = f"EXP{delivery_id:06d}"
 
     def calculate_shipping_cost(self) -> float:
-        weight = self.get_total_weight()
-        base_cost = 15.99
-        if weight > 3.0:
-            return base_cost + (weight - 3.0) * 3.0
-        return base_cost
+        return self.quote(self.get_total_weight())
 
     def get_estimated_delivery_days(self) -> int:
-        return 2
+        return self.ESTIMATED_DAYS
 
     def get_delivery_method(self) -> str:
-        return "Express Delivery"
+        return self.METHOD_NAME
 
 
 class PickupDelivery(Delivery):
+    METHOD_NAME = "Store Pickup"
+    ESTIMATED_DAYS = 1
+
     def __init__(self, delivery_id: int, order: Order, pickup_location: str):
         super().__init__(delivery_id, order, pickup_location)
         self.tracking_number = f"PU{delivery_id:06d}"
@@ -259,10 +347,10 @@ class PickupDelivery(Delivery):
         return 0.0  # Free pickup
 
     def get_estimated_delivery_days(self) -> int:
-        return 1
+        return self.ESTIMATED_DAYS
 
     def get_delivery_method(self) -> str:
-        return "Store Pickup"
+        return self.METHOD_NAME
 
     def __str__(self):
         return f"Store Pickup #{self.delivery_id} at {self.pickup_location} - {self.status.value}"
\ No newline at end of file
@@ -0,0 +1,165 @@
+import asyncio
+import random
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional
+from .enums import PaymentStatus
+from .orders import Order, Payment, CreditCardPayment, PayPalPayment, ApplePayPayment
+
+
+class PaymentGatewayError(Exception):
+    """A transient gateway failure; the charge may be retried with the same idempotency key."""
+
+
+class PaymentDeclinedError(Exception):
+    pass
+
+
+PAYMENT_METHODS = ("Credit Card", "Debit Card", "PayPal", "Apple Pay")
+
+
+def create_payment(payment_method: str, payment_id: int, order: Order, card_number: str = "",
+                   email: str = "", device_id: str = "web") -> Payment:
+    if payment_method in ("Credit Card", "Debit Card"):
+        card_type = "Debit" if payment_method == "Debit Card" else "Visa"
+        return CreditCardPayment(payment_id, order, card_number or "0000", card_type)
+    if payment_method == "PayPal":
+        return PayPalPayment(payment_id, order, email or order.customer.email)
+    if payment_method == "Apple Pay":
+        return ApplePayPayment(payment_id, order, device_id)
+    raise ValueError(f"Unsupported payment method: {payment_method}")
+
+
+class PaymentGateway(ABC):
+    @abstractmethod
+    async def charge(self, payment: Payment, idempotency_key: str) -> bool:
+        """Charge the payment once per key. Returns False on a decline."""
+        pass
+
+
+class SimulatedGateway(PaymentGateway):
+    """Local stand-in for a card processor, with latency and transient failures.
+
+    Outcomes are remembered per idempotency key, so a retry after a timeout
+    gets the original answer instead of charging twice.
+    """
+
+    def __init__(self, latency_ms: float = 200.0, jitter_ms: float = 50.0,
+                 failure_rate: float = 0.0, seed: Optional[int] = None, max_remembered: int = 10000):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.max_remembered = max_remembered
+        self.charges = 0
+        self._random = random.Random(seed)
+        self._outcomes: 'OrderedDict[str, bool]' = OrderedDict()
+
+    async def charge(self, payment: Payment, idempotency_key: str) -> bool:
+        delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms))
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if idempotency_key in self._outcomes:
+            return self._outcomes[idempotency_key]
+        if self._random.random() < self.failure_rate:
+            raise PaymentGatewayError("Gateway unavailable")
+
+        self.charges += 1
+        approved = payment.process_payment()
+        self._outcomes[idempotency_key] = approved
+        while len(self._outcomes) > self.max_remembered:
+            self._outcomes.popitem(last=False)
+        return approved
+
+
+class PaymentPipeline:
+    """Bounded pool of asyncio workers that charge payments through a gateway.
+
+    submit() queues a payment and waits for its outcome without blocking the
+    event loop. A full queue makes callers wait, which bounds how many charges
+    are in flight. Each attempt has a timeout. Timeouts and gateway errors are
+    retried with backoff under the same idempotency key. Submitting a key that
+    is already queued or done returns that outcome.
+    """
+
+    def __init__(self, gateway: PaymentGateway, workers: int = 16, queue_size: int = 256,
+                 timeout_seconds: float = 5.0, retries: int = 2, backoff_seconds: float = 0.05,
+                 max_remembered: int = 10000):
+        self.gateway = gateway
+        self.workers = workers
+        self.timeout_seconds = timeout_seconds
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.max_remembered = max_remembered
+        self.queue_size = queue_size
+        self.attempts = 0
+        self.retried = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks = []
+        self._outcomes: 'OrderedDict[str, asyncio.Future]' = OrderedDict()
+
+    def _ensure_started(self):
+        # Started on first use so the workers belong to the running event loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._outcomes.clear()
+            self._queue = asyncio.Queue(self.queue_size)
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._loop = None
+
+    async def submit(self, payment: Payment, idempotency_key: str) -> bool:
+        self._ensure_started()
+        outcome = self._outcomes.get(idempotency_key)
+        if outcome is None:
+            outcome = asyncio.get_running_loop().create_future()
+            self._outcomes[idempotency_key] = outcome
+            while len(self._outcomes) > self.max_remembered:
+                self._outcomes.popitem(last=False)
+            await self._queue.put((payment, idempotency_key, outcome))
+        return await asyncio.shield(outcome)
+
+    async def _worker(self):
+        while True:
+            payment, idempotency_key, outcome = await self._queue.get()
+            try:
+                approved = await self._charge(payment, idempotency_key)
+            except Exception as e:
+                if not outcome.done():
+                    outcome.set_exception(e)
+            else:
+                if not outcome.done():
+                    outcome.set_result(approved)
+            finally:
+                self._queue.task_done()
+
+    async def _charge(self, payment: Payment, idempotency_key: str) -> bool:
+        for attempt in range(self.retries + 1):
+            self.attempts += 1
+            try:
+                return await asyncio.wait_for(self.gateway.charge(payment, idempotency_key),
+                                              self.timeout_seconds)
+            except (PaymentGatewayError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    break
+                self.retried += 1
+                await asyncio.sleep(self.backoff_seconds * 2 ** attempt)
+        self.failed += 1
+        payment.status = PaymentStatus.FAILED
+        return False
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "attempts": self.attempts,
+            "retried": self.retried,
+            "failed": self.failed,
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
@@ -0,0 +1,149 @@
+import secrets
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+from . import events
+from .catalog import Catalog
+from .models import Product
+
+
+class FragmentCache(ABC):
+    """Rendered HTML keyed by whatever identifies its inputs.
+
+    Keys carry the catalog version they were rendered at, so entries are never
+    invalidated in place; stale ones simply stop being asked for.
+    """
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def set(self, key: Hashable, html: str):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class LRUFragmentCache(FragmentCache):
+    """Least-recently-used entries are evicted past max_entries or max_bytes of UTF-8 HTML.
+
+    A fragment larger than max_bytes on its own is not cached.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[str, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, html: str):
+        size = len(html.encode())
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size_bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (html, size)
+            self.size_bytes += size
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                self.size_bytes -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CatalogVersions:
+    """Change counters for the whole catalog, each family, category and product.
+
+    A stock change only moves the versions that product appears under, so a
+    busy wetsuit doesn't invalidate cached surfboard pages. Versions start from
+    a random epoch per process, so they never repeat across restarts.
+    """
+
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+        self.epoch = secrets.token_hex(4)
+        self._counter = 0
+        # Moves between categories bump the floor, which every scope is at least
+        self._floor = 0
+        self._families: Dict[int, int] = {}
+        self._categories: Dict[int, int] = {}
+        self._products: Dict[int, int] = {}
+        self._subscriptions = [
+            (events.STOCK_CHANGED, self._on_stock_changed),
+            (events.PRODUCT_ADDED, self._on_product_changed),
+            (events.PRODUCT_REMOVED, self._on_product_changed),
+            (events.PRODUCT_UPDATED, self._on_product_updated),
+        ]
+        for event, listener in self._subscriptions:
+            events.subscribe(event, listener)
+
+    def close(self):
+        for event, listener in self._subscriptions:
+            events.unsubscribe(event, listener)
+
+    @property
+    def version(self) -> str:
+        return f"{self.epoch}.{self._counter}"
+
+    def scope_version(self, family_id: int = None, category_id: int = None) -> str:
+        if category_id is not None:
+            changed = self._categories.get(category_id, 0)
+        elif family_id is not None:
+            changed = self._families.get(family_id, 0)
+        else:
+            changed = self._counter
+        return f"{self.epoch}.{max(changed, self._floor)}"
+
+    def product_version(self, product_id: int) -> str:
+        return f"{self.epoch}.{max(self._products.get(product_id, 0), self._floor)}"
+
+    def invalidate(self):
+        """Bump every scope, for changes that don't come through model events."""
+        self._counter += 1
+        self._floor = self._counter
+
+    def _touch(self, product: Product):
+        self._counter += 1
+        self._products[product.product_id] = self._counter
+        self._categories[product.category.category_id] = self._counter
+        self._families[product.get_family().family_id] = self._counter
+
+    def _on_stock_changed(self, product: Product, old_quantity: int):
+        if product in self.catalog:
+            self._touch(product)
+
+    def _on_product_changed(self, product: Product):
+        self._touch(product)
+
+    def _on_product_updated(self, product: Product, changed: tuple):
+        if 'category' in changed:
+            self.invalidate()
+        self._touch(product)
@@ -0,0 +1,590 @@
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from .enums import OrderStatus, PaymentStatus, DeliveryStatus
+from .models import Customer, ProductFamily, ProductCategory, Product, SurfBoard, Wetsuit, Accessory
+from .orders import (Order, OrderDetail, Payment, Delivery, CreditCardPayment, PayPalPayment,
+                     ApplePayPayment, StandardDelivery, ExpressDelivery, PickupDelivery)
+from .catalog import Catalog
+from .events import emit, ORDERS_SAVED
+
+
+class StoreRepository(ABC):
+    """Where the catalog, customers and orders are kept between restarts.
+
+    The app talks only to this interface. `orders` is the list of orders known
+    to this process and is appended to by add_order.
+    """
+
+    def __init__(self):
+        self.orders: List[Order] = []
+
+    @abstractmethod
+    def load_catalog(self) -> Catalog:
+        pass
+
+    @abstractmethod
+    def save_catalog(self, catalog: Catalog):
+        pass
+
+    @abstractmethod
+    def load_orders(self, catalog: Catalog) -> List[Order]:
+        pass
+
+    @abstractmethod
+    def add_customer(self, customer: Customer):
+        pass
+
+    def add_customers(self, customers: Iterable[Customer]):
+        for customer in customers:
+            self.add_customer(customer)
+
+    @abstractmethod
+    def add_orders(self, orders: Iterable[Order]):
+        pass
+
+    def add_order(self, order: Order):
+        self.add_orders([order])
+
+    def _remember_orders(self, orders: Iterable[Order]):
+        # Ids are allocated before payment, so orders can finish out of id order
+        for order in orders:
+            if not self.orders or order.order_id > self.orders[-1].order_id:
+                self.orders.append(order)
+            else:
+                insort(self.orders, order, key=lambda o: o.order_id)
+        emit(ORDERS_SAVED, orders)
+
+    def page_orders(self, before_id: int = None, limit: int = 10) -> Tuple[List[Order], Optional[int]]:
+        # Newest first; orders are kept in order_id order, so the cursor is found by bisection
+        end = len(self.orders) if before_id is None else bisect_left(self.orders, before_id,
+                                                                     key=lambda o: o.order_id)
+        start = max(0, end - limit)
+        page = self.orders[start:end][::-1]
+        return page, (page[-1].order_id if start > 0 else None)
+
+    @abstractmethod
+    def save_stock(self, products: Iterable[Product]):
+        pass
+
+    @abstractmethod
+    def save_order_status(self, orders: Iterable[Order]):
+        """Store the current order, payment and delivery status of orders already added."""
+        pass
+
+    def refresh_orders(self, catalog: Catalog) -> List[Order]:
+        """Take in orders, and order status changes, saved by other processes since the last call.
+
+        Returns the orders that were new to this process. Backends only one
+        process writes to have nothing to do.
+        """
+        return []
+
+    @abstractmethod
+    def next_id(self, name: str) -> int:
+        pass
+
+    def next_ids(self, name: str, count: int) -> Sequence[int]:
+        """Allocate count ids at once; backends override this with a single round trip."""
+        return [self.next_id(name) for _ in range(count)]
+
+    def close(self):
+        pass
+
+
+class InMemoryRepository(StoreRepository):
+    def __init__(self, catalog: Catalog = None):
+        super().__init__()
+        self.catalog = catalog or Catalog()
+        self._sequences: Dict[str, int] = {}
+
+    def load_catalog(self) -> Catalog:
+        return self.catalog
+
+    def save_catalog(self, catalog: Catalog):
+        self.catalog = catalog
+        self._sequences['customer'] = max(self._sequences.get('customer', 0),
+                                          catalog.next_customer_id() - 1)
+
+    def load_orders(self, catalog: Catalog) -> List[Order]:
+        return self.orders
+
+    def add_customer(self, customer: Customer):
+        self._sequences['customer'] = max(self._sequences.get('customer', 0), customer.customer_id)
+
+    def add_orders(self, orders: Iterable[Order]):
+        orders = list(orders)
+        self._remember_orders(orders)
+        self._sequences['order'] = max([self._sequences.get('order', 0)] + [o.order_id for o in orders])
+
+    def save_stock(self, products: Iterable[Product]):
+        pass
+
+    def save_order_status(self, orders: Iterable[Order]):
+        pass
+
+    def next_id(self, name: str) -> int:
+        self._sequences[name] = self._sequences.get(name, 0) + 1
+        return self._sequences[name]
+
+    def next_ids(self, name: str, count: int) -> range:
+        first = self._sequences.get(name, 0) + 1
+        self._sequences[name] = first + count - 1
+        return range(first, first + count)
+
+
+# Subtype-specific product columns, keyed by the product_type stored in each row
+PRODUCT_TYPES = {
+    'SurfBoard': (SurfBoard, ('length', 'board_type', 'fin_setup')),
+    'Wetsuit': (Wetsuit, ('thickness', 'suit_type', 'material')),
+    'Accessory': (Accessory, ('accessory_type', 'compatibility')),
+}
+PRODUCT_ATTRIBUTES = ('length', 'board_type', 'fin_setup', 'thickness', 'suit_type',
+                      'material', 'accessory_type', 'compatibility')
+
+PAYMENT_TYPES = {
+    'CreditCardPayment': CreditCardPayment,
+    'PayPalPayment': PayPalPayment,
+    'ApplePayPayment': ApplePayPayment,
+}
+
+DELIVERY_TYPES = {
+    'StandardDelivery': StandardDelivery,
+    'ExpressDelivery': ExpressDelivery,
+    'PickupDelivery': PickupDelivery,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS families (
+    family_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS categories (
+    category_id INTEGER PRIMARY KEY,
+    family_id INTEGER NOT NULL REFERENCES families(family_id),
+    name TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    product_id INTEGER PRIMARY KEY,
+    category_id INTEGER NOT NULL REFERENCES categories(category_id),
+    product_type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    price REAL NOT NULL,
+    stock_quantity INTEGER NOT NULL,
+    length TEXT, board_type TEXT, fin_setup TEXT,
+    thickness TEXT, suit_type TEXT, material TEXT,
+    accessory_type TEXT, compatibility TEXT
+);
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id INTEGER PRIMARY KEY,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    address TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    order_id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL REFERENCES customers(customer_id),
+    order_date TEXT NOT NULL,
+    total_amount REAL NOT NULL,
+    status TEXT NOT NULL,
+    changed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS order_details (
+    order_id INTEGER NOT NULL REFERENCES orders(order_id),
+    detail_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    unit_price REAL NOT NULL,
+    subtotal REAL NOT NULL,
+    PRIMARY KEY (order_id, detail_id)
+);
+CREATE TABLE IF NOT EXISTS payments (
+    order_id INTEGER PRIMARY KEY REFERENCES orders(order_id),
+    payment_id INTEGER NOT NULL,
+    payment_type TEXT NOT NULL,
+    amount REAL NOT NULL,
+    payment_date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    card_number TEXT, card_type TEXT, email TEXT, device_id TEXT
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    order_id INTEGER PRIMARY KEY REFERENCES orders(order_id),
+    delivery_id INTEGER NOT NULL,
+    delivery_type TEXT NOT NULL,
+    address TEXT NOT NULL,
+    delivery_date TEXT,
+    status TEXT NOT NULL,
+    tracking_number TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sequences (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+INSERT_FAMILY = "INSERT OR REPLACE INTO families VALUES (?, ?, ?)"
+INSERT_CATEGORY = "INSERT OR REPLACE INTO categories VALUES (?, ?, ?, ?)"
+INSERT_PRODUCT = "INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+INSERT_CUSTOMER = "INSERT OR REPLACE INTO customers VALUES (?, ?, ?, ?, ?, ?)"
+INSERT_ORDER = ("INSERT OR REPLACE INTO orders (order_id, customer_id, order_date, total_amount, status, changed) "
+                "VALUES (?, ?, ?, ?, ?, ?)")
+INSERT_DETAIL = "INSERT OR REPLACE INTO order_details VALUES (?, ?, ?, ?, ?, ?)"
+INSERT_PAYMENT = "INSERT OR REPLACE INTO payments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+INSERT_DELIVERY = "INSERT OR REPLACE INTO deliveries VALUES (?, ?, ?, ?, ?, ?, ?)"
+UPDATE_STOCK = "UPDATE products SET stock_quantity = ? WHERE product_id = ?"
+UPDATE_ORDER_STATUS = "UPDATE orders SET status = ?, changed = ? WHERE order_id = ?"
+UPDATE_PAYMENT_STATUS = "UPDATE payments SET status = ? WHERE order_id = ?"
+UPDATE_DELIVERY_STATUS = "UPDATE deliveries SET status = ?, delivery_date = ? WHERE order_id = ?"
+# One row per order line, with the order's customer, payment and delivery; filters go in {where}
+ORDER_LINES_QUERY = """
+SELECT o.order_id, o.order_date, o.status, o.total_amount,
+       c.customer_id, c.first_name, c.last_name, c.email,
+       d.detail_id, d.product_id, d.quantity, d.unit_price, d.subtotal,
+       p.payment_id, p.payment_type, p.card_type, p.status, p.amount,
+       v.delivery_id, v.delivery_type, v.status, v.tracking_number, v.address
+FROM orders o
+JOIN customers c ON c.customer_id = o.customer_id
+LEFT JOIN order_details d ON d.order_id = o.order_id
+LEFT JOIN payments p ON p.order_id = o.order_id
+LEFT JOIN deliveries v ON v.order_id = o.order_id
+{where}
+ORDER BY o.order_id, d.detail_id
+"""
+SEED_SEQUENCE = "INSERT OR IGNORE INTO sequences VALUES (?, ?)"
+BUMP_SEQUENCE = "UPDATE sequences SET value = MAX(value, ?) WHERE name = ?"
+NEXT_SEQUENCE = "UPDATE sequences SET value = value + ? WHERE name = ? RETURNING value"
+
+
+class SQLiteRepository(StoreRepository):
+    """SQLite-backed repository shared by every worker pointed at the same file.
+
+    Runs in WAL mode so readers never block the writer, and keeps one pooled
+    connection per thread with a statement cache so repeated queries stay
+    prepared. Multi-row writes go through executemany.
+
+    Every order write stamps its rows with the next number of the
+    'order_change' sequence, taken inside the write transaction, so
+    refresh_orders() finds what other workers saved with one indexed range
+    query on orders.changed.
+    """
+
+    def __init__(self, path: str, cached_statements: int = 256):
+        super().__init__()
+        self.path = path
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
+        self._changes_seen = 0
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            # Databases created before orders.changed existed
+            if 'changed' not in {row[1] for row in conn.execute("PRAGMA table_info(orders)")}:
+                conn.execute("ALTER TABLE orders ADD COLUMN changed INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_changed ON orders(changed)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False,
+                                   cached_statements=self.cached_statements)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._pool_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        with self._pool_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    # Catalog
+
+    def save_catalog(self, catalog: Catalog):
+        with self._connection() as conn:
+            conn.executemany(INSERT_FAMILY, ((f.family_id, f.name, f.description)
+                                             for f in catalog.families))
+            conn.executemany(INSERT_CATEGORY, ((c.category_id, f.family_id, c.name, c.description)
+                                               for f in catalog.families for c in f.categories))
+            conn.executemany(INSERT_PRODUCT, (self._product_row(p) for p in catalog.products))
+            conn.executemany(INSERT_CUSTOMER, (self._customer_row(c) for c in catalog.customers))
+            conn.execute(SEED_SEQUENCE, ('customer', 0))
+            conn.execute(BUMP_SEQUENCE, (catalog.next_customer_id() - 1, 'customer'))
+
+    def load_catalog(self, customers: bool = True) -> Catalog:
+        conn = self._connection()
+        families = {}
+        for family_id, name, description in conn.execute(
+                "SELECT family_id, name, description FROM families ORDER BY family_id"):
+            families[family_id] = ProductFamily(family_id, name, description)
+
+        categories = {}
+        for category_id, family_id, name, description in conn.execute(
+                "SELECT category_id, family_id, name, description FROM categories ORDER BY category_id"):
+            categories[category_id] = ProductCategory(category_id, name, description, families[family_id])
+
+        columns = ", ".join(PRODUCT_ATTRIBUTES)
+        products = []
+        for row in conn.execute(
+                f"SELECT product_id, category_id, product_type, name, description, price, stock_quantity, "
+                f"{columns} FROM products ORDER BY product_id"):
+            product_id, category_id, product_type, name, description, price, stock = row[:7]
+            attributes = dict(zip(PRODUCT_ATTRIBUTES, row[7:]))
+            product_class, fields = PRODUCT_TYPES[product_type]
+            products.append(product_class(product_id, name, description, price, stock,
+                                          categories[category_id], *(attributes[f] for f in fields)))
+
+        if customers:
+            customers = [Customer(*row) for row in conn.execute(
+                "SELECT customer_id, first_name, last_name, email, phone, address FROM customers "
+                "ORDER BY customer_id")]
+        return Catalog(families.values(), products, customers or ())
+
+    def add_customer(self, customer: Customer):
+        with self._connection() as conn:
+            conn.execute(INSERT_CUSTOMER, self._customer_row(customer))
+
+    def add_customers(self, customers: Iterable[Customer]):
+        with self._connection() as conn:
+            conn.executemany(INSERT_CUSTOMER, (self._customer_row(c) for c in customers))
+
+    def save_stock(self, products: Iterable[Product]):
+        with self._connection() as conn:
+            conn.executemany(UPDATE_STOCK, ((p.stock_quantity, p.product_id) for p in products))
+
+    def next_id(self, name: str) -> int:
+        # Allocated inside the database so concurrent workers never hand out the same id
+        with self._connection() as conn:
+            conn.execute(SEED_SEQUENCE, (name, 0))
+            return conn.execute(NEXT_SEQUENCE, (1, name)).fetchone()[0]
+
+    def next_ids(self, name: str, count: int) -> range:
+        with self._connection() as conn:
+            conn.execute(SEED_SEQUENCE, (name, 0))
+            last = conn.execute(NEXT_SEQUENCE, (count, name)).fetchone()[0]
+        return range(last - count + 1, last + 1)
+
+    @staticmethod
+    def _product_row(product: Product) -> tuple:
+        return (product.product_id, product.category.category_id, type(product).__name__,
+                product.name, product.description, product.price, product.stock_quantity,
+                *(getattr(product, attribute, None) for attribute in PRODUCT_ATTRIBUTES))
+
+    @staticmethod
+    def _customer_row(customer: Customer) -> tuple:
+        return (customer.customer_id, customer.first_name, customer.last_name,
+                customer.email, customer.phone, customer.address)
+
+    # Orders
+
+    @staticmethod
+    def _next_change(conn: sqlite3.Connection) -> int:
+        conn.execute(SEED_SEQUENCE, ('order_change', 0))
+        return conn.execute(NEXT_SEQUENCE, (1, 'order_change')).fetchone()[0]
+
+    def add_orders(self, orders: Iterable[Order]):
+        orders = list(orders)
+        with self._connection() as conn:
+            change = self._next_change(conn)
+            conn.executemany(INSERT_ORDER, ((o.order_id, o.customer.customer_id, o.order_date.isoformat(),
+                                             o.total_amount, o.status.value, change) for o in orders))
+            conn.executemany(INSERT_DETAIL, ((o.order_id, d.detail_id, d.product.product_id, d.quantity,
+                                              d.unit_price, d.subtotal)
+                                             for o in orders for d in o.order_details))
+            conn.executemany(INSERT_PAYMENT, (self._payment_row(o.payment) for o in orders if o.payment))
+            conn.executemany(INSERT_DELIVERY, (self._delivery_row(o.delivery) for o in orders if o.delivery))
+            conn.execute(SEED_SEQUENCE, ('order', 0))
+            conn.execute(BUMP_SEQUENCE, (max((o.order_id for o in orders), default=0), 'order'))
+        self._remember_orders(orders)
+
+    def save_order_status(self, orders: Iterable[Order]):
+        orders = list(orders)
+        with self._connection() as conn:
+            change = self._next_change(conn)
+            conn.executemany(UPDATE_ORDER_STATUS, ((o.status.value, change, o.order_id) for o in orders))
+            conn.executemany(UPDATE_PAYMENT_STATUS, ((o.payment.status.value, o.order_id)
+                                                     for o in orders if o.payment))
+            conn.executemany(UPDATE_DELIVERY_STATUS, (
+                (o.delivery.status.value,
+                 o.delivery.delivery_date.isoformat() if o.delivery.delivery_date else None, o.order_id)
+                for o in orders if o.delivery))
+
+    def load_orders(self, catalog: Catalog) -> List[Order]:
+        conn = self._connection()
+        self._changes_seen = conn.execute("SELECT COALESCE(MAX(changed), 0) FROM orders").fetchone()[0]
+        self.orders = list(self._load_orders(conn, catalog).values())
+        return self.orders
+
+    def refresh_orders(self, catalog: Catalog) -> List[Order]:
+        conn = self._connection()
+        rows = conn.execute(
+            "SELECT o.order_id, o.status, o.changed, p.status, v.status, v.delivery_date FROM orders o "
+            "LEFT JOIN payments p ON p.order_id = o.order_id LEFT JOIN deliveries v ON v.order_id = o.order_id "
+            "WHERE o.changed > ?", (self._changes_seen,)).fetchall()
+        if not rows:
+            return []
+        changes_after, self._changes_seen = self._changes_seen, max(row[2] for row in rows)
+        new_orders = False
+        for order_id, status, _, payment_status, delivery_status, delivery_date in rows:
+            order = self._known_order(order_id)
+            if order is None:
+                new_orders = True
+            else:
+                self._restore_status(order, status, payment_status, delivery_status, delivery_date)
+        if not new_orders:
+            return []
+        added = list(self._load_orders(conn, catalog, changes_after).values())
+        self._remember_orders(added)
+        return added
+
+    def _known_order(self, order_id: int) -> Optional[Order]:
+        index = bisect_left(self.orders, order_id, key=lambda o: o.order_id)
+        if index < len(self.orders) and self.orders[index].order_id == order_id:
+            return self.orders[index]
+        return None
+
+    def _customer_for(self, conn: sqlite3.Connection, catalog: Catalog, customer_id: int) -> Optional[Customer]:
+        customer = catalog.get_customer(customer_id)
+        if customer is None:
+            # Saved by another worker after this one loaded its catalog
+            row = conn.execute("SELECT customer_id, first_name, last_name, email, phone, address FROM customers "
+                               "WHERE customer_id = ?", (customer_id,)).fetchone()
+            if row is not None:
+                customer = Customer(*row)
+                catalog.add_customer(customer)
+        return customer
+
+    def _load_orders(self, conn: sqlite3.Connection, catalog: Catalog,
+                     changed_after: int = None) -> Dict[int, Order]:
+        # changed_after: only orders written since that change, leaving out those already in `orders`
+        where, params = ("WHERE changed > ?", (changed_after,)) if changed_after is not None else ("", ())
+        selected = f"SELECT order_id FROM orders {where}"
+        orders: Dict[int, Order] = {}
+        for order_id, customer_id, order_date, total_amount, status in conn.execute(
+                f"SELECT order_id, customer_id, order_date, total_amount, status FROM orders {where} "
+                f"ORDER BY order_id", params):
+            if changed_after is not None and self._known_order(order_id) is not None:
+                continue
+            customer = self._customer_for(conn, catalog, customer_id)
+            if customer is None:
+                continue
+            order = Order(order_id, customer, datetime.fromisoformat(order_date))
+            order.total_amount = total_amount
+            order.status = OrderStatus(status)
+            orders[order_id] = order
+
+        for order_id, detail_id, product_id, quantity, unit_price, subtotal in conn.execute(
+                f"SELECT order_id, detail_id, product_id, quantity, unit_price, subtotal FROM order_details "
+                f"WHERE order_id IN ({selected}) ORDER BY order_id, detail_id", params):
+            order = orders.get(order_id)
+            product = catalog.get_product(product_id)
+            if order is None or product is None:
+                continue
+            detail = OrderDetail(detail_id, order, product, quantity)
+            detail.unit_price = unit_price
+            detail.subtotal = subtotal
+            order.order_details.append(detail)
+
+        for row in conn.execute(f"SELECT order_id, payment_id, payment_type, amount, payment_date, status, "
+                                f"card_number, card_type, email, device_id FROM payments "
+                                f"WHERE order_id IN ({selected})", params):
+            if row[0] in orders:
+                self._restore_payment(orders[row[0]], row)
+
+        for row in conn.execute(f"SELECT order_id, delivery_id, delivery_type, address, delivery_date, status, "
+                                f"tracking_number FROM deliveries WHERE order_id IN ({selected})", params):
+            if row[0] in orders:
+                self._restore_delivery(orders[row[0]], row)
+        return orders
+
+    @staticmethod
+    def _restore_status(order: Order, status: str, payment_status: Optional[str], delivery_status: Optional[str],
+                        delivery_date: Optional[str]):
+        # Through the setters, so indexes and totals kept from status events follow
+        if order.payment and payment_status:
+            order.payment.status = PaymentStatus(payment_status)
+        if order.delivery and delivery_status:
+            order.delivery.update_status(DeliveryStatus(delivery_status))
+            order.delivery.delivery_date = datetime.fromisoformat(delivery_date) if delivery_date else None
+        order.update_status(OrderStatus(status))
+
+    def iter_order_lines(self, since: datetime = None, until: datetime = None,
+                         statuses: Iterable[OrderStatus] = None) -> Iterator[tuple]:
+        """ORDER_LINES_QUERY rows for the orders matching the filters, fetched as they are read.
+
+        Runs on a connection of its own, so a long export reads one consistent
+        snapshot and never shares a cursor with the pooled connections.
+        """
+        conditions, params = [], []
+        # Order dates are stored as naive ISO strings, which sort as text in date order
+        if since:
+            conditions.append("o.order_date >= ?")
+            params.append(since.isoformat())
+        if until:
+            conditions.append("o.order_date < ?")
+            params.append(until.isoformat())
+        statuses = [status.value for status in statuses or ()]
+        if statuses:
+            conditions.append(f"o.status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+        try:
+            yield from conn.execute(ORDER_LINES_QUERY.format(where=where), params)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _payment_row(payment: Payment) -> tuple:
+        return (payment.order.order_id, payment.payment_id, type(payment).__name__, payment.amount,
+                payment.payment_date.isoformat(), payment.status.value,
+                getattr(payment, 'card_number', None), getattr(payment, 'card_type', None),
+                getattr(payment, 'email', None), getattr(payment, 'device_id', None))
+
+    @staticmethod
+    def _restore_payment(order: Order, row: tuple) -> Optional[Payment]:
+        _, payment_id, payment_type, amount, payment_date, status, card_number, card_type, email, device_id = row
+        if payment_type == 'CreditCardPayment':
+            payment = CreditCardPayment(payment_id, order, card_number, card_type)
+            payment.card_number = card_number
+        elif payment_type == 'PayPalPayment':
+            payment = PayPalPayment(payment_id, order, email)
+        elif payment_type == 'ApplePayPayment':
+            payment = ApplePayPayment(payment_id, order, device_id)
+        else:
+            return None
+        payment.amount = amount
+        payment.payment_date = datetime.fromisoformat(payment_date)
+        payment.status = PaymentStatus(status)
+        return payment
+
+    @staticmethod
+    def _delivery_row(delivery: Delivery) -> tuple:
+        return (delivery.order.order_id, delivery.delivery_id, type(delivery).__name__, delivery.address,
+                delivery.delivery_date.isoformat() if delivery.delivery_date else None,
+                delivery.status.value, delivery.tracking_number)
+
+    @staticmethod
+    def _restore_delivery(order: Order, row: tuple) -> Optional[Delivery]:
+        _, delivery_id, delivery_type, address, delivery_date, status, tracking_number = row
+        delivery_class = DELIVERY_TYPES.get(delivery_type)
+        if delivery_class is None:
+            return None
+        delivery = delivery_class(delivery_id, order, address)
+        delivery.delivery_date = datetime.fromisoformat(delivery_date) if delivery_date else None
+        delivery.status = DeliveryStatus(status)
+        delivery.tracking_number = tracking_number
+        return delivery
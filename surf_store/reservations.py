@@ -0,0 +1,131 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional
+from .models import Product
+
+
+class InsufficientStockError(ValueError):
+    def __init__(self, product: Product, requested: int):
+        super().__init__(f"Insufficient stock for {product.name}")
+        self.product = product
+        self.requested = requested
+
+
+class Reservation:
+    HELD = "held"
+    COMMITTED = "committed"
+    RELEASED = "released"
+
+    def __init__(self, reservation_id: int, lines: Dict[int, int], products: Dict[int, Product],
+                 expires_at: float):
+        self.reservation_id = reservation_id
+        self.lines = lines
+        self.products = products
+        self.expires_at = expires_at
+        self.status = Reservation.HELD
+
+    def is_expired(self, now: float = None) -> bool:
+        return (now if now is not None else time.monotonic()) >= self.expires_at
+
+    def __str__(self):
+        return f"Reservation #{self.reservation_id}: {len(self.lines)} lines ({self.status})"
+
+
+class StockReservationEngine:
+    """Reserves stock for whole baskets under per-product striped locks.
+
+    Reserving takes the stock off the shelf straight away, so listing pages and
+    other checkouts see it as gone. The hold is then committed once payment
+    succeeds, or released (explicitly or by TTL) to put the stock back.
+    Checkouts on products in different stripes never wait on each other.
+    """
+
+    def __init__(self, product_lookup: Callable[[int], Optional[Product]],
+                 stripes: int = 64, ttl_seconds: float = 300.0):
+        self.product_lookup = product_lookup
+        self.ttl_seconds = ttl_seconds
+        self._locks = [threading.Lock() for _ in range(max(1, stripes))]
+        self._ids = itertools.count(1)
+        # Plain dict operations are atomic, so the hold table needs no lock of its own
+        self._holds: Dict[int, Reservation] = {}
+        self._next_sweep = 0.0
+
+    def _stripes_for(self, product_ids: Iterable[int]) -> List[threading.Lock]:
+        # Always acquire in stripe order so two baskets can never deadlock
+        indexes = sorted({product_id % len(self._locks) for product_id in product_ids})
+        return [self._locks[i] for i in indexes]
+
+    @contextmanager
+    def locked(self, product_ids: Iterable[int]):
+        locks = self._stripes_for(product_ids)
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def reserve(self, lines: Dict[int, int], ttl_seconds: float = None) -> Reservation:
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self.expire(now)
+
+        products = {}
+        for product_id, quantity in lines.items():
+            product = self.product_lookup(product_id)
+            if product is None:
+                raise KeyError(product_id)
+            if quantity <= 0:
+                raise ValueError(f"Invalid quantity {quantity} for {product.name}")
+            products[product_id] = product
+
+        with self.locked(lines):
+            for product_id, quantity in lines.items():
+                if not products[product_id].is_available(quantity):
+                    raise InsufficientStockError(products[product_id], quantity)
+            for product_id, quantity in lines.items():
+                products[product_id].update_stock(-quantity)
+
+        reservation = Reservation(next(self._ids), dict(lines), products,
+                                  now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds))
+        self._holds[reservation.reservation_id] = reservation
+        return reservation
+
+    def commit(self, reservation: Reservation):
+        if self._holds.pop(reservation.reservation_id, None) is None:
+            raise ValueError(f"Reservation #{reservation.reservation_id} is no longer held")
+        if reservation.is_expired():
+            self._restock(reservation)
+            raise ValueError(f"Reservation #{reservation.reservation_id} expired")
+        reservation.status = Reservation.COMMITTED
+
+    def release(self, reservation: Reservation):
+        if self._holds.pop(reservation.reservation_id, None) is not None:
+            self._restock(reservation)
+
+    def _restock(self, reservation: Reservation):
+        with self.locked(reservation.lines):
+            for product_id, quantity in reservation.lines.items():
+                reservation.products[product_id].update_stock(quantity)
+        reservation.status = Reservation.RELEASED
+
+    def expire(self, now: float = None) -> int:
+        now = now if now is not None else time.monotonic()
+        self._next_sweep = now + min(self.ttl_seconds, 1.0)
+        expired = [r for r in list(self._holds.values()) if r.is_expired(now)]
+        for reservation in expired:
+            self.release(reservation)
+        return len(expired)
+
+    def set_stock(self, product: Product, quantity: int):
+        with self.locked([product.product_id]):
+            product.stock_quantity = max(0, quantity)
+
+    def held_quantity(self, product_id: int) -> int:
+        return sum(r.lines.get(product_id, 0) for r in list(self._holds.values()))
+
+    def __len__(self) -> int:
+        return len(self._holds)
@@ -0,0 +1,280 @@
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from . import events
+from .models import Product
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:[/'.][a-z0-9]+)*")
+PART_PATTERN = re.compile(r"[/'.]")
+
+# Best field wins when a token appears in several places
+FIELD_WEIGHTS = (
+    ('name', 3.0),
+    ('board_type', 2.0), ('suit_type', 2.0), ('accessory_type', 2.0), ('thickness', 2.0),
+    ('length', 1.5), ('fin_setup', 1.5), ('material', 1.5), ('compatibility', 1.5),
+    ('category', 1.5),
+    ('description', 1.0),
+)
+PREFIX_PENALTY = 0.8
+# Substring queries are answered from the postings of every run of GRAM characters
+GRAM = 3
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words; compound tokens like 4/3mm also yield their parts."""
+    tokens = []
+    for word in WORD_PATTERN.findall(text.lower()):
+        tokens.append(word)
+        if not word.isalnum():
+            tokens.extend(part for part in PART_PATTERN.split(word) if part)
+    return tokens
+
+
+def _field_text(product: Product, field: str) -> Optional[str]:
+    if field == 'category':
+        category = product.category
+        return f"{category.name} {category.family.name}"
+    return getattr(product, field, None)
+
+
+class SearchIndex:
+    """Inverted index over product names, descriptions, categories and subtype attributes.
+
+    Every query term must match. The last term also matches as a prefix,
+    for type-ahead. Results are ranked by field weight times inverse
+    document frequency. Renames and removals made through the Catalog are
+    picked up from model events; pass a catalog to also index its new
+    products as they are added.
+    """
+
+    def __init__(self, products: Iterable[Product] = (), catalog=None, max_expansions: int = 64):
+        self.catalog = catalog
+        self.max_expansions = max_expansions
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._by_weight: Dict[str, Dict[float, Dict[int, None]]] = {}
+        self._product_tokens: Dict[int, Dict[str, float]] = {}
+        self._products: Dict[int, Product] = {}
+        self._vocabulary: List[str] = []
+
+        for product in products:
+            self.add_product(product)
+        events.subscribe(events.PRODUCT_UPDATED, self._on_product_updated)
+        events.subscribe(events.PRODUCT_REMOVED, self._on_product_removed)
+        if catalog is not None:
+            events.subscribe(events.PRODUCT_ADDED, self._on_product_added)
+
+    def close(self):
+        events.unsubscribe(events.PRODUCT_UPDATED, self._on_product_updated)
+        events.unsubscribe(events.PRODUCT_REMOVED, self._on_product_removed)
+        events.unsubscribe(events.PRODUCT_ADDED, self._on_product_added)
+
+    def add_product(self, product: Product):
+        if product.product_id in self._products:
+            self.remove_product(product)
+        weights: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS:
+            text = _field_text(product, field)
+            if text:
+                for token in tokenize(text):
+                    if weights.get(token, 0.0) < weight:
+                        weights[token] = weight
+
+        self._products[product.product_id] = product
+        self._product_tokens[product.product_id] = weights
+        for token, weight in weights.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                self._by_weight[token] = {}
+                insort(self._vocabulary, token)
+            posting[product.product_id] = weight
+            self._by_weight[token].setdefault(weight, {})[product.product_id] = None
+
+    def remove_product(self, product: Product):
+        weights = self._product_tokens.pop(product.product_id, None)
+        if weights is None:
+            return
+        del self._products[product.product_id]
+        for token, weight in weights.items():
+            posting = self._postings[token]
+            del posting[product.product_id]
+            group = self._by_weight[token][weight]
+            del group[product.product_id]
+            if not group:
+                del self._by_weight[token][weight]
+            if not posting:
+                del self._postings[token]
+                del self._by_weight[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def update_product(self, product: Product):
+        self.add_product(product)
+
+    def _on_product_added(self, product: Product):
+        if product in self.catalog:
+            self.add_product(product)
+
+    def _on_product_updated(self, product: Product, changed: tuple):
+        if self._products.get(product.product_id) is product:
+            self.update_product(product)
+
+    def _on_product_removed(self, product: Product):
+        if self._products.get(product.product_id) is product:
+            self.remove_product(product)
+
+    def _expand(self, prefix: str) -> List[str]:
+        start = bisect_left(self._vocabulary, prefix)
+        matches = []
+        for token in self._vocabulary[start:start + self.max_expansions]:
+            if not token.startswith(prefix):
+                break
+            matches.append(token)
+        return matches
+
+    def _resolve(self, term: str, prefix: bool) -> List[Tuple[str, float]]:
+        """Index tokens a query term matches, each with its score multiplier."""
+        tokens = self._expand(term) if prefix else ([term] if term in self._postings else [])
+        total = len(self._products)
+        return [(token, math.log(1 + total / len(self._postings[token])) *
+                 (1.0 if token == term else PREFIX_PENALTY)) for token in tokens]
+
+    def _term_groups(self, matches: List[Tuple[str, float]]) -> List[Tuple[float, Dict[int, None]]]:
+        # Every (token, field weight) group shares one score for this term
+        groups = [(weight * factor, members)
+                  for token, factor in matches for weight, members in self._by_weight[token].items()]
+        groups.sort(key=lambda group: -group[0])
+        return groups
+
+    @staticmethod
+    def _best_combinations(term_groups: List[List[Tuple[float, Dict[int, None]]]]):
+        """Yield one group per term, best total score first (k-best merge over sorted lists)."""
+        def total(indexes):
+            return sum(term_groups[t][i][0] for t, i in enumerate(indexes))
+
+        start = (0,) * len(term_groups)
+        heap = [(-total(start), start)]
+        visited = {start}
+        while heap:
+            negative_score, indexes = heapq.heappop(heap)
+            yield -negative_score, [term_groups[t][i][1] for t, i in enumerate(indexes)]
+            for t in range(len(indexes)):
+                if indexes[t] + 1 < len(term_groups[t]):
+                    following = indexes[:t] + (indexes[t] + 1,) + indexes[t + 1:]
+                    if following not in visited:
+                        visited.add(following)
+                        heapq.heappush(heap, (-total(following), following))
+
+    def search_scored(self, query: str, limit: Optional[int] = 20) -> List[Tuple[Product, float]]:
+        terms = list(dict.fromkeys(WORD_PATTERN.findall(query.lower())))
+        if not terms:
+            return []
+        resolved = [self._resolve(term, prefix=(i == len(terms) - 1)) for i, term in enumerate(terms)]
+        if not all(resolved):
+            return []
+
+        # A product's score is the sum of its best group per term, and combinations
+        # arrive best-first, so the first combination that contains a product
+        # scores it correctly and later ones can skip it
+        found: Dict[int, float] = {}
+        for score, members in self._best_combinations([self._term_groups(m) for m in resolved]):
+            members = sorted(members, key=len)
+            product_ids = members[0].keys()
+            for other in members[1:]:
+                product_ids = other.keys() & product_ids
+                if not product_ids:
+                    break
+            for product_id in product_ids:
+                if product_id not in found:
+                    found[product_id] = score
+                    if limit and len(found) >= limit:
+                        break
+            if limit and len(found) >= limit:
+                break
+
+        ranked = sorted(found.items(), key=lambda r: (-r[1], r[0]))
+        return [(self._products[product_id], score) for product_id, score in ranked]
+
+    def search(self, query: str, limit: Optional[int] = 20) -> List[Product]:
+        return [product for product, _ in self.search_scored(query, limit)]
+
+    def __len__(self):
+        return len(self._products)
+
+
+def _grams(text: str) -> Set[str]:
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class SubstringIndex:
+    """Trigram index for case-insensitive substring search over product names and descriptions.
+
+    A keyword can only occur in a product that has every trigram of it, so
+    the candidates are the intersection of those trigrams' postings, and each
+    candidate is then checked with `in`. Keywords shorter than a trigram are
+    checked against every product. Results keep the order the products were
+    added in. Renames and removals made through the Catalog are picked up
+    from model events.
+    """
+
+    def __init__(self, products: Iterable[Product] = ()):
+        self._postings: Dict[str, Set[int]] = {}
+        self._product_grams: Dict[int, Set[str]] = {}
+        self._products: Dict[int, Product] = {}
+        self._order: Dict[int, int] = {}
+        for product in products:
+            self.add_product(product)
+        events.subscribe(events.PRODUCT_UPDATED, self._on_product_updated)
+        events.subscribe(events.PRODUCT_REMOVED, self._on_product_removed)
+
+    def close(self):
+        events.unsubscribe(events.PRODUCT_UPDATED, self._on_product_updated)
+        events.unsubscribe(events.PRODUCT_REMOVED, self._on_product_removed)
+
+    def add_product(self, product: Product):
+        product_id = product.product_id
+        self._unindex(product_id)
+        grams = _grams(product.name.lower()) | _grams(product.description.lower())
+        self._products[product_id] = product
+        self._order.setdefault(product_id, len(self._order))
+        self._product_grams[product_id] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(product_id)
+
+    def remove_product(self, product: Product):
+        self._unindex(product.product_id)
+        self._products.pop(product.product_id, None)
+        self._order.pop(product.product_id, None)
+
+    def _unindex(self, product_id: int):
+        for gram in self._product_grams.pop(product_id, ()):
+            posting = self._postings[gram]
+            posting.discard(product_id)
+            if not posting:
+                del self._postings[gram]
+
+    def _on_product_updated(self, product: Product, changed: tuple):
+        if self._products.get(product.product_id) is product:
+            self.add_product(product)
+
+    def _on_product_removed(self, product: Product):
+        if self._products.get(product.product_id) is product:
+            self.remove_product(product)
+
+    def search(self, keyword: str) -> List[Product]:
+        keyword = keyword.lower()
+        if len(keyword) < GRAM:
+            candidates: Iterable[int] = self._products
+        else:
+            postings = sorted((self._postings.get(gram, set()) for gram in _grams(keyword)), key=len)
+            candidates = set.intersection(*postings)
+        products = self._products
+        found = [product_id for product_id in candidates
+                 if keyword in products[product_id].name.lower()
+                 or keyword in products[product_id].description.lower()]
+        found.sort(key=self._order.__getitem__)
+        return [products[product_id] for product_id in found]
+
+    def __len__(self):
+        return len(self._products)
@@ -0,0 +1,287 @@
+import fcntl
+import os
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Dict, Iterable, List, Optional
+from . import events
+from .catalog import Catalog
+from .models import Product
+from .reservations import StockReservationEngine
+
+MAGIC = int.from_bytes(b"SURFSHM\x00", "little")
+VERSION = 1
+# Header slots, one int64 each; the rest of the header is left for later versions
+_MAGIC, _VERSION, _COUNT, _RING_SIZE, _HEAD = range(5)
+HEADER_BYTES = 64
+
+
+def _open_segment(name: str = None, size: int = 0) -> shared_memory.SharedMemory:
+    if size:
+        # The owner's resource tracker unlinks the segment if the owner dies without closing it
+        return shared_memory.SharedMemory(name, create=True, size=size)
+    # Before Python 3.13 attaching registers the segment too, and the tracker would unlink it
+    # as soon as any worker exits (gh-82300)
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return shared_memory.SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+
+def _lock_path(name: str) -> str:
+    return os.path.join(tempfile.gettempdir(), f"{name.lstrip('/')}.lock")
+
+
+class SharedCatalog:
+    """The hot numeric columns of a catalog in one shared memory segment.
+
+    Product ids, category ids, prices and stock sit in fixed-width columns that
+    every worker process maps and reads in place. Stock is taken under striped
+    locks that hold across processes (fcntl byte-range locks on a lock file,
+    plus a thread lock per stripe within each process). Every change is also
+    appended to a ring of changed rows, so sync() brings a worker's own Product
+    objects up to date by reading only what moved since its last call.
+
+    The product set is fixed when the segment is created; products added later
+    stay local to the worker that added them until the segment is rebuilt.
+    """
+
+    def __init__(self, segment: shared_memory.SharedMemory, stripes: int = 64, owner: bool = False):
+        self._segment = segment
+        self.owner = owner
+        buffer = segment.buf
+        self._header = buffer[:HEADER_BYTES].cast('q')
+        if self._header[_MAGIC] != MAGIC or self._header[_VERSION] != VERSION:
+            self._header.release()
+            raise ValueError(f"{segment.name} is not a version {VERSION} shared catalog")
+        count, ring_size = self._header[_COUNT], self._header[_RING_SIZE]
+        self._ids, self._category_ids, self._prices, self._stock, self._ring = self._columns(
+            buffer, count, ring_size)
+        self._rows: Dict[int, int] = {product_id: row for row, product_id in enumerate(self._ids)}
+        self._ring_size = ring_size
+        self._seen = self._header[_HEAD]
+
+        self._lock_file = os.open(_lock_path(segment.name), os.O_RDWR | os.O_CREAT, 0o600)
+        self._thread_locks = [threading.Lock() for _ in range(max(1, stripes))]
+        # The ring has its own lock byte after the stripes
+        self._ring_lock = threading.Lock()
+        self._pulling = threading.local()
+        self._catalog: Optional[Catalog] = None
+
+    @staticmethod
+    def _columns(buffer, count: int, ring_size: int):
+        offset = HEADER_BYTES
+        columns = []
+        for code, length in (('q', count), ('q', count), ('d', count), ('q', count), ('q', ring_size)):
+            columns.append(buffer[offset:offset + 8 * length].cast(code))
+            offset += 8 * length
+        return columns
+
+    @classmethod
+    def create(cls, catalog: Catalog, name: str = None, ring_size: int = 65536,
+               stripes: int = 64) -> 'SharedCatalog':
+        """Publish catalog's products in a new segment owned by this process."""
+        products = catalog.products
+        size = HEADER_BYTES + 8 * (4 * len(products) + ring_size)
+        segment = _open_segment(name or f"surf_store_{os.getpid()}", size)
+        header = segment.buf[:HEADER_BYTES].cast('q')
+        ids, category_ids, prices, stock, ring = cls._columns(segment.buf, len(products), ring_size)
+        for row, product in enumerate(products):
+            ids[row] = product.product_id
+            category_ids[row] = product.category.category_id
+            prices[row] = product.price
+            stock[row] = product.stock_quantity
+        header[_COUNT] = len(products)
+        header[_RING_SIZE] = ring_size
+        header[_HEAD] = 0
+        header[_VERSION] = VERSION
+        # Written last, so a worker attaching early never sees a half-filled segment
+        header[_MAGIC] = MAGIC
+        for view in (header, ids, category_ids, prices, stock, ring):
+            view.release()
+        return cls(segment, stripes, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, stripes: int = 64) -> 'SharedCatalog':
+        return cls(_open_segment(name), stripes)
+
+    @property
+    def name(self) -> str:
+        return self._segment.name
+
+    def close(self):
+        self.unbind()
+        for view in (self._header, self._ids, self._category_ids, self._prices, self._stock, self._ring):
+            view.release()
+        self._segment.close()
+        os.close(self._lock_file)
+        if self.owner:
+            self._segment.unlink()
+            try:
+                os.unlink(_lock_path(self.name))
+            except FileNotFoundError:
+                pass
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, product_id: int) -> bool:
+        return product_id in self._rows
+
+    def product_ids(self) -> List[int]:
+        return self._ids.tolist()
+
+    def stock(self, product_id: int) -> int:
+        return self._stock[self._rows[product_id]]
+
+    def price(self, product_id: int) -> float:
+        return self._prices[self._rows[product_id]]
+
+    def category_id(self, product_id: int) -> int:
+        return self._category_ids[self._rows[product_id]]
+
+    @property
+    def head(self) -> int:
+        """How many changes have been made to the segment, by any process."""
+        return self._header[_HEAD]
+
+    @contextmanager
+    def locked(self, product_ids: Iterable[int]):
+        """Hold the stripes for product_ids against every thread of every attached process."""
+        # Always acquire in stripe order so two baskets can never deadlock
+        stripes = sorted({product_id % len(self._thread_locks) for product_id in product_ids})
+        held = []
+        try:
+            for stripe in stripes:
+                self._thread_locks[stripe].acquire()
+                held.append(stripe)
+                fcntl.lockf(self._lock_file, fcntl.LOCK_EX, 1, stripe)
+            yield
+        finally:
+            for stripe in reversed(held):
+                fcntl.lockf(self._lock_file, fcntl.LOCK_UN, 1, stripe)
+                self._thread_locks[stripe].release()
+
+    def _changed(self, row: int):
+        with self._ring_lock:
+            stripe = len(self._thread_locks)
+            fcntl.lockf(self._lock_file, fcntl.LOCK_EX, 1, stripe)
+            try:
+                head = self._header[_HEAD]
+                self._ring[head % self._ring_size] = row
+                self._header[_HEAD] = head + 1
+            finally:
+                fcntl.lockf(self._lock_file, fcntl.LOCK_UN, 1, stripe)
+
+    def set_stock(self, product_id: int, quantity: int):
+        """Write stock for product_id; the caller holds its stripe."""
+        row = self._rows[product_id]
+        if self._stock[row] != quantity:
+            self._stock[row] = quantity
+            self._changed(row)
+
+    def set_price(self, product_id: int, price: float):
+        row = self._rows[product_id]
+        if self._prices[row] != price:
+            self._prices[row] = price
+            self._changed(row)
+
+    def bind(self, catalog: Catalog):
+        """Mirror catalog's stock and price changes into the segment, and sync() into catalog.
+
+        Local stock is refreshed from the segment first, as the segment may have
+        moved on since the catalog was loaded.
+        """
+        self.unbind()
+        self._catalog = catalog
+        for product_id in self._rows:
+            product = catalog.get_product(product_id)
+            if product is not None:
+                self.pull(product)
+        self._seen = self.head
+        events.subscribe(events.STOCK_CHANGED, self._on_stock_changed)
+        events.subscribe(events.PRODUCT_UPDATED, self._on_product_updated)
+
+    def unbind(self):
+        if self._catalog is not None:
+            events.unsubscribe(events.STOCK_CHANGED, self._on_stock_changed)
+            events.unsubscribe(events.PRODUCT_UPDATED, self._on_product_updated)
+            self._catalog = None
+
+    def pull(self, product: Product):
+        """Copy the segment's stock and price for product onto it without writing them back."""
+        row = self._rows.get(product.product_id)
+        if row is None:
+            return
+        self._pulling.active = True
+        try:
+            product.stock_quantity = self._stock[row]
+            price = self._prices[row]
+            if product.price != price:
+                if self._catalog is not None:
+                    self._catalog.update_product(product.product_id, price=price)
+                else:
+                    product.price = price
+        finally:
+            self._pulling.active = False
+
+    def sync(self) -> int:
+        """Pull every row changed since the last sync into the bound catalog; returns how many rows."""
+        head = self._header[_HEAD]
+        if head == self._seen or self._catalog is None:
+            return 0
+        if head - self._seen > self._ring_size:
+            rows = range(len(self._rows))
+        else:
+            rows = {self._ring[i % self._ring_size] for i in range(self._seen, head)}
+            # Entries are overwritten once the ring wraps, so a burst during the read means a full pass
+            if self._header[_HEAD] - self._seen > self._ring_size:
+                rows = range(len(self._rows))
+        self._seen = head
+        for row in rows:
+            product = self._catalog.get_product(self._ids[row])
+            if product is not None:
+                self.pull(product)
+        return len(rows)
+
+    def _mine(self, product: Product) -> bool:
+        return (not getattr(self._pulling, 'active', False) and self._catalog is not None
+                and product.product_id in self._rows and self._catalog.get_product(product.product_id) is product)
+
+    def _on_stock_changed(self, product: Product, old_quantity: int):
+        if self._mine(product):
+            self.set_stock(product.product_id, product.stock_quantity)
+
+    def _on_product_updated(self, product: Product, changed):
+        if 'price' in changed and self._mine(product):
+            self.set_price(product.product_id, product.price)
+
+
+class SharedStockReservationEngine(StockReservationEngine):
+    """StockReservationEngine whose stock checks and decrements hold across worker processes.
+
+    locked() takes the shared catalog's stripes and refreshes the products from
+    the segment before the caller looks at their stock, and the catalog's
+    binding writes the caller's changes back before the stripes are released.
+    """
+
+    def __init__(self, product_lookup: Callable[[int], Optional[Product]], shared: SharedCatalog,
+                 ttl_seconds: float = 300.0):
+        super().__init__(product_lookup, stripes=1, ttl_seconds=ttl_seconds)
+        self.shared = shared
+
+    @contextmanager
+    def locked(self, product_ids: Iterable[int]):
+        product_ids = list(product_ids)
+        with self.shared.locked(product_ids):
+            for product_id in product_ids:
+                product = self.product_lookup(product_id)
+                if product is not None:
+                    self.shared.pull(product)
+            yield
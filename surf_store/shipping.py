@@ -0,0 +1,146 @@
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Type
+from . import events
+from .catalog import Catalog
+from .models import Product
+from .orders import Order, Delivery, StandardDelivery, ExpressDelivery, PickupDelivery
+
+try:
+    import numpy as np
+except ImportError:  # Batch quotes fall back to plain Python
+    np = None
+
+DELIVERY_METHODS = (StandardDelivery, ExpressDelivery, PickupDelivery)
+DELIVERY_METHODS_BY_NAME = {method.METHOD_NAME: method for method in DELIVERY_METHODS}
+
+
+def create_delivery(method_name: str, delivery_id: int, order: Order, address: str,
+                    pickup_location: str) -> Delivery:
+    method = DELIVERY_METHODS_BY_NAME.get(method_name)
+    if method is None:
+        raise ValueError(f"Unsupported delivery method: {method_name}")
+    if method is PickupDelivery:
+        return PickupDelivery(delivery_id, order, pickup_location)
+    return method(delivery_id, order, address)
+
+
+class ShippingQuote:
+    def __init__(self, method: Type[Delivery], weight: float):
+        self.method = method
+        self.name = method.METHOD_NAME
+        self.days = method.ESTIMATED_DAYS
+        self.cost = method.quote(weight)
+
+    def __str__(self):
+        return f"{self.name}: ${self.cost:.2f} ({self.days} days)"
+
+
+class ShippingQuoteEngine:
+    """Quotes every delivery method from precomputed product weights.
+
+    Shipping weights are worked out once per product into a flat array, at a
+    slot each product gets when it is first seen, so ids of any size or sign
+    cost one entry. They are refreshed when a product is added or updated. A
+    basket is walked once for its weight, then priced for every method from
+    the price rules on the Delivery classes. quote_orders prices a whole day's
+    orders at once, vectorized with NumPy (in requirements.txt) and in plain
+    Python where it is missing; `python -m surf_store shipping` runs it over
+    the orders in a store database.
+    """
+
+    def __init__(self, catalog: Catalog, methods: Sequence[Type[Delivery]] = DELIVERY_METHODS):
+        self.catalog = catalog
+        self.methods = tuple(methods)
+        self._slots: Dict[int, int] = {}
+        self._weights = array('d')
+        for product in catalog.products:
+            self._set_weight(product)
+        events.subscribe(events.PRODUCT_ADDED, self._on_product_changed)
+        events.subscribe(events.PRODUCT_UPDATED, self._on_product_changed)
+
+    def close(self):
+        events.unsubscribe(events.PRODUCT_ADDED, self._on_product_changed)
+        events.unsubscribe(events.PRODUCT_UPDATED, self._on_product_changed)
+
+    def _set_weight(self, product: Product):
+        slot = self._slots.get(product.product_id)
+        if slot is None:
+            self._slots[product.product_id] = len(self._weights)
+            self._weights.append(product.get_shipping_weight())
+        else:
+            self._weights[slot] = product.get_shipping_weight()
+
+    def _on_product_changed(self, product: Product, changed: tuple = ()):
+        if product in self.catalog:
+            self._set_weight(product)
+
+    def weight_of(self, product_id: int) -> float:
+        slot = self._slots.get(product_id)
+        if slot is None:
+            raise ValueError(f"Product {product_id} is not in the catalog")
+        return self._weights[slot]
+
+    def basket_weight(self, quantities: Dict[int, int]) -> float:
+        """Weight of a basket; products that have left the catalog add nothing."""
+        weights, slots = self._weights, self._slots
+        return sum(weights[slots[product_id]] * quantity
+                   for product_id, quantity in quantities.items() if product_id in slots)
+
+    def quote_weight(self, weight: float) -> List[ShippingQuote]:
+        return [ShippingQuote(method, weight) for method in self.methods]
+
+    def quote_basket(self, quantities: Dict[int, int]) -> List[ShippingQuote]:
+        return self.quote_weight(self.basket_weight(quantities))
+
+    def quote_orders(self, orders: Iterable[Order]) -> Dict[str, list]:
+        """Weights and every method's cost for many orders, as columns keyed by method name."""
+        return self.quote_order_lines((order.order_id, detail.product.product_id, detail.quantity)
+                                      for order in orders for detail in order.order_details)
+
+    def quote_order_lines(self, lines: Iterable[Tuple[int, Optional[int], int]]) -> Dict[str, list]:
+        """quote_orders over (order_id, product_id, quantity) lines, such as export rows.
+
+        Lines of one order need not be adjacent. An order with no lines has a
+        product_id of None and weighs nothing. Lines for products that are not
+        in the catalog are left out of the weight and counted per order in the
+        unknown_lines column.
+        """
+        order_ids, unknown, line_slots, quantities, owners = [], [], [], [], []
+        owner_of: Dict[int, int] = {}
+        slots = self._slots
+        for order_id, product_id, quantity in lines:
+            owner = owner_of.get(order_id)
+            if owner is None:
+                owner = owner_of[order_id] = len(order_ids)
+                order_ids.append(order_id)
+                unknown.append(0)
+            if product_id is None:
+                continue
+            slot = slots.get(product_id)
+            if slot is None:
+                unknown[owner] += 1
+                continue
+            line_slots.append(slot)
+            quantities.append(quantity)
+            owners.append(owner)
+
+        columns = {"order_id": order_ids}
+        if np is not None:
+            line_weights = np.frombuffer(self._weights, dtype=np.float64)[np.asarray(line_slots, dtype=np.intp)]
+            order_weights = np.bincount(np.asarray(owners, dtype=np.intp),
+                                        weights=line_weights * np.asarray(quantities, dtype=np.float64),
+                                        minlength=len(order_ids))
+            columns["weight"] = order_weights.tolist()
+            for method in self.methods:
+                costs = method.BASE_COST + np.maximum(0.0, order_weights - method.INCLUDED_WEIGHT) * method.PER_KG
+                columns[method.METHOD_NAME] = costs.tolist()
+        else:
+            order_weights = [0.0] * len(order_ids)
+            weights = self._weights
+            for slot, quantity, owner in zip(line_slots, quantities, owners):
+                order_weights[owner] += weights[slot] * quantity
+            columns["weight"] = order_weights
+            for method in self.methods:
+                columns[method.METHOD_NAME] = [method.quote(weight) for weight in order_weights]
+        columns["unknown_lines"] = unknown
+        return columns
@@ -0,0 +1,49 @@
+from surf_store import InMemoryRepository, Order, OrderStatus, StoreAggregates
+from test_exports import sample_catalog
+
+
+def scanned(catalog, orders, threshold: int = 5) -> dict:
+    counted = [o for o in orders if o.status != OrderStatus.CANCELLED and o.order_details]
+    return {
+        "product_count": len(catalog.products),
+        "order_count": len(counted),
+        "revenue": round(sum(o.total_amount for o in counted), 2),
+        "inventory_value": round(sum(p.price * p.stock_quantity for p in catalog.products), 2),
+        "low_stock_count": sum(1 for p in catalog.products if p.stock_quantity < threshold),
+        "low_stock_threshold": threshold,
+    }
+
+
+def test_totals_follow_orders_stock_and_prices_like_a_rescan():
+    catalog = sample_catalog()
+    repository = InMemoryRepository()
+    repository.save_catalog(catalog)
+    aggregates = StoreAggregates(catalog, repository.orders)
+    try:
+        orders = []
+        for order_id, product in enumerate(catalog.products[:4], 1):
+            order = Order(order_id, catalog.customers[0])
+            order.add_order_detail(product, 1)
+            repository.add_order(order)
+            orders.append(order)
+        assert aggregates.to_dict() == scanned(catalog, orders)
+
+        orders[1].update_status(OrderStatus.CANCELLED)
+        catalog.products[5].stock_quantity = 1
+        catalog.update_product(catalog.products[6].product_id, price=12.5)
+        assert aggregates.to_dict() == scanned(catalog, orders)
+    finally:
+        aggregates.close()
+
+
+def test_count_orders_adds_loaded_orders_once():
+    catalog = sample_catalog()
+    # Built before the aggregates exist, as orders loaded from a repository are
+    order = Order(1, catalog.customers[0])
+    order.add_order_detail(catalog.products[0], 1)
+    aggregates = StoreAggregates(catalog)
+    try:
+        aggregates.count_orders([order, order])
+        assert (aggregates.order_count, aggregates.revenue) == (1, order.total_amount)
+    finally:
+        aggregates.close()
@@ -0,0 +1,70 @@
+from surf_store import InMemoryBasketStore, ShoppingCart, SQLiteBasketStore
+from surf_store import baskets
+from test_exports import sample_catalog
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def basket_of(catalog, *quantities) -> ShoppingCart:
+    cart = ShoppingCart()
+    for product, quantity in zip(catalog.products, quantities):
+        cart.add_item(product, quantity)
+    return cart
+
+
+def test_in_memory_baskets_are_per_session_and_bounded():
+    catalog = sample_catalog()
+    store = InMemoryBasketStore(max_sessions=2)
+    store.save("a", basket_of(catalog, 1))
+    store.save("b", basket_of(catalog, 2, 1))
+    assert store.load("a").get_item_count() == 1
+    # "a" was just read, so "b" is the least recently used when "c" arrives
+    store.save("c", basket_of(catalog, 3))
+    assert len(store) == 2
+    assert len(store.load("b")) == 0
+    assert store.load("c").get_item_count() == 3
+
+
+def test_in_memory_ttl_slides_on_load(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(baskets.time, "monotonic", clock)
+    store = InMemoryBasketStore(ttl_seconds=10)
+    store.save("a", basket_of(sample_catalog(), 1))
+    for _ in range(3):
+        clock.now += 8
+        assert store.load("a").get_item_count() == 1
+    clock.now += 11
+    assert store.load("a").get_item_count() == 0
+
+
+def test_sqlite_baskets_are_shared_between_stores(tmp_path):
+    catalog = sample_catalog()
+    path = str(tmp_path / "baskets.db")
+    first = SQLiteBasketStore(path, catalog.get_product)
+    second = SQLiteBasketStore(path, catalog.get_product)
+    first.save("a", basket_of(catalog, 2, 1))
+    assert second.load("a").get_quantities() == {catalog.products[0].product_id: 2,
+                                                 catalog.products[1].product_id: 1}
+    second.delete("a")
+    assert len(first.load("a")) == 0
+    assert len(first) == 0
+
+
+def test_sqlite_ttl_slides_on_load(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(baskets.time, "time", clock)
+    catalog = sample_catalog()
+    store = SQLiteBasketStore(str(tmp_path / "baskets.db"), catalog.get_product, ttl_seconds=10)
+    store.save("a", basket_of(catalog, 1))
+    for _ in range(3):
+        clock.now += 8
+        assert store.load("a").get_item_count() == 1
+    clock.now += 11
+    assert store.load("a").get_item_count() == 0
+    assert len(store) == 0
@@ -0,0 +1,51 @@
+import random
+from surf_store import BestSellerTracker, ProductOrderLinkedList
+from test_exports import sample_catalog
+
+
+def test_top_matches_sorting_every_count():
+    products = sample_catalog().products
+    tracker = BestSellerTracker()
+    counts = {}
+    rng = random.Random(3)
+    for step in range(2000):
+        product = rng.choice(products)
+        quantity = rng.randint(1, 4)
+        tracker.increment(product, quantity)
+        counts[product.product_id] = counts.get(product.product_id, 0) + quantity
+        if step % 97 == 0:
+            expected = sorted(counts.values(), reverse=True)[:5]
+            assert [count for _, count in tracker.top(5)] == expected
+    assert all(tracker.count(product) == counts.get(product.product_id, 0) for product in products)
+
+
+def test_ties_go_to_the_product_counted_first():
+    first, second, third = sample_catalog().products[:3]
+    tracker = BestSellerTracker()
+    for product in (second, first, third):
+        tracker.increment(product, 2)
+    assert [product for product, _ in tracker.top(3)] == [second, first, third]
+
+
+def test_window_counts_drop_old_sales():
+    product, other = sample_catalog().products[:2]
+    now = [10_000.0]
+    tracker = BestSellerTracker(windows={'hour': 3600}, clock=lambda: now[0])
+    tracker.increment(product, 5, at=now[0] - 7200)
+    tracker.increment(other, 2)
+    assert tracker.count(product) == 5
+    assert tracker.count(product, window='hour') == 0
+    assert tracker.top(1, window='hour') == [(other, 2)]
+    now[0] += 3600 + 60
+    assert tracker.top(1, window='hour') == []
+
+
+def test_linked_list_facade_keeps_insertion_chain_and_sorted_view():
+    first, second = sample_catalog().products[:2]
+    tracked = ProductOrderLinkedList()
+    tracked.add_or_update_product(first, 1)
+    tracked.add_or_update_product(second, 3)
+    tracked.add_or_update_product(first, 1)
+    assert [tracked.head.product, tracked.head.next.product] == [first, second]
+    assert tracked.get_product_order_count(first) == 2
+    assert [node.product for node in tracked.get_sorted_products_by_orders()] == [second, first]
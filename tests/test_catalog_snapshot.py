@@ -0,0 +1,23 @@
+from surf_store import CatalogSnapshot
+from surf_store.catalog_snapshot import write_catalog_snapshot
+from test_exports import sample_catalog
+
+
+def test_lazy_reads_build_only_the_products_touched(tmp_path):
+    catalog = sample_catalog()
+    path = str(tmp_path / "catalog.snap")
+    write_catalog_snapshot(catalog, path)
+    with CatalogSnapshot(path) as snapshot:
+        assert len(snapshot) == len(catalog.products)
+        page, cursor = snapshot.page_products(limit=2)
+        assert [product.product_id for product in page] == [1, 2] and cursor == 2
+        assert snapshot.get_product(10 ** 9) is None
+        assert len(snapshot._rows) == 2
+
+        loaded = snapshot.load_catalog()
+        assert loaded.get_product(1) is page[0]
+        for product in catalog.products:
+            copy = loaded.get_product(product.product_id)
+            assert type(copy) is type(product) and str(copy) == str(product)
+            assert copy.stock_quantity == product.stock_quantity
+            assert copy.category.category_id == product.category.category_id
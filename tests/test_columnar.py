@@ -0,0 +1,56 @@
+import pytest
+from surf_store import ColumnarCatalog, ProductView
+from test_exports import sample_catalog
+
+
+def test_views_read_like_the_products_they_were_built_from():
+    catalog = sample_catalog()
+    store = ColumnarCatalog.from_catalog(catalog)
+    assert len(store) == len(catalog.products)
+    for product in catalog.products:
+        view = store.get_product(product.product_id)
+        assert isinstance(view, ProductView)
+        assert view.product_class is type(product)
+        assert (view.name, view.description, view.price, view.stock_quantity) == \
+               (product.name, product.description, product.price, product.stock_quantity)
+        assert view.category is product.category
+        assert view.get_shipping_weight() == product.get_shipping_weight()
+        assert str(view) == str(product)
+        copy = view.to_product()
+        assert type(copy) is type(product) and str(copy) == str(product)
+        assert copy.get_care_instructions() == product.get_care_instructions()
+    assert store.get_product(10 ** 9) is None
+
+
+def test_stock_writes_go_to_the_column():
+    store = ColumnarCatalog.from_catalog(sample_catalog())
+    view = store.get_product(1)
+    view.stock_quantity = 0
+    assert store.get_product(1).stock_quantity == 0
+    assert not store.in_stock(1)
+    assert store.in_stock(2, 3) and not store.in_stock(2, 4)
+    with pytest.raises(ValueError):
+        view.stock_quantity = -1
+
+
+def test_pages_follow_the_catalog_cursor():
+    catalog = sample_catalog()
+    store = ColumnarCatalog.from_catalog(catalog)
+    ids, cursor = [], 0
+    while cursor is not None:
+        page, cursor = store.page_products(after_id=cursor, limit=3)
+        ids.extend(view.product_id for view in page)
+    assert ids == sorted(product.product_id for product in catalog.products)
+
+
+def test_rows_must_arrive_in_id_order_with_a_known_type():
+    store = ColumnarCatalog()
+    category = sample_catalog().products[0].category
+    store.append("Accessory", 5, "Wax", "Base coat", 4.5, 10, category, {"accessory_type": "wax"})
+    with pytest.raises(ValueError):
+        store.append("Accessory", 5, "Wax", "Base coat", 4.5, 10, category, {"accessory_type": "wax"})
+    with pytest.raises(ValueError):
+        store.append("Kayak", 6, "Kayak", "Sit on top", 400.0, 1, category, {})
+    assert store.get_product(5).accessory_type == "wax"
+    with pytest.raises(AttributeError):
+        store.get_product(5).board_type
@@ -0,0 +1,87 @@
+import asyncio
+import multiprocessing
+from datetime import datetime
+from surf_store import (DeliveryStatus, DispatchScheduler, Order, OrderStatus, PickupDelivery, StandardDelivery,
+                        TrackingIndex, events)
+from test_exports import sample_catalog
+
+
+def place(catalog, order_id: int, pickup: bool = False) -> Order:
+    order = Order(order_id, catalog.customers[0], datetime(2026, 2, 1, 10, 30))
+    order.add_order_detail(catalog.products[0], 1)
+    if pickup:
+        PickupDelivery(order_id, order, "Main Street shop")
+    else:
+        StandardDelivery(order_id, order, "1 Beach Road")
+    return order
+
+
+def test_index_follows_saved_orders_and_status_changes():
+    catalog = sample_catalog()
+    first = place(catalog, 1)
+    index = TrackingIndex([first])
+    try:
+        assert index.get("  std000001 ") is first.delivery
+        second = place(catalog, 2, pickup=True)
+        assert "PU000002" not in index
+        events.emit(events.ORDERS_SAVED, [second])
+        assert index.get("pu000002") is second.delivery and len(index) == 2
+
+        first.delivery.update_status(DeliveryStatus.DISPATCHED)
+        assert index.with_status(DeliveryStatus.DISPATCHED) == [first.delivery]
+        assert index.counts()[DeliveryStatus.PREPARING.value] == 1
+    finally:
+        index.close()
+
+
+def test_waves_move_each_delivery_one_step():
+    catalog = sample_catalog()
+    standard, pickup, cancelled = place(catalog, 1), place(catalog, 2, pickup=True), place(catalog, 3)
+    cancelled.update_status(OrderStatus.CANCELLED)
+    index = TrackingIndex([standard, pickup, cancelled])
+    saved = []
+    scheduler = DispatchScheduler(index, on_wave=saved.append)
+    try:
+        assert asyncio.run(scheduler.run_wave()) == {DeliveryStatus.DISPATCHED.value: 2}
+        assert standard.status == pickup.status == OrderStatus.DISPATCHED
+        # Pickups are collected from the shop instead of going into transit
+        assert asyncio.run(scheduler.run_wave()) == {DeliveryStatus.IN_TRANSIT.value: 1,
+                                                      DeliveryStatus.DELIVERED.value: 1}
+        assert pickup.status == OrderStatus.DELIVERED
+        assert asyncio.run(scheduler.run_wave()) == {DeliveryStatus.DELIVERED.value: 1}
+        assert asyncio.run(scheduler.run_wave()) == {}
+        assert standard.delivery.status == DeliveryStatus.DELIVERED
+        assert cancelled.delivery.status == DeliveryStatus.PREPARING
+        assert [sorted(order.order_id for order in wave) for wave in saved] == [[1, 2], [1, 2], [1]]
+        assert scheduler.stats()["waves"] == 4 and scheduler.moved == 5
+    finally:
+        index.close()
+
+
+def try_to_lead(lock_path: str, results):
+    scheduler = DispatchScheduler(TrackingIndex(), lock_path=lock_path)
+    results.put(scheduler._lead())
+    asyncio.run(scheduler.close())
+
+
+def other_process_leads(lock_path: str) -> bool:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=try_to_lead, args=(lock_path, results))
+    process.start()
+    leads = results.get(timeout=30)
+    process.join(timeout=30)
+    return leads
+
+
+def test_one_process_runs_the_cutoffs_until_it_closes(tmp_path):
+    lock_path = str(tmp_path / "store.db.dispatch.lock")
+    scheduler = DispatchScheduler(TrackingIndex(), lock_path=lock_path)
+    assert not scheduler.leader
+    assert scheduler._lead() and scheduler.stats()["leader"]
+    assert not other_process_leads(lock_path)
+    # A wave by hand still runs in the leader, taking and dropping the wave lock
+    assert asyncio.run(scheduler.run_wave()) == {}
+    asyncio.run(scheduler.close())
+    assert not scheduler.leader
+    assert other_process_leads(lock_path)
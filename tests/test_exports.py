@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi.testclient import TestClient
+from surf_store import (Catalog, Order, SQLiteRepository, export_order_lines, export_orders, import_orders,
+                        parse_date, parse_statuses, read_jsonl)
+from surf_store.__main__ import main
+from surf_store.demo import create_sample_data
+from surf_store.exports import iter_orders
+
+
+def sample_catalog() -> Catalog:
+    data = create_sample_data()
+    return Catalog(data['families'], data['products'], data['customers'])
+
+
+def test_date_filters_compare_naive_and_aware_order_dates():
+    catalog = sample_catalog()
+    customer = catalog.customers[0]
+    aware = datetime(2026, 1, 2, 12, 0, tzinfo=timezone(timedelta(hours=2)))
+    orders = [Order(1, customer, datetime(2025, 6, 1, 9, 0)),
+              Order(2, customer, aware),
+              Order(3, customer, datetime(2026, 3, 1, 9, 0))]
+
+    since = parse_date("2026-01-01")
+    assert [o.order_id for o in iter_orders(orders, since=since)] == [2, 3]
+    assert [o.order_id for o in iter_orders(orders, until=since)] == [1]
+    assert [o.order_id for o in iter_orders(orders, since=aware, until=parse_date("2026-02-01T00:00:00+00:00"))] == [2]
+    assert "".join(export_orders(orders, 'csv', since=since)).count("\n") == 3
+
+
+def test_cursor_export_matches_in_memory_export(tmp_path):
+    catalog = sample_catalog()
+    repository = SQLiteRepository(str(tmp_path / "store.db"))
+    repository.save_catalog(catalog)
+    product = catalog.products[0]
+    for order_id, day in ((1, 1), (2, 15), (3, 28)):
+        order = Order(order_id, catalog.customers[order_id], datetime(2026, 2, day, 10, 30))
+        order.add_order_detail(product, 1)
+        repository.add_order(order)
+    repository.close()
+
+    repository = SQLiteRepository(str(tmp_path / "store.db"))
+    loaded = repository.load_catalog()
+    orders = repository.load_orders(loaded)
+    for since, until, statuses in ((None, None, None), ("2026-02-10", "2026-02-20", "pending"), ("2026-03-01", None, None)):
+        filters = (parse_date(since), parse_date(until), parse_statuses([statuses] if statuses else None))
+        for format in ('csv', 'jsonl'):
+            expected = "".join(export_orders(orders, format, *filters))
+            streamed = "".join(export_order_lines(repository.iter_order_lines(*filters), loaded, format))
+            assert streamed == expected
+    repository.close()
+
+
+def test_imported_orders_export_as_they_were_imported(tmp_path):
+    catalog = sample_catalog()
+    repository = SQLiteRepository(str(tmp_path / "store.db"))
+    repository.save_catalog(catalog)
+    first, second = catalog.products[0], catalog.products[2]
+    records = [
+        {"reference": "M-1", "order_date": "2026-01-05T09:15:00",
+         "customer": {"email": "Surfer@Example.com", "first_name": "Kai", "last_name": "Lenny"},
+         "lines": [{"product_id": first.product_id, "quantity": 2}, {"product_id": second.product_id, "quantity": 1}]},
+        {"reference": "M-2", "order_date": "2026-01-06T23:30:00-05:00",
+         "customer": {"email": "wholesale@example.com", "first_name": "Board", "last_name": "Shop"},
+         "lines": [{"product_id": second.product_id, "quantity": 3}]},
+    ]
+    report = import_orders(read_jsonl(json.dumps(record) for record in records), catalog, repository)
+    assert report.imported == 2 and not report.errors
+
+    exported = [json.loads(line) for line in
+                "".join(export_order_lines(repository.iter_order_lines(), catalog, 'jsonl')).splitlines()]
+    assert len(exported) == len(records)
+    for record, order in zip(records, exported):
+        assert order['customer_email'] == record['customer']['email']
+        assert order['order_date'] == parse_date(record['order_date']).isoformat()
+        assert [(line['product_id'], line['quantity']) for line in order['lines']] == \
+            [(line['product_id'], line['quantity']) for line in record['lines']]
+        assert order['order_total'] == round(sum(line['subtotal'] for line in order['lines']), 2)
+
+    rows = list(csv.DictReader(io.StringIO("".join(
+        export_order_lines(repository.iter_order_lines(since=parse_date("2026-01-06")), catalog, 'csv')))))
+    assert [(row['customer_email'], int(row['quantity'])) for row in rows] == [("wholesale@example.com", 3)]
+    repository.close()
+
+
+def test_orders_endpoint_filters_after_an_aware_import():
+    import app
+    with TestClient(app.app) as client:
+        product = app.products[0]
+        record = ('{"reference": "M-1", "order_date": "2026-01-01T10:00:00+00:00", '
+                  '"customer": {"email": "buyer@example.com"}, "lines": [{"product_id": %d, "quantity": 1}]}'
+                  % product.product_id)
+        assert client.post("/admin/orders/import", content=record).json()["imported"] == 1
+        assert app.orders_db[-1].order_date.tzinfo is None
+
+        response = client.get("/admin/export/orders.csv", params={"since": "2025-01-01"})
+        assert response.status_code == 200
+        assert "buyer@example.com" in response.text
+
+
+def test_cli_rejects_unknown_statuses_and_dates(tmp_path, capsys):
+    path = str(tmp_path / "store.db")
+    SQLiteRepository(path).save_catalog(sample_catalog())
+    for option, value, message in (("--status", "shipped", "unknown status"), ("--since", "soon", "not an ISO date")):
+        with pytest.raises(SystemExit) as exited:
+            main(["export", "orders", "--db", path, option, value])
+        assert exited.value.code == 2 and message in capsys.readouterr().err
+
+    output = tmp_path / "orders.csv"
+    main(["export", "orders", "--db", path, "--status", "pending,confirmed", "--status", "cancelled",
+          "--since", "2026-01-01", "-o", str(output)])
+    assert output.read_text().startswith("order_id,")
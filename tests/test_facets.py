@@ -0,0 +1,34 @@
+import random
+from benchmarks.facets import make_selections, scan
+from benchmarks.synthetic import build_catalog
+from surf_store.facets import FacetIndex
+
+
+def assert_matches_scan(index, products, selections):
+    for chosen in selections:
+        result = index.search(chosen)
+        matches, counts = scan(products, chosen)
+        assert result.products == matches
+        for facet in result.facets:
+            for option in facet["options"]:
+                assert option["count"] == counts[facet["name"]].get(option["value"], 0), (chosen, facet["name"])
+
+
+def test_facet_counts_match_a_scan():
+    catalog = build_catalog(2000, seed=7)
+    index = FacetIndex(catalog.products, catalog=catalog)
+    rng = random.Random(7)
+    assert_matches_scan(index, catalog.products, make_selections(index, 200, rng))
+    index.close()
+
+
+def test_facet_counts_follow_stock_and_price_changes():
+    catalog = build_catalog(500, seed=11)
+    index = FacetIndex(catalog.products, catalog=catalog)
+    rng = random.Random(11)
+    for product in rng.sample(catalog.products, 100):
+        product.stock_quantity = 0 if product.stock_quantity else rng.randint(1, 5)
+    for product in rng.sample(catalog.products, 50):
+        catalog.update_product(product.product_id, price=round(rng.uniform(10, 900), 2))
+    assert_matches_scan(index, catalog.products, make_selections(index, 100, rng))
+    index.close()
@@ -0,0 +1,54 @@
+import pytest
+from surf_store import InMemoryRepository, OrderImporter, StoreAggregates
+from test_exports import sample_catalog
+
+
+def importer_for(catalog, repository=None) -> OrderImporter:
+    if repository is None:
+        repository = InMemoryRepository()
+        repository.save_catalog(catalog)
+    return OrderImporter(catalog, repository)
+
+
+def test_malformed_records_are_rejected_one_by_one():
+    catalog = sample_catalog()
+    product_id = catalog.products[0].product_id
+    good = {"customer": {"email": "shop@example.com"}, "lines": [{"product_id": product_id, "quantity": 1}]}
+    records = [
+        {"reference": "lines-int", "customer": {"email": "a@example.com"}, "lines": 5},
+        {"reference": "lines-dict", "customer": {"email": "a@example.com"}, "lines": {"product_id": product_id}},
+        {"reference": "email-int", "customer": {"email": 42}, "lines": good["lines"]},
+        {"reference": "email-blank", "customer": {"email": "  "}, "lines": good["lines"]},
+        {"reference": "line-int", "customer": {"email": "a@example.com"}, "lines": [7]},
+        {"reference": "unknown", "customer": {"email": "a@example.com"},
+         "lines": [{"product_id": 99999, "quantity": 1}]},
+        {"reference": "good", **good},
+    ]
+    report = importer_for(catalog).run(records)
+    assert (report.imported, report.rejected) == (1, 6)
+    assert [error["reference"] for error in report.to_dict()["errors"]] == [r["reference"] for r in records[:6]]
+
+
+class FailingRepository(InMemoryRepository):
+    def add_orders(self, orders):
+        raise OSError("disk full")
+
+
+def test_a_batch_that_fails_to_save_gives_its_stock_back():
+    catalog = sample_catalog()
+    product = catalog.products[0]
+    stock = product.stock_quantity
+    repository = FailingRepository()
+    repository.save_catalog(catalog)
+    aggregates = StoreAggregates(catalog)
+    customer = catalog.customers[0]
+    history = len(customer.orders)
+    try:
+        with pytest.raises(OSError):
+            importer_for(catalog, repository).run(
+                [{"customer": {"email": customer.email}, "lines": [{"product_id": product.product_id, "quantity": 2}]}])
+        assert product.stock_quantity == stock
+        assert (aggregates.order_count, aggregates.revenue) == (0, 0.0)
+        assert len(customer.orders) == history
+    finally:
+        aggregates.close()
@@ -0,0 +1,52 @@
+import os
+from surf_store import EventJournal, InMemoryRepository, Order
+from surf_store.journal import SNAPSHOT_NAME, _segments
+from test_exports import sample_catalog
+
+
+def record_changes(directory, stock_changes, snapshot_every=100_000):
+    """Journal an order and stock_changes stock updates to the sample catalog; returns the expected stock."""
+    catalog = sample_catalog()
+    repository = InMemoryRepository()
+    repository.save_catalog(catalog)
+    journal = EventJournal(directory, snapshot_every=snapshot_every, fsync=False)
+    journal.recover()
+    journal.attach(catalog, repository.orders)
+    try:
+        order = Order(1, catalog.customers[0])
+        order.add_order_detail(catalog.products[0], 1)
+        repository.add_order(order)
+        product = catalog.products[1]
+        for quantity in range(stock_changes):
+            product.stock_quantity = quantity + 1
+        journal.wait()
+    finally:
+        journal.close()
+    return {p.product_id: p.stock_quantity for p in catalog.products}
+
+
+def test_replay_drops_a_torn_last_line(tmp_path):
+    directory = str(tmp_path)
+    stock = record_changes(directory, 5)
+    newest = _segments(directory)[-1]
+    size = os.path.getsize(newest)
+    with open(newest, "ab") as file:
+        file.write(b'[[999999,"stock",1,')
+
+    state = EventJournal(directory).recover()
+    assert {p.product_id: p.stock_quantity for p in state.catalog.products} == stock
+    assert [o.order_id for o in state.orders] == [1]
+    assert os.path.getsize(newest) == size
+
+
+def test_replay_after_a_snapshot_rollover(tmp_path):
+    directory = str(tmp_path)
+    stock = record_changes(directory, 50, snapshot_every=10)
+    assert os.path.exists(os.path.join(directory, SNAPSHOT_NAME))
+
+    state = EventJournal(directory).recover()
+    assert state.snapshot_seq > 0
+    # Rolling over deletes the segments the snapshot covers
+    assert state.journal_records < 50
+    assert {p.product_id: p.stock_quantity for p in state.catalog.products} == stock
+    assert [o.order_id for o in state.orders] == [1]
@@ -0,0 +1,47 @@
+from datetime import datetime
+from fastapi.testclient import TestClient
+from surf_store import Order, SQLiteRepository, StoreMetrics
+import app
+from test_exports import sample_catalog
+
+
+def orders_counted(metrics: StoreMetrics) -> float:
+    return sum(metrics.orders._values.values())
+
+
+def test_orders_from_other_processes_are_not_counted(tmp_path):
+    catalog = sample_catalog()
+    path = str(tmp_path / "store.db")
+    writer = SQLiteRepository(path)
+    writer.save_catalog(catalog)
+    reader = SQLiteRepository(path)
+    reader.load_orders(reader.load_catalog())
+
+    metrics = StoreMetrics()
+    metrics.enable()
+    try:
+        order = Order(1, catalog.customers[0], datetime(2026, 2, 1, 10, 30))
+        order.add_order_detail(catalog.products[0], 1)
+        writer.add_order(order)
+        assert orders_counted(metrics) == 1
+
+        with metrics.muted():
+            added = reader.refresh_orders(reader.load_catalog())
+        assert [o.order_id for o in added] == [1]
+        assert orders_counted(metrics) == 1
+    finally:
+        metrics.disable()
+        writer.close()
+        reader.close()
+
+
+def test_metrics_switched_on_at_startup_skip_loaded_orders(monkeypatch):
+    monkeypatch.setenv("SURF_STORE_METRICS", "1")
+    assert not app.metrics.enabled
+    try:
+        with TestClient(app.app) as client:
+            assert app.metrics.enabled
+            assert orders_counted(app.metrics) == 0
+            assert "surf_store_metrics_enabled 1" in client.get("/metrics").text
+    finally:
+        app.metrics.disable()
@@ -0,0 +1,91 @@
+import asyncio
+from surf_store import (Order, PaymentGateway, PaymentGatewayError, PaymentPipeline, PaymentStatus,
+                        SimulatedGateway, create_payment)
+from test_exports import sample_catalog
+
+
+def new_payment(payment_id: int = 1):
+    catalog = sample_catalog()
+    order = Order(payment_id, catalog.customers[0])
+    order.add_order_detail(catalog.products[0], 1)
+    return create_payment("PayPal", payment_id, order)
+
+
+class FlakyGateway(PaymentGateway):
+    """Fails the first `failures` attempts, and counts how many charges run at once."""
+
+    def __init__(self, failures: int = 0, delay: float = 0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+
+    async def charge(self, payment, idempotency_key):
+        self.calls += 1
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.calls <= self.failures:
+                raise PaymentGatewayError("down")
+            return payment.process_payment()
+        finally:
+            self.running -= 1
+
+
+def test_transient_failures_are_retried_then_given_up():
+    async def charge(failures):
+        pipeline = PaymentPipeline(FlakyGateway(failures), retries=2, backoff_seconds=0)
+        payment = new_payment()
+        try:
+            return await pipeline.submit(payment, "key"), payment.status, pipeline.stats()
+        finally:
+            await pipeline.close()
+
+    approved, status, stats = asyncio.run(charge(2))
+    assert (approved, status, stats["retried"], stats["failed"]) == (True, PaymentStatus.COMPLETED, 2, 0)
+    approved, status, stats = asyncio.run(charge(3))
+    assert (approved, status, stats["attempts"], stats["failed"]) == (False, PaymentStatus.FAILED, 3, 1)
+
+
+def test_slow_attempts_time_out_and_retry():
+    async def run():
+        gateway = FlakyGateway(delay=0.2)
+        pipeline = PaymentPipeline(gateway, timeout_seconds=0.01, retries=1, backoff_seconds=0)
+        try:
+            return await pipeline.submit(new_payment(), "key"), gateway.calls
+        finally:
+            await pipeline.close()
+
+    assert asyncio.run(run()) == (False, 2)
+
+
+def test_one_charge_per_idempotency_key():
+    async def run():
+        gateway = SimulatedGateway(latency_ms=1, jitter_ms=0)
+        pipeline = PaymentPipeline(gateway)
+        payment = new_payment()
+        try:
+            outcomes = await asyncio.gather(*(pipeline.submit(payment, "same") for _ in range(5)))
+            outcomes.append(await gateway.charge(payment, "same"))
+            return outcomes, gateway.charges
+        finally:
+            await pipeline.close()
+
+    outcomes, charges = asyncio.run(run())
+    assert outcomes == [True] * 6 and charges == 1
+
+
+def test_workers_bound_charges_in_flight():
+    async def run():
+        gateway = FlakyGateway(delay=0.01)
+        pipeline = PaymentPipeline(gateway, workers=3, queue_size=2)
+        try:
+            outcomes = await asyncio.gather(*(pipeline.submit(new_payment(n), f"key-{n}") for n in range(1, 13)))
+            return outcomes, gateway.peak
+        finally:
+            await pipeline.close()
+
+    outcomes, peak = asyncio.run(run())
+    assert all(outcomes) and peak == 3
@@ -0,0 +1,46 @@
+from surf_store import CatalogVersions, LRUFragmentCache
+from test_exports import sample_catalog
+
+
+def test_cache_evicts_least_recently_used_past_entries_or_bytes():
+    cache = LRUFragmentCache(max_entries=3, max_bytes=100)
+    for key in "abc":
+        cache.set(key, "x" * 30)
+    assert cache.get("a") == "x" * 30
+    cache.set("d", "y" * 30)
+    assert (cache.get("b"), len(cache), cache.size_bytes) == (None, 3, 90)
+
+    cache.set("e", "z" * 40)
+    # 130 bytes is over budget, so the least recently used entry goes until it fits
+    assert cache.get("c") is None and cache.get("a") == "x" * 30
+    assert (len(cache), cache.size_bytes) == (3, 100)
+
+    cache.set("e", "é" * 10)
+    assert cache.size_bytes == 80
+    cache.set("huge", "h" * 101)
+    assert cache.get("huge") is None and cache.size_bytes == 80
+    cache.clear()
+    assert (len(cache), cache.size_bytes) == (0, 0)
+
+
+def test_stock_changes_move_only_the_scopes_the_product_is_in():
+    catalog = sample_catalog()
+    versions = CatalogVersions(catalog)
+    try:
+        product = catalog.products[0]
+        other = next(p for p in catalog.products if p.get_family() is not product.get_family())
+        before = (versions.version, versions.scope_version(family_id=product.get_family().family_id),
+                  versions.scope_version(category_id=product.category.category_id),
+                  versions.product_version(product.product_id))
+        untouched = (versions.scope_version(family_id=other.get_family().family_id),
+                     versions.product_version(other.product_id))
+
+        product.stock_quantity += 1
+        after = (versions.version, versions.scope_version(family_id=product.get_family().family_id),
+                 versions.scope_version(category_id=product.category.category_id),
+                 versions.product_version(product.product_id))
+        assert all(old != new for old, new in zip(before, after))
+        assert untouched == (versions.scope_version(family_id=other.get_family().family_id),
+                             versions.product_version(other.product_id))
+    finally:
+        versions.close()
@@ -0,0 +1,58 @@
+import threading
+import pytest
+from surf_store import InsufficientStockError, Reservation, StockReservationEngine
+from test_exports import sample_catalog
+
+
+def test_a_basket_is_reserved_whole_or_not_at_all():
+    catalog = sample_catalog()
+    first, second = catalog.products[0], catalog.products[1]
+    engine = StockReservationEngine(catalog.get_product)
+    with pytest.raises(InsufficientStockError):
+        engine.reserve({first.product_id: 1, second.product_id: second.stock_quantity + 1})
+    assert (first.stock_quantity, len(engine)) == (5, 0)
+
+    reservation = engine.reserve({first.product_id: 2, second.product_id: 1})
+    assert (first.stock_quantity, second.stock_quantity) == (3, 2)
+    assert engine.held_quantity(first.product_id) == 2
+    engine.commit(reservation)
+    assert reservation.status == Reservation.COMMITTED
+    assert (first.stock_quantity, len(engine)) == (3, 0)
+
+
+def test_released_and_expired_holds_go_back_on_the_shelf():
+    catalog = sample_catalog()
+    product = catalog.products[0]
+    engine = StockReservationEngine(catalog.get_product, ttl_seconds=60)
+    engine.release(engine.reserve({product.product_id: 2}))
+    assert product.stock_quantity == 5
+
+    reservation = engine.reserve({product.product_id: 2})
+    assert engine.expire(now=reservation.expires_at) == 1
+    assert (product.stock_quantity, reservation.status) == (5, Reservation.RELEASED)
+    with pytest.raises(ValueError):
+        engine.commit(reservation)
+
+
+def test_concurrent_checkouts_never_oversell():
+    catalog = sample_catalog()
+    product = catalog.products[2]
+    stock = product.stock_quantity
+    engine = StockReservationEngine(catalog.get_product, stripes=4)
+    sold, start = [], threading.Barrier(8)
+
+    def buy():
+        start.wait()
+        for _ in range(stock):
+            try:
+                engine.commit(engine.reserve({product.product_id: 1}))
+            except InsufficientStockError:
+                continue
+            sold.append(1)
+
+    threads = [threading.Thread(target=buy) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (len(sold), product.stock_quantity) == (stock, 0)
@@ -0,0 +1,41 @@
+from surf_store import Inventory, SearchIndex
+from test_exports import sample_catalog
+
+
+def scan(products, keyword: str):
+    keyword = keyword.lower()
+    return [p for p in products if keyword in p.name.lower() or keyword in p.description.lower()]
+
+
+def test_inventory_search_keeps_substring_matching():
+    catalog = sample_catalog()
+    inventory = Inventory()
+    for product in catalog.products:
+        inventory.add_product(product)
+    for keyword in ("board", "Longboard", "SUIT", "4/3", "wa", "", "zzz", "ve f"):
+        assert inventory.search_products(keyword) == scan(inventory.products, keyword), keyword
+    assert any("Longboard" in p.name for p in inventory.search_products("board"))
+
+    product = catalog.products[0]
+    catalog.update_product(product.product_id, name="Quokka Cruiser")
+    assert inventory.search_products("quokka") == [product]
+    assert inventory.search_products("longboard") == scan(inventory.products, "longboard")
+    inventory._search_index.close()
+
+
+def test_index_search_needs_every_term_and_prefixes_the_last():
+    catalog = sample_catalog()
+    index = SearchIndex(catalog.products, catalog=catalog)
+    try:
+        longboards = index.search("longboard")
+        assert longboards and all("longboard" in (p.name + p.description + p.category.name).lower()
+                                  for p in longboards)
+        assert index.search("longb") == longboards
+        assert index.search("longboard zzzz") == []
+        product = longboards[0]
+        catalog.update_product(product.product_id, name="Quokka Cruiser")
+        assert index.search("quokka") == [product]
+        catalog.remove_product(product.product_id)
+        assert index.search("quokka") == []
+    finally:
+        index.close()
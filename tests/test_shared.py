@@ -0,0 +1,100 @@
+import multiprocessing
+import os
+from fastapi.testclient import TestClient
+from surf_store import (DeliveryStatus, InsufficientStockError, Order, SQLiteRepository, SharedCatalog,
+                        SharedStockReservationEngine, StandardDelivery)
+from test_exports import sample_catalog
+
+WORKERS = 4
+
+
+def buy_until_sold_out(name: str, start, results):
+    catalog = sample_catalog()
+    shared = SharedCatalog.attach(name)
+    shared.bind(catalog)
+    engine = SharedStockReservationEngine(catalog.get_product, shared)
+    sold = {}
+    start.wait()
+    for product_id in shared.product_ids() * 50:
+        shared.sync()
+        try:
+            engine.commit(engine.reserve({product_id: 1}))
+        except InsufficientStockError:
+            continue
+        sold[product_id] = sold.get(product_id, 0) + 1
+    shared.sync()
+    local = {product.product_id: product.stock_quantity for product in catalog.products}
+    shared.close()
+    results.put((sold, local))
+
+
+def test_workers_never_sell_the_same_unit_twice():
+    catalog = sample_catalog()
+    stock = {product.product_id: product.stock_quantity for product in catalog.products}
+    shared = SharedCatalog.create(catalog, f"surf_store_test_{os.getpid()}")
+    try:
+        context = multiprocessing.get_context("spawn")
+        start, results = context.Barrier(WORKERS), context.Queue()
+        processes = [context.Process(target=buy_until_sold_out, args=(shared.name, start, results))
+                     for _ in range(WORKERS)]
+        for process in processes:
+            process.start()
+        reports = [results.get(timeout=60) for _ in processes]
+        for process in processes:
+            process.join(timeout=60)
+
+        for product_id, quantity in stock.items():
+            assert sum(sold.get(product_id, 0) for sold, _ in reports) == quantity
+            assert shared.stock(product_id) == 0
+            # Every worker's own products caught up with what the others sold
+            assert all(local[product_id] == 0 for _, local in reports)
+    finally:
+        shared.close()
+
+
+def test_orders_saved_by_another_worker_are_refreshed(tmp_path):
+    path = str(tmp_path / "store.db")
+    writer = SQLiteRepository(path)
+    writer.save_catalog(sample_catalog())
+    writer_catalog = writer.load_catalog()
+    writer.load_orders(writer_catalog)
+    reader = SQLiteRepository(path)
+    reader_catalog = reader.load_catalog()
+    assert reader.load_orders(reader_catalog) == []
+
+    order = Order(writer.next_id('order'), writer_catalog.customers[0])
+    order.add_order_detail(writer_catalog.products[0], 1)
+    StandardDelivery(writer.next_id('delivery'), order, "1 Beach Road")
+    writer.add_order(order)
+    added = reader.refresh_orders(reader_catalog)
+    assert [o.order_id for o in added] == [order.order_id] == [o.order_id for o in reader.orders]
+    assert added[0].customer is reader_catalog.get_customer(order.customer.customer_id)
+
+    order.delivery.update_status(DeliveryStatus.DISPATCHED)
+    writer.save_order_status([order])
+    assert reader.refresh_orders(reader_catalog) == []
+    assert reader.orders[0].delivery.status == order.delivery.status
+    assert reader.orders[0].status == order.status
+    assert reader.refresh_orders(reader_catalog) == []
+    writer.close()
+    reader.close()
+
+
+def test_order_refresh_is_throttled_and_skips_static_files(monkeypatch):
+    import app
+    refreshes = []
+    monkeypatch.setattr(app, "refresh_orders", lambda: refreshes.append(1))
+    monkeypatch.setattr(app, "ORDER_REFRESH_SECONDS", 60.0)
+    with TestClient(app.app) as client:
+        monkeypatch.setattr(app, "orders_refreshed_at", float("-inf"))
+        assert client.get("/static/css/style.css").status_code == 200
+        client.get("/metrics")
+        assert refreshes == []
+        client.get("/")
+        client.get("/products")
+        assert refreshes == [1]
+
+        monkeypatch.setattr(app, "ORDER_REFRESH_SECONDS", 0.0)
+        client.get("/")
+        client.get("/products")
+        assert refreshes == [1, 1, 1]
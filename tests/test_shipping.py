@@ -0,0 +1,60 @@
+import csv
+from datetime import datetime
+from surf_store import Order, SQLiteRepository, ShippingQuoteEngine, DELIVERY_METHODS
+from surf_store.__main__ import main
+from test_exports import sample_catalog
+
+
+def test_basket_quotes_use_catalog_weights_and_skip_missing_products():
+    catalog = sample_catalog()
+    engine = ShippingQuoteEngine(catalog)
+    board, suit = catalog.products[0], catalog.products[1]
+    weight = board.get_shipping_weight() * 2 + suit.get_shipping_weight()
+    try:
+        assert engine.basket_weight({board.product_id: 2, suit.product_id: 1, 999: 4}) == weight
+        quotes = engine.quote_basket({board.product_id: 2, suit.product_id: 1})
+        assert [quote.cost for quote in quotes] == [method.quote(weight) for method in DELIVERY_METHODS]
+    finally:
+        engine.close()
+
+
+def test_order_lines_report_unknown_products_per_order():
+    catalog = sample_catalog()
+    engine = ShippingQuoteEngine(catalog)
+    board = catalog.products[0]
+    try:
+        # Lines of order 7 are split around order 8, which has no lines at all
+        columns = engine.quote_order_lines([(7, board.product_id, 1), (8, None, None), (7, 999, 3),
+                                            (7, board.product_id, 2)])
+    finally:
+        engine.close()
+    assert columns["order_id"] == [7, 8]
+    assert columns["weight"] == [board.get_shipping_weight() * 3, 0.0]
+    assert columns["unknown_lines"] == [1, 0]
+    for method in DELIVERY_METHODS:
+        assert columns[method.METHOD_NAME] == [method.quote(weight) for weight in columns["weight"]]
+
+
+def test_cli_quotes_the_orders_in_a_database(tmp_path, capsys):
+    catalog = sample_catalog()
+    path = str(tmp_path / "store.db")
+    repository = SQLiteRepository(path)
+    repository.save_catalog(catalog)
+    board = catalog.products[0]
+    for order_id, quantity in ((1, 1), (2, 3)):
+        order = Order(order_id, catalog.customers[0], datetime(2026, 2, order_id, 10, 30))
+        order.add_order_detail(board, quantity)
+        repository.add_order(order)
+    repository.close()
+
+    output = tmp_path / "quotes.csv"
+    main(["shipping", "--db", path, "--since", "2026-02-02", "-o", str(output)])
+    with open(output, newline="") as handle:
+        rows = list(csv.DictReader(handle))
+    assert [row["order_id"] for row in rows] == ["2"]
+    weight = board.get_shipping_weight() * 3
+    assert float(rows[0]["weight"]) == weight
+    assert rows[0]["unknown_lines"] == "0"
+    for method in DELIVERY_METHODS:
+        assert float(rows[0][method.METHOD_NAME]) == method.quote(weight)
+    assert capsys.readouterr().err == ""